@@ -0,0 +1,325 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""An audio I/O module of Ariel package from the Google EMEA gTech Ads Data Science.
+
+It decodes and encodes audio in-process with the libav bindings of PyAV, so
+reading or writing a short chunk doesn't spawn an FFmpeg process the way pydub
+does. pydub is used as a fallback when PyAV is not installed or fails.
+"""
+
+from typing import BinaryIO, Final, Mapping
+from absl import logging
+import numpy as np
+from pydub import AudioSegment
+
+try:
+  import av
+except ImportError:
+  av = None
+
+_PCM_SAMPLE_WIDTH: Final[int] = 2
+_DEFAULT_BITRATE: Final[str] = "128k"
+_ENCODERS: Final[Mapping[str, str]] = {
+    "mp3": "libmp3lame",
+    "wav": "pcm_s16le",
+}
+
+
+class NoAudioStreamError(Exception):
+  """Raised when a file has no audio stream to decode."""
+
+
+def _parse_bitrate(bitrate: str) -> int:
+  """Converts a bitrate like '320k' to bits per second."""
+  if bitrate.lower().endswith("k"):
+    return int(float(bitrate[:-1]) * 1000)
+  return int(bitrate)
+
+
+def _rewind(file: str | BinaryIO, *, truncate: bool = False) -> None:
+  """Moves a file object back to its start before a fallback attempt.
+
+  Args:
+    file: The path to the file or a file object. Paths are left as they are.
+    truncate: Whether to also drop the bytes a failed encoding attempt wrote.
+  """
+  if not isinstance(file, str):
+    file.seek(0)
+    if truncate:
+      file.truncate()
+
+
+def _get_audio_stream(
+    container: "av.container.InputContainer", file: str | BinaryIO
+) -> "av.audio.stream.AudioStream":
+  """Returns the first audio stream of a container.
+
+  Raises:
+    NoAudioStreamError: If the container has no audio stream.
+  """
+  if not container.streams.audio:
+    raise NoAudioStreamError(
+        f"There is no audio stream in {getattr(file, 'name', file)}."
+    )
+  return container.streams.audio[0]
+
+
+def _decode(
+    file: str | BinaryIO,
+    *,
+    sample_format: str,
+    frame_rate: int | None,
+    channels: int | None,
+) -> tuple[np.ndarray, int, int]:
+  """Decodes the first audio stream of a file with PyAV.
+
+  Args:
+    file: The path to the audio file or a file object.
+    sample_format: The packed libav sample format to decode to, e.g. 'flt'.
+    frame_rate: The frame rate to resample to. The original one when None.
+    channels: The number of channels to convert to. The original one when None.
+
+  Returns:
+    A tuple with the interleaved samples, the frame rate and the number of
+    channels.
+
+  Raises:
+    NoAudioStreamError: If the file has no audio stream.
+  """
+  with av.open(file) as container:
+    stream = _get_audio_stream(container, file)
+    frame_rate = frame_rate or stream.codec_context.sample_rate
+    channels = channels or stream.codec_context.channels
+    resampler = av.AudioResampler(
+        format=sample_format,
+        layout=av.AudioLayout(channels),
+        rate=frame_rate,
+    )
+    frames = []
+    for frame in container.decode(stream):
+      frames.extend(resampler.resample(frame))
+    frames.extend(resampler.resample(None))
+  if not frames:
+    return np.zeros(0, dtype=np.float32), frame_rate, channels
+  samples = np.concatenate([frame.to_ndarray()[0] for frame in frames])
+  return samples, frame_rate, channels
+
+
+def _encode(
+    file: str | BinaryIO,
+    samples: np.ndarray,
+    *,
+    sample_format: str,
+    frame_rate: int,
+    format: str,
+    bitrate: str | None,
+) -> None:
+  """Encodes interleaved samples with PyAV.
+
+  Args:
+    file: The path to the output file or a file object.
+    samples: An array of shape (samples, channels) in the sample format.
+    sample_format: The packed libav sample format of the samples.
+    frame_rate: The frame rate of the samples.
+    format: The container format, e.g. 'mp3'.
+    bitrate: The bitrate of the lossy formats, e.g. '320k'.
+  """
+  with av.open(file, "w", format=format) as container:
+    stream = container.add_stream(
+        _ENCODERS.get(format, format), rate=frame_rate
+    )
+    stream.layout = av.AudioLayout(samples.shape[1])
+    if format != "wav":
+      stream.bit_rate = _parse_bitrate(bitrate or _DEFAULT_BITRATE)
+    frame = av.AudioFrame.from_ndarray(
+        np.ascontiguousarray(samples).reshape(1, -1),
+        format=sample_format,
+        layout=stream.layout.name,
+    )
+    frame.sample_rate = frame_rate
+    for packet in stream.encode(frame if len(samples) else None):
+      container.mux(packet)
+    for packet in stream.encode(None):
+      container.mux(packet)
+
+
+def read_audio(
+    file: str | BinaryIO,
+    *,
+    frame_rate: int | None = None,
+    channels: int | None = None,
+) -> tuple[np.ndarray, int]:
+  """Decodes an audio file into a float32 array.
+
+  Args:
+    file: The path to the audio file or a file object.
+    frame_rate: The frame rate to resample the audio to. The original one is
+      kept when not provided.
+    channels: The number of channels to convert the audio to. The original
+      number is kept when not provided.
+
+  Returns:
+    A tuple with an array of shape (samples, channels) with values in the
+    [-1, 1] range and its frame rate.
+
+  Raises:
+    NoAudioStreamError: If the file has no audio stream.
+  """
+  if av:
+    try:
+      samples, frame_rate, channels = _decode(
+          file, sample_format="flt", frame_rate=frame_rate, channels=channels
+      )
+      return samples.reshape(-1, channels), frame_rate
+    except av.error.FFmpegError as error:
+      logging.warning(f"PyAV failed to decode the audio, using pydub: {error}")
+      _rewind(file)
+  audio = read_audio_segment(file, use_pydub=True)
+  if frame_rate:
+    audio = audio.set_frame_rate(frame_rate)
+  if channels:
+    audio = audio.set_channels(channels)
+  samples = np.array(audio.get_array_of_samples(), dtype=np.float32)
+  samples /= 1 << (8 * audio.sample_width - 1)
+  return samples.reshape(-1, audio.channels), audio.frame_rate
+
+
+def read_audio_segment(
+    file: str | BinaryIO, *, use_pydub: bool = False
+) -> AudioSegment:
+  """Decodes an audio file into a 16-bit AudioSegment.
+
+  It's an in-process replacement for `AudioSegment.from_file`.
+
+  Args:
+    file: The path to the audio file or a file object.
+    use_pydub: Whether to decode with pydub even when PyAV is available.
+
+  Returns:
+    The decoded audio.
+
+  Raises:
+    NoAudioStreamError: If the file has no audio stream.
+  """
+  if av and not use_pydub:
+    try:
+      samples, frame_rate, channels = _decode(
+          file, sample_format="s16", frame_rate=None, channels=None
+      )
+      return AudioSegment(
+          samples.astype(np.int16).tobytes(),
+          frame_rate=frame_rate,
+          sample_width=_PCM_SAMPLE_WIDTH,
+          channels=channels,
+      )
+    except av.error.FFmpegError as error:
+      logging.warning(f"PyAV failed to decode the audio, using pydub: {error}")
+      _rewind(file)
+  return AudioSegment.from_file(file)
+
+
+def get_duration(file: str | BinaryIO) -> float:
+  """Returns the decoded duration of an audio file in seconds.
+
+  Unlike the container metadata it's exact for the MP3 files.
+
+  Args:
+    file: The path to the audio file or a file object.
+
+  Raises:
+    NoAudioStreamError: If the file has no audio stream.
+  """
+  if av:
+    try:
+      with av.open(file) as container:
+        stream = _get_audio_stream(container, file)
+        samples = sum(frame.samples for frame in container.decode(stream))
+        return samples / stream.codec_context.sample_rate
+    except av.error.FFmpegError as error:
+      logging.warning(f"PyAV failed to decode the audio, using pydub: {error}")
+      _rewind(file)
+  return AudioSegment.from_file(file).duration_seconds
+
+
+def write_audio(
+    file: str | BinaryIO,
+    samples: np.ndarray,
+    *,
+    frame_rate: int,
+    format: str = "mp3",
+    bitrate: str | None = None,
+) -> None:
+  """Encodes a float array to an audio file.
+
+  Args:
+    file: The path to the output file or a file object.
+    samples: An array of shape (samples, channels) with values in the [-1, 1]
+      range. The values outside of the range are clipped.
+    frame_rate: The frame rate of the samples.
+    format: The format of the output file, e.g. 'mp3' or 'wav'.
+    bitrate: The bitrate of the lossy formats, e.g. '320k'.
+  """
+  pcm_samples = np.round(
+      np.clip(samples, -1.0, 1.0) * np.iinfo(np.int16).max
+  ).astype(np.int16)
+  write_audio_segment(
+      AudioSegment(
+          pcm_samples.tobytes(),
+          frame_rate=frame_rate,
+          sample_width=_PCM_SAMPLE_WIDTH,
+          channels=samples.shape[1],
+      ),
+      file,
+      format=format,
+      bitrate=bitrate,
+  )
+
+
+def write_audio_segment(
+    audio: AudioSegment,
+    file: str | BinaryIO,
+    *,
+    format: str = "mp3",
+    bitrate: str | None = None,
+) -> None:
+  """Encodes an AudioSegment to an audio file.
+
+  It's an in-process replacement for `AudioSegment.export`.
+
+  Args:
+    audio: The audio to encode.
+    file: The path to the output file or a file object.
+    format: The format of the output file, e.g. 'mp3' or 'wav'.
+    bitrate: The bitrate of the lossy formats, e.g. '320k'.
+  """
+  if av:
+    audio = audio.set_sample_width(_PCM_SAMPLE_WIDTH)
+    samples = np.frombuffer(audio.raw_data, dtype=np.int16).reshape(
+        -1, audio.channels
+    )
+    try:
+      _encode(
+          file,
+          samples,
+          sample_format="s16",
+          frame_rate=audio.frame_rate,
+          format=format,
+          bitrate=bitrate,
+      )
+      return
+    except av.error.FFmpegError as error:
+      logging.warning(f"PyAV failed to encode the audio, using pydub: {error}")
+      _rewind(file, truncate=True)
+  audio.export(file, format=format, bitrate=bitrate)
@@ -14,17 +14,31 @@
 
 """An audio processing module of Ariel package from the Google EMEA gTech Ads Data Science."""
 
+import collections
+import dataclasses
+import functools
+import hashlib
+import json
+import math
 import os
 import re
 import subprocess
+import time
 from typing import Final
-from typing import Final, Mapping, Sequence
+from typing import Final, Iterable, Iterator, Mapping, Sequence
 from typing import Mapping, Sequence
 from absl import logging
+from ariel import audio_io
+from ariel import loudness
+from demucs.apply import apply_model
+from demucs.audio import AudioFile
+from demucs.audio import save_audio
+from demucs.pretrained import get_model
+from moviepy.config import get_setting
 import numpy as np
 from pyannote.audio import Pipeline
 from pydub import AudioSegment
-from pyloudnorm import Meter
+from scipy import signal
 import tensorflow as tf
 import torch
 
@@ -37,7 +51,31 @@ _SUPPORTED_DEVICES: Final[tuple[str, str]] = ("cpu", "cuda")
 _TIMESTAMP_THRESHOLD: Final[float] = 0.001
 _DEFAULT_RATE: Final[float] = 44100
 _TARGET_LUFS: Final[float] = -16
-_MIN_BLOCK_SIZE_MS: Final[int] = 400
+_DEFAULT_DEMUCS_MODEL: Final[str] = "htdemucs"
+_VOCALS_STEM: Final[str] = "vocals"
+_VOCALS_FILE: Final[str] = "vocals.mp3"
+_BACKGROUND_FILE: Final[str] = "no_vocals.mp3"
+_CACHE_METADATA_FILE: Final[str] = "metadata.json"
+DEFAULT_SEPARATION_CACHE_SIZE_BYTES: Final[int] = 10 * 1024**3
+_DEFAULT_LONG_FORM_THRESHOLD_SECONDS: Final[float] = 600.0
+_DEFAULT_WINDOW_SECONDS: Final[float] = 60.0
+_DEFAULT_WINDOW_OVERLAP_SECONDS: Final[float] = 5.0
+_PCM_SAMPLE_WIDTH: Final[int] = 2
+_DEFAULT_SPEECH_PADDING_SECONDS: Final[float] = 1.0
+_DEFAULT_SPEECH_CROSSFADE_SECONDS: Final[float] = 0.1
+DEFAULT_RESIDUAL_VOCALS_THRESHOLD_DB: Final[float] = -30.0
+_DEFAULT_SEPARATION_PRESET: Final[str] = "max"
+_DEFAULT_NORMALIZATION_HEADROOM_DB: Final[float] = 0.1
+_DECODED_AUDIO_CHANNELS: Final[int] = 2
+_FLOAT32_SAMPLE_WIDTH: Final[int] = 4
+_SOURCE_KEY_LENGTH: Final[int] = 16
+_SPEECH_SAMPLE_RATE: Final[int] = 16000
+_RESAMPLING_BLOCK_SECONDS: Final[float] = 30.0
+_RESAMPLING_PADDING_SECONDS: Final[float] = 0.1
+_DEFAULT_MAXIMUM_MERGE_GAP_SECONDS: Final[float] = 0.3
+_DEFAULT_MAXIMUM_UTTERANCE_SECONDS: Final[float] = 10.0
+_VOCALS_MIX_TIMELINE_FILE: Final[str] = "dubbed_vocals_mix.npy"
+_VOCALS_MIX_INDEX_FILE: Final[str] = "dubbed_vocals_mix.json"
 
 
 def build_demucs_command(
@@ -258,74 +296,1194 @@ def execute_vocals_non_vocals_split(
   return audio_vocals_file, audio_background_file
 
 
+def _waveform_to_pcm(waveform: torch.Tensor) -> bytes:
+  """Converts a (channels, samples) float waveform to interleaved 16-bit PCM."""
+  samples = waveform.clamp(-1.0, 1.0).mul(32767).round().to(torch.int16)
+  return samples.T.contiguous().cpu().numpy().tobytes()
+
+
+def _build_ffmpeg_command(*arguments: str) -> list[str]:
+  """Returns an FFmpeg command that overwrites its output and logs errors."""
+  return [get_setting("FFMPEG_BINARY"), "-y", "-loglevel", "error", *arguments]
+
+
+def _start_mp3_encoder(
+    *, output_file: str, sample_rate: int, channels: int, bitrate: int
+) -> subprocess.Popen:
+  """Starts FFmpeg encoding the 16-bit PCM written to its stdin to MP3."""
+  return subprocess.Popen(
+      _build_ffmpeg_command(
+          "-f",
+          "s16le",
+          "-ar",
+          str(sample_rate),
+          "-ac",
+          str(channels),
+          "-i",
+          "pipe:0",
+          "-c:a",
+          "libmp3lame",
+          "-b:a",
+          f"{bitrate}k",
+          output_file,
+      ),
+      stdin=subprocess.PIPE,
+      bufsize=0,
+  )
+
+
+class DecodedAudioStore:
+  """Decodes an audio file once and serves the views every consumer needs.
+
+  The audio file is decoded with FFmpeg into a memory-mapped float32 PCM file
+  at the full sample rate. The other views, e.g. 16 kHz mono for PyAnnote and
+  Whisper, are derived from it block by block and cached as memory-mapped
+  files as well, so no consumer decodes the media again.
+
+  Attributes:
+    audio_file: The path to the decoded audio file.
+    cache_directory: The directory with the decoded PCM files.
+    sample_rate: The full sample rate of the decoded audio.
+    channels: The full number of channels of the decoded audio.
+  """
+
+  def __init__(
+      self,
+      *,
+      audio_file: str,
+      cache_directory: str,
+      sample_rate: int = int(_DEFAULT_RATE),
+      channels: int = _DECODED_AUDIO_CHANNELS,
+  ) -> None:
+    """Initializes the DecodedAudioStore.
+
+    Args:
+      audio_file: The path to the audio file to decode.
+      cache_directory: The directory to store the decoded PCM files in.
+      sample_rate: The full sample rate to decode the audio at.
+      channels: The full number of channels to decode the audio to.
+    """
+    self.audio_file = audio_file
+    self.cache_directory = cache_directory
+    self.sample_rate = sample_rate
+    self.channels = channels
+    self._views = {}
+
+  @functools.cached_property
+  def _source_key(self) -> str:
+    """The short hash of the decoded file and the full decoding settings.
+
+    It covers the full path and the size and modification time of the file,
+    so the files with the same name in other directories, or a file that was
+    replaced, never share the views.
+    """
+    stat = tf.io.gfile.stat(self.audio_file)
+    properties = dict(
+        audio_file=os.path.abspath(self.audio_file),
+        size=stat.length,
+        modified=stat.mtime_nsec,
+        sample_rate=self.sample_rate,
+        channels=self.channels,
+    )
+    return hashlib.sha256(
+        json.dumps(properties, sort_keys=True).encode("utf-8")
+    ).hexdigest()[:_SOURCE_KEY_LENGTH]
+
+  def _view_path(self, *, sample_rate: int, channels: int) -> str:
+    """Returns the path to the PCM file of a view."""
+    file_name = os.path.splitext(os.path.basename(self.audio_file))[0]
+    return os.path.join(
+        self.cache_directory,
+        f"decoded_{file_name}_{self._source_key}_{sample_rate}_{channels}.f32",
+    )
+
+  def _open_view(self, *, path: str, channels: int) -> np.ndarray:
+    """Memory-maps a PCM file as an array of shape (samples, channels)."""
+    samples = os.path.getsize(path) // (_FLOAT32_SAMPLE_WIDTH * channels)
+    if not samples:
+      return np.zeros((0, channels), dtype=np.float32)
+    return np.memmap(
+        path, dtype=np.float32, mode="r", shape=(samples, channels)
+    )
+
+  def _decode(self, path: str) -> None:
+    """Decodes the audio file to a raw float32 PCM file with FFmpeg."""
+    logging.info(f"Decoding {self.audio_file} into {path}.")
+    temporary_path = f"{path}.tmp"
+    subprocess.run(
+        _build_ffmpeg_command(
+            "-i",
+            self.audio_file,
+            "-vn",
+            "-f",
+            "f32le",
+            "-acodec",
+            "pcm_f32le",
+            "-ac",
+            str(self.channels),
+            "-ar",
+            str(self.sample_rate),
+            temporary_path,
+        ),
+        check=True,
+    )
+    os.replace(temporary_path, path)
+
+  def _derive(self, *, path: str, sample_rate: int, channels: int) -> None:
+    """Derives a view from the full-rate samples block by block.
+
+    The blocks are resampled with some context on both sides, which is then
+    trimmed, so the result matches resampling the whole track at once.
+
+    Args:
+      path: The path to write the view to.
+      sample_rate: The sample rate of the view.
+      channels: The number of channels of the view, either 1 or the full one.
+    """
+    samples = self.samples
+    divisor = math.gcd(self.sample_rate, sample_rate)
+    up, down = sample_rate // divisor, self.sample_rate // divisor
+    block_samples = down * max(
+        int(_RESAMPLING_BLOCK_SECONDS * self.sample_rate) // down, 1
+    )
+    padding_samples = down * max(
+        int(_RESAMPLING_PADDING_SECONDS * self.sample_rate) // down, 1
+    )
+    total_samples = -(-len(samples) * up // down)
+    temporary_path = f"{path}.tmp"
+    if not total_samples:
+      open(temporary_path, "wb").close()
+      os.replace(temporary_path, path)
+      return
+    view = np.memmap(
+        temporary_path,
+        dtype=np.float32,
+        mode="w+",
+        shape=(total_samples, channels),
+    )
+    for start in range(0, len(samples), block_samples):
+      end = min(start + block_samples, len(samples))
+      padded_start = max(start - padding_samples, 0)
+      padded_end = min(end + padding_samples, len(samples))
+      block = samples[padded_start:padded_end]
+      if channels != self.channels:
+        block = block.mean(axis=1, keepdims=True)
+      if up != down:
+        block = signal.resample_poly(block, up, down, axis=0)
+      output_start = start * up // down
+      output_end = -(-end * up // down)
+      offset = (start - padded_start) * up // down
+      view[output_start:output_end] = block[
+          offset : offset + output_end - output_start
+      ]
+    view.flush()
+    del view
+    os.replace(temporary_path, path)
+
+  @functools.cached_property
+  def samples(self) -> np.ndarray:
+    """The full-rate samples as an array of shape (samples, channels)."""
+    return self.get_samples()
+
+  @property
+  def duration(self) -> float:
+    """The duration of the decoded audio in seconds."""
+    return len(self.samples) / self.sample_rate
+
+  def get_samples(
+      self, *, sample_rate: int | None = None, channels: int | None = None
+  ) -> np.ndarray:
+    """Returns the decoded audio at a sample rate and number of channels.
+
+    Args:
+      sample_rate: The sample rate of the view. The full one when not provided.
+      channels: The number of channels of the view. The full one when not
+        provided.
+
+    Returns:
+      A read-only, memory-mapped array of shape (samples, channels).
+
+    Raises:
+      ValueError: If the number of channels is neither 1 nor the full one.
+    """
+    sample_rate = sample_rate or self.sample_rate
+    channels = channels or self.channels
+    if channels not in (1, self.channels):
+      raise ValueError(
+          f"The number of channels must be 1 or {self.channels}. Got:"
+          f" {channels}."
+      )
+    key = (sample_rate, channels)
+    if key not in self._views:
+      path = self._view_path(sample_rate=sample_rate, channels=channels)
+      if not tf.io.gfile.exists(path):
+        tf.io.gfile.makedirs(self.cache_directory)
+        if key == (self.sample_rate, self.channels):
+          self._decode(path)
+        else:
+          self._derive(path=path, sample_rate=sample_rate, channels=channels)
+      self._views[key] = self._open_view(path=path, channels=channels)
+    return self._views[key]
+
+  def get_segment(
+      self,
+      *,
+      start: float,
+      end: float,
+      sample_rate: int | None = None,
+      channels: int | None = None,
+  ) -> np.ndarray:
+    """Returns a segment of the decoded audio.
+
+    Args:
+      start: The start time of the segment in seconds.
+      end: The end time of the segment in seconds.
+      sample_rate: The sample rate of the segment. The full one when not
+        provided.
+      channels: The number of channels of the segment. The full one when not
+        provided.
+
+    Returns:
+      A memory-mapped array of shape (samples, channels).
+    """
+    sample_rate = sample_rate or self.sample_rate
+    samples = self.get_samples(sample_rate=sample_rate, channels=channels)
+    return samples[int(start * sample_rate) : int(end * sample_rate)]
+
+  def get_sample_range(self, *, start: float, end: float) -> list[int]:
+    """Returns the full-rate [start, end) sample range of a time span."""
+    return [int(start * self.sample_rate), int(end * self.sample_rate)]
+
+  def get_range(
+      self,
+      sample_range: Sequence[int],
+      *,
+      sample_rate: int | None = None,
+      channels: int | None = None,
+  ) -> np.ndarray:
+    """Returns the audio of a full-rate sample range.
+
+    Args:
+      sample_range: The [start, end) range of the full-rate samples.
+      sample_rate: The sample rate of the returned audio. The full one when
+        not provided.
+      channels: The number of channels of the returned audio. The full one
+        when not provided.
+
+    Returns:
+      A memory-mapped array of shape (samples, channels).
+    """
+    sample_rate = sample_rate or self.sample_rate
+    start, end = (
+        sample * sample_rate // self.sample_rate for sample in sample_range
+    )
+    return self.get_samples(sample_rate=sample_rate, channels=channels)[
+        start:end
+    ]
+
+  def get_audio_segment(self, *, start: float, end: float) -> AudioSegment:
+    """Returns a full-rate segment of the decoded audio as an AudioSegment."""
+    return array_to_audio_segment(
+        self.get_range(self.get_sample_range(start=start, end=end)),
+        frame_rate=self.sample_rate,
+    )
+
+  def get_speech_samples(self) -> np.ndarray:
+    """Returns the 16 kHz mono view used by PyAnnote and Whisper."""
+    return self.get_samples(sample_rate=_SPEECH_SAMPLE_RATE, channels=1)
+
+  def get_speech_segment(self, *, start: float, end: float) -> np.ndarray:
+    """Returns a segment of the 16 kHz mono view as a 1D array for Whisper."""
+    return self.get_segment(
+        start=start, end=end, sample_rate=_SPEECH_SAMPLE_RATE, channels=1
+    )[:, 0]
+
+  def get_pyannote_input(self) -> Mapping[str, torch.Tensor | int]:
+    """Returns the in-memory audio input for a PyAnnote pipeline."""
+    return {
+        "waveform": torch.from_numpy(np.array(self.get_speech_samples().T)),
+        "sample_rate": _SPEECH_SAMPLE_RATE,
+    }
+
+
+def pad_speech_regions(
+    speech_regions: Sequence[tuple[float, float]],
+    *,
+    padding_seconds: float = _DEFAULT_SPEECH_PADDING_SECONDS,
+) -> list[tuple[float, float]]:
+  """Pads the speech regions and merges the ones that overlap afterwards.
+
+  Args:
+    speech_regions: A sequence of (start, end) tuples in seconds.
+    padding_seconds: How much to extend each region on both sides.
+
+  Returns:
+    A sorted list of non-overlapping (start, end) tuples in seconds.
+  """
+  padded_regions = []
+  for start, end in sorted(speech_regions):
+    start = max(start - padding_seconds, 0.0)
+    end = end + padding_seconds
+    if padded_regions and start <= padded_regions[-1][1]:
+      padded_regions[-1] = (
+          padded_regions[-1][0],
+          max(padded_regions[-1][1], end),
+      )
+    else:
+      padded_regions.append((start, end))
+  return padded_regions
+
+
+def measure_vocals_db(
+    *, vocals: torch.Tensor, background: torch.Tensor
+) -> float:
+  """Measures the energy of a separated vocals stem relative to the background.
+
+  Args:
+    vocals: The vocals returned by a separation of shape (channels, samples).
+    background: The background returned by the same separation, of the same
+      shape.
+
+  Returns:
+    The vocals energy relative to the background energy in dB.
+  """
+  vocals_energy = vocals.double().square().sum().item()
+  background_energy = background.double().square().sum().item()
+  if not vocals_energy:
+    return float("-inf")
+  if not background_energy:
+    return float("inf")
+  return 10 * np.log10(vocals_energy / background_energy)
+
+
+@functools.lru_cache(maxsize=None)
+def load_demucs_model(
+    model_name: str = _DEFAULT_DEMUCS_MODEL, device: str = "cpu"
+) -> torch.nn.Module:
+  """Loads a pre-trained Demucs model once per process.
+
+  Subsequent calls with the same arguments return the already loaded model, so
+  the weights are read from disk only once per worker.
+
+  Args:
+    model_name: The name of the pre-trained Demucs model.
+    device: The device to load the model on ("cuda" or "cpu").
+
+  Returns:
+    The Demucs model in the evaluation mode.
+  """
+  logging.info(f"Loading the Demucs model {model_name} on {device}.")
+  model = get_model(model_name)
+  model.to(device)
+  model.eval()
+  return model
+
+
+@dataclasses.dataclass(frozen=True)
+class SeparationPreset:
+  """Demucs settings that trade the separation quality for speed.
+
+  Attributes:
+    shifts: The number of random shifts for equivariant stabilization.
+    overlap: The overlap between splits.
+    segment: The split size for chunks (None for the model default).
+    jobs: The number of jobs to run in parallel.
+    mp3_bitrate: The bitrate of converted MP3 files.
+    mp3_preset: The encoder preset for MP3 conversion, from 2 (best quality)
+      to 7 (fastest).
+  """
+
+  shifts: int
+  overlap: float
+  segment: float | None = None
+  jobs: int = 0
+  mp3_bitrate: int = 320
+  mp3_preset: int = 2
+
+
+SEPARATION_PRESETS: Final[Mapping[str, SeparationPreset]] = {
+    "draft": SeparationPreset(
+        shifts=1, overlap=0.1, jobs=os.cpu_count() or 0, mp3_preset=7
+    ),
+    "standard": SeparationPreset(
+        shifts=3, overlap=0.25, jobs=os.cpu_count() or 0
+    ),
+    "max": SeparationPreset(shifts=10, overlap=0.25),
+}
+
+
+def signal_to_distortion_ratio(
+    *, reference: torch.Tensor, estimate: torch.Tensor
+) -> float:
+  """Calculates the signal-to-distortion ratio of an estimated signal.
+
+  Args:
+    reference: The reference signal.
+    estimate: The estimated signal of the same shape as the reference.
+
+  Returns:
+    The signal-to-distortion ratio in dB.
+  """
+  reference_energy = reference.square().sum().item()
+  distortion_energy = (reference - estimate).square().sum().item()
+  if not distortion_energy:
+    return float("inf")
+  if not reference_energy:
+    return float("-inf")
+  return 10 * np.log10(reference_energy / distortion_energy)
+
+
+class DemucsSeparator:
+  """Separates vocals from the background with an in-process Demucs model.
+
+  Attributes:
+    device: The device to run Demucs on ("cuda" or "cpu").
+    model_name: The name of the pre-trained Demucs model.
+    shifts: The number of random shifts for equivariant stabilization.
+    overlap: The overlap between splits.
+    split: Whether to split audio into chunks.
+    segment: The split size for chunks (None for the model default).
+    jobs: The number of jobs to run in parallel.
+    mp3_bitrate: The bitrate of converted MP3 files.
+    mp3_preset: The encoder preset for MP3 conversion.
+  """
+
+  def __init__(
+      self,
+      *,
+      device: str = "cpu",
+      model_name: str = _DEFAULT_DEMUCS_MODEL,
+      shifts: int = 10,
+      overlap: float = 0.25,
+      split: bool = True,
+      segment: float | None = None,
+      jobs: int = 0,
+      mp3_bitrate: int = 320,
+      mp3_preset: int = 2,
+  ) -> None:
+    """Initializes the DemucsSeparator.
+
+    Args:
+      device: The device to run Demucs on ("cuda" or "cpu").
+      model_name: The name of the pre-trained Demucs model.
+      shifts: The number of random shifts for equivariant stabilization.
+      overlap: The overlap between splits.
+      split: Whether to split audio into chunks.
+      segment: The split size for chunks (None for the model default).
+      jobs: The number of jobs to run in parallel.
+      mp3_bitrate: The bitrate of converted MP3 files.
+      mp3_preset: The encoder preset for MP3 conversion.
+    """
+    if device not in _SUPPORTED_DEVICES:
+      raise ValueError(
+          f"Unsupported device: {device}. Supported devices are:"
+          f" {', '.join(_SUPPORTED_DEVICES)}."
+      )
+    self.device = device
+    self.model_name = model_name
+    self.shifts = shifts
+    self.overlap = overlap
+    self.split = split
+    self.segment = segment
+    self.jobs = jobs
+    self.mp3_bitrate = mp3_bitrate
+    self.mp3_preset = mp3_preset
+
+  @classmethod
+  def from_preset(
+      cls,
+      preset: str = _DEFAULT_SEPARATION_PRESET,
+      *,
+      device: str = "cpu",
+      model_name: str = _DEFAULT_DEMUCS_MODEL,
+  ) -> "DemucsSeparator":
+    """Creates a separator with one of the named quality/speed presets.
+
+    Args:
+      preset: The name of the preset, one of `SEPARATION_PRESETS`.
+      device: The device to run Demucs on ("cuda" or "cpu").
+      model_name: The name of the pre-trained Demucs model.
+
+    Returns:
+      The separator configured with the preset settings.
+
+    Raises:
+      ValueError: If the preset is not supported.
+    """
+    if preset not in SEPARATION_PRESETS:
+      raise ValueError(
+          f"Unsupported separation preset: {preset}. Supported presets are:"
+          f" {', '.join(SEPARATION_PRESETS)}."
+      )
+    return cls(
+        device=device,
+        model_name=model_name,
+        **dataclasses.asdict(SEPARATION_PRESETS[preset]),
+    )
+
+  @property
+  def model(self) -> torch.nn.Module:
+    """The Demucs model, loaded once per process."""
+    return load_demucs_model(self.model_name, self.device)
+
+  @property
+  def sample_rate(self) -> int:
+    """The sample rate the Demucs model operates at."""
+    return self.model.samplerate
+
+  def _get_store_samples(self, audio_store: DecodedAudioStore) -> np.ndarray:
+    """Returns the view of a decoded audio store in the model format."""
+    return audio_store.get_samples(
+        sample_rate=self.sample_rate, channels=self.model.audio_channels
+    )
+
+  def read_audio(self, audio_file: str | DecodedAudioStore) -> torch.Tensor:
+    """Decodes an audio file into a waveform suitable for the model.
+
+    Args:
+      audio_file: The path to the audio file or its decoded audio store.
+
+    Returns:
+      A tensor of shape (channels, samples) at the model sample rate.
+    """
+    if isinstance(audio_file, DecodedAudioStore):
+      return torch.from_numpy(np.array(self._get_store_samples(audio_file).T))
+    return AudioFile(audio_file).read(
+        streams=0,
+        samplerate=self.model.samplerate,
+        channels=self.model.audio_channels,
+    )
+
+  def get_duration(self, audio_file: str | DecodedAudioStore) -> float:
+    """Returns the duration of an audio file in seconds."""
+    if isinstance(audio_file, DecodedAudioStore):
+      return audio_file.duration
+    return AudioFile(audio_file).duration
+
+  def read_audio_windows(
+      self,
+      audio_file: str | DecodedAudioStore,
+      *,
+      window_seconds: float = _DEFAULT_WINDOW_SECONDS,
+      overlap_seconds: float = _DEFAULT_WINDOW_OVERLAP_SECONDS,
+  ) -> Iterator[torch.Tensor]:
+    """Decodes an audio file in consecutive, overlapping windows.
+
+    Only one window is decoded at a time, so the memory use doesn't depend on
+    the duration of the audio file.
+
+    Args:
+      audio_file: The path to the audio file or its decoded audio store.
+      window_seconds: The duration of each window.
+      overlap_seconds: By how much the consecutive windows overlap.
+
+    Yields:
+      Tensors of shape (channels, samples) at the model sample rate.
+
+    Raises:
+      ValueError: If the windows aren't longer than their overlap.
+    """
+    if window_seconds <= overlap_seconds:
+      raise ValueError(
+          "The window must be longer than the overlap. Got:"
+          f" {window_seconds} and {overlap_seconds} seconds."
+      )
+    window_samples = int(window_seconds * self.sample_rate)
+    overlap_samples = int(overlap_seconds * self.sample_rate)
+    total_samples = int(self.get_duration(audio_file) * self.sample_rate)
+    starts = range(
+        0,
+        max(total_samples - overlap_samples, 1),
+        window_samples - overlap_samples,
+    )
+    if isinstance(audio_file, DecodedAudioStore):
+      samples = self._get_store_samples(audio_file)
+      for start in starts:
+        yield torch.from_numpy(
+            np.array(samples[start : start + window_samples].T)
+        )
+      return
+    audio = AudioFile(audio_file)
+    for start in starts:
+      yield audio.read(
+          seek_time=start / self.sample_rate,
+          duration=window_samples / self.sample_rate,
+          streams=0,
+          samplerate=self.sample_rate,
+          channels=self.model.audio_channels,
+      )
+
+  def save_audio(self, waveform: torch.Tensor, audio_file: str) -> str:
+    """Encodes a waveform to an audio file.
+
+    Args:
+      waveform: A tensor of shape (channels, samples) at the model sample rate.
+      audio_file: The path to the output audio file.
+
+    Returns:
+      The path to the saved audio file.
+    """
+    save_audio(
+        waveform.cpu(),
+        audio_file,
+        samplerate=self.sample_rate,
+        bitrate=self.mp3_bitrate,
+        preset=self.mp3_preset,
+    )
+    return audio_file
+
+  def separate(
+      self, waveform: torch.Tensor
+  ) -> tuple[torch.Tensor, torch.Tensor]:
+    """Separates a waveform into the vocals and the background.
+
+    Args:
+      waveform: A tensor of shape (channels, samples) at the model sample rate.
+
+    Returns:
+      A tuple with the vocals and the background tensors, both of the same
+      shape as the input waveform.
+    """
+    reference = waveform.mean(0)
+    mean = reference.mean()
+    std = reference.std()
+    if not std > 0:
+      std = torch.ones_like(std)
+    normalized_waveform = (waveform - mean) / std
+    with torch.no_grad():
+      sources = apply_model(
+          self.model,
+          normalized_waveform[None],
+          device=self.device,
+          shifts=self.shifts,
+          split=self.split,
+          overlap=self.overlap,
+          num_workers=self.jobs,
+          segment=self.segment,
+      )[0]
+    sources = sources * std + mean
+    vocals = sources[self.model.sources.index(_VOCALS_STEM)]
+    background = sources.sum(dim=0) - vocals
+    return vocals, background
+
+  def separate_in_rounds(
+      self,
+      waveform: torch.Tensor,
+      *,
+      voice_separation_rounds: int = 1,
+      residual_vocals_threshold_db: float | None = (
+          DEFAULT_RESIDUAL_VOCALS_THRESHOLD_DB
+      ),
+  ) -> tuple[torch.Tensor, torch.Tensor]:
+    """Separates a waveform and refines the background in extra rounds.
+
+    After every round the vocals stem it returned is measured relative to the
+    background it left. Once that level falls below the threshold, the next
+    rounds would remove even less of the voice, so no more rounds are run.
+
+    Args:
+      waveform: A tensor of shape (channels, samples) at the model sample rate.
+      voice_separation_rounds: The maximum number of times to apply the
+        separation, counting the initial one.
+      residual_vocals_threshold_db: The level of the vocals a round separates,
+        in dB relative to the background, below which no more rounds are run.
+        None always runs all the rounds.
+
+    Returns:
+      A tuple with the vocals and the background tensors, both of the same
+      shape as the input waveform.
+    """
+    vocals, background = self.separate(waveform)
+    round_vocals = vocals
+    rounds = 1
+    while rounds < voice_separation_rounds:
+      if (
+          residual_vocals_threshold_db is not None
+          and measure_vocals_db(vocals=round_vocals, background=background)
+          < residual_vocals_threshold_db
+      ):
+        break
+      round_vocals, background = self.separate(background)
+      rounds += 1
+    logging.info(
+        f"Ran {rounds} out of {voice_separation_rounds} voice separation"
+        " rounds."
+    )
+    return vocals, background
+
+  def separate_regions(
+      self,
+      waveform: torch.Tensor,
+      *,
+      regions: Sequence[tuple[float, float]],
+      voice_separation_rounds: int = 1,
+      residual_vocals_threshold_db: float | None = (
+          DEFAULT_RESIDUAL_VOCALS_THRESHOLD_DB
+      ),
+      crossfade_seconds: float = _DEFAULT_SPEECH_CROSSFADE_SECONDS,
+  ) -> tuple[torch.Tensor, torch.Tensor]:
+    """Separates only the selected regions of a waveform.
+
+    Outside of the regions the vocals are silent and the background is the
+    original mix. At the region edges the separated tracks are crossfaded with
+    the original mix to avoid audible steps.
+
+    Args:
+      waveform: A tensor of shape (channels, samples) at the model sample rate.
+      regions: A sequence of non-overlapping (start, end) tuples in seconds.
+      voice_separation_rounds: The maximum number of times to apply the
+        separation to each region.
+      residual_vocals_threshold_db: The early stopping threshold of the
+        rounds, see `separate_in_rounds`. None always runs all the rounds.
+      crossfade_seconds: The duration of the crossfade at the region edges.
+
+    Returns:
+      A tuple with the vocals and the background tensors, both of the same
+      shape as the input waveform.
+    """
+    vocals = torch.zeros_like(waveform)
+    background = waveform.clone()
+    total_samples = waveform.shape[-1]
+    crossfade_samples = int(crossfade_seconds * self.sample_rate)
+    for start, end in regions:
+      start_sample = min(int(start * self.sample_rate), total_samples)
+      end_sample = min(int(end * self.sample_rate), total_samples)
+      if end_sample <= start_sample:
+        continue
+      segment = waveform[..., start_sample:end_sample]
+      segment_vocals, segment_background = self.separate_in_rounds(
+          segment,
+          voice_separation_rounds=voice_separation_rounds,
+          residual_vocals_threshold_db=residual_vocals_threshold_db,
+      )
+      weights = torch.ones(segment.shape[-1])
+      fade_samples = min(crossfade_samples, segment.shape[-1] // 2)
+      if fade_samples:
+        fade_in = torch.linspace(0.0, 1.0, fade_samples)
+        weights[:fade_samples] = fade_in
+        weights[-fade_samples:] = fade_in.flip(0)
+      vocals[..., start_sample:end_sample] = segment_vocals * weights
+      background[..., start_sample:end_sample] = (
+          segment_background * weights + segment * (1.0 - weights)
+      )
+    return vocals, background
+
+  def separate_file(
+      self,
+      *,
+      audio_file: str | DecodedAudioStore,
+      vocals_file: str,
+      background_file: str,
+  ) -> tuple[str, str]:
+    """Separates an audio file and saves the vocals and the background.
+
+    Args:
+      audio_file: The path to the input audio file or its decoded audio store.
+      vocals_file: The path to save the vocals to.
+      background_file: The path to save the background to.
+
+    Returns:
+      A tuple with the paths to the vocals and the background files.
+    """
+    vocals, background = self.separate(self.read_audio(audio_file))
+    self.save_audio(vocals, vocals_file)
+    self.save_audio(background, background_file)
+    return vocals_file, background_file
+
+  def separate_file_in_windows(
+      self,
+      *,
+      audio_file: str | DecodedAudioStore,
+      vocals_file: str,
+      background_file: str,
+      voice_separation_rounds: int = 1,
+      residual_vocals_threshold_db: float | None = (
+          DEFAULT_RESIDUAL_VOCALS_THRESHOLD_DB
+      ),
+      window_seconds: float = _DEFAULT_WINDOW_SECONDS,
+      overlap_seconds: float = _DEFAULT_WINDOW_OVERLAP_SECONDS,
+  ) -> tuple[str, str]:
+    """Separates a long audio file window by window with bounded memory.
+
+    Each window is separated on its own and stitched to the previous one with
+    a linear crossfade over the overlapping part. The stitched output is piped
+    into FFmpeg MP3 encoders as it's produced, so neither the memory nor the
+    temporary disk use grows with the input duration.
+
+    Args:
+      audio_file: The path to the input audio file or its decoded audio store.
+      vocals_file: The path to save the vocals to.
+      background_file: The path to save the background to.
+      voice_separation_rounds: The maximum number of times to apply the
+        separation to each window.
+      residual_vocals_threshold_db: The early stopping threshold of the
+        rounds, see `separate_in_rounds`. None always runs all the rounds.
+      window_seconds: The duration of each window.
+      overlap_seconds: By how much the consecutive windows overlap.
+
+    Returns:
+      A tuple with the paths to the vocals and the background files.
+
+    Raises:
+      ValueError: If the windows aren't longer than their overlap.
+      subprocess.CalledProcessError: If FFmpeg fails to encode a track.
+    """
+    overlap_samples = int(overlap_seconds * self.sample_rate)
+    encoders = [
+        _start_mp3_encoder(
+            output_file=output_file,
+            sample_rate=self.sample_rate,
+            channels=self.model.audio_channels,
+            bitrate=self.mp3_bitrate,
+        )
+        for output_file in (vocals_file, background_file)
+    ]
+    try:
+      previous_tail = None
+      for window in self.read_audio_windows(
+          audio_file,
+          window_seconds=window_seconds,
+          overlap_seconds=overlap_seconds,
+      ):
+        vocals, background = self.separate_in_rounds(
+            window,
+            voice_separation_rounds=voice_separation_rounds,
+            residual_vocals_threshold_db=residual_vocals_threshold_db,
+        )
+        stems = torch.stack([vocals, background])
+        if previous_tail is not None:
+          crossfade_samples = min(previous_tail.shape[-1], stems.shape[-1])
+          fade_in = torch.linspace(0.0, 1.0, crossfade_samples)
+          stems[..., :crossfade_samples] = (
+              previous_tail[..., :crossfade_samples] * (1.0 - fade_in)
+              + stems[..., :crossfade_samples] * fade_in
+          )
+        tail_start = max(stems.shape[-1] - overlap_samples, 0)
+        for encoder, stem in zip(encoders, stems[..., :tail_start]):
+          encoder.stdin.write(_waveform_to_pcm(stem))
+        previous_tail = stems[..., tail_start:]
+      if previous_tail is not None:
+        for encoder, stem in zip(encoders, previous_tail):
+          encoder.stdin.write(_waveform_to_pcm(stem))
+    except BaseException:
+      for encoder in encoders:
+        encoder.kill()
+      raise
+    finally:
+      for encoder in encoders:
+        encoder.stdin.close()
+        encoder.wait()
+    for encoder in encoders:
+      if encoder.returncode:
+        raise subprocess.CalledProcessError(encoder.returncode, encoder.args)
+    return vocals_file, background_file
+
+
+class SeparationCache:
+  """A persistent, size-bounded cache of the vocals and background separations.
+
+  Every entry is a directory named after a content key. It holds the vocals
+  and the background files and a metadata file with the entry size and the
+  time it was last used. When the cache grows above its maximum size, the least
+  recently used entries are removed.
+
+  Attributes:
+    cache_directory: The directory to store the cache entries in. It can be
+      local or on any file system supported by `tf.io.gfile`.
+    max_size_bytes: The maximum total size of the cached files.
+  """
+
+  def __init__(
+      self,
+      *,
+      cache_directory: str,
+      max_size_bytes: int = DEFAULT_SEPARATION_CACHE_SIZE_BYTES,
+  ) -> None:
+    """Initializes the SeparationCache.
+
+    Args:
+      cache_directory: The directory to store the cache entries in.
+      max_size_bytes: The maximum total size of the cached files.
+    """
+    self.cache_directory = cache_directory
+    self.max_size_bytes = max_size_bytes
+    tf.io.gfile.makedirs(cache_directory)
+
+  def make_key(
+      self,
+      *,
+      waveform: torch.Tensor | Iterable[torch.Tensor],
+      separator: DemucsSeparator,
+      voice_separation_rounds: int,
+      speech_regions: Sequence[tuple[float, float]] | None = None,
+      residual_vocals_threshold_db: float | None = None,
+      windows: tuple[float, float] | None = None,
+  ) -> str:
+    """Builds the cache key of a separation.
+
+    The key covers every setting that changes the cached files, including the
+    MP3 encoding, because the cache stores the encoded tracks.
+
+    Args:
+      waveform: The decoded input audio, either as one tensor or as
+        consecutive, non-overlapping blocks of it.
+      separator: The separator that would process the audio.
+      voice_separation_rounds: The number of the separation rounds.
+      speech_regions: The regions the separation is limited to, if any.
+      residual_vocals_threshold_db: The early stopping threshold of the
+        separation rounds, if any.
+      windows: The (window, overlap) durations in seconds of the windowed
+        long-form separation, or None if the audio is separated at once.
+
+    Returns:
+      A SHA-256 hex digest of the decoded audio and the separation settings.
+    """
+    hasher = hashlib.sha256()
+    blocks = [waveform] if isinstance(waveform, torch.Tensor) else waveform
+    for block in blocks:
+      hasher.update(np.ascontiguousarray(block.cpu().numpy().T).tobytes())
+    settings = dict(
+        model_name=separator.model_name,
+        sample_rate=separator.sample_rate,
+        shifts=separator.shifts,
+        overlap=separator.overlap,
+        split=separator.split,
+        segment=separator.segment,
+        mp3_bitrate=separator.mp3_bitrate,
+        mp3_preset=separator.mp3_preset,
+        voice_separation_rounds=voice_separation_rounds,
+        speech_regions=(
+            [list(region) for region in speech_regions]
+            if speech_regions is not None
+            else None
+        ),
+        residual_vocals_threshold_db=residual_vocals_threshold_db,
+        windows=list(windows) if windows is not None else None,
+    )
+    hasher.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+    return hasher.hexdigest()
+
+  def _entry_paths(self, key: str) -> tuple[str, str, str]:
+    """Returns the vocals, background and metadata paths of an entry."""
+    entry_directory = os.path.join(self.cache_directory, key)
+    return (
+        os.path.join(entry_directory, _VOCALS_FILE),
+        os.path.join(entry_directory, _BACKGROUND_FILE),
+        os.path.join(entry_directory, _CACHE_METADATA_FILE),
+    )
+
+  def _write_metadata(self, metadata_path: str, size_bytes: int) -> None:
+    """Writes the metadata of an entry with the current access time."""
+    with tf.io.gfile.GFile(metadata_path, "w") as metadata_file:
+      json.dump(
+          dict(size_bytes=size_bytes, last_accessed=time.time()),
+          metadata_file,
+      )
+
+  def get(self, *, key: str, vocals_file: str, background_file: str) -> bool:
+    """Copies a cached separation to the requested paths.
+
+    Args:
+      key: The cache key of the separation.
+      vocals_file: The path to copy the cached vocals to.
+      background_file: The path to copy the cached background to.
+
+    Returns:
+      True if the separation was found in the cache, False otherwise.
+    """
+    vocals_path, background_path, metadata_path = self._entry_paths(key)
+    if not tf.io.gfile.exists(metadata_path):
+      logging.info(f"Separation cache miss for the key {key}.")
+      return False
+    tf.io.gfile.copy(vocals_path, vocals_file, overwrite=True)
+    tf.io.gfile.copy(background_path, background_file, overwrite=True)
+    with tf.io.gfile.GFile(metadata_path, "r") as metadata_file:
+      size_bytes = json.load(metadata_file)["size_bytes"]
+    self._write_metadata(metadata_path, size_bytes)
+    logging.info(f"Separation cache hit for the key {key}.")
+    return True
+
+  def put(self, *, key: str, vocals_file: str, background_file: str) -> None:
+    """Stores a separation in the cache and evicts the stale entries.
+
+    Args:
+      key: The cache key of the separation.
+      vocals_file: The path to the vocals file.
+      background_file: The path to the background file.
+    """
+    vocals_path, background_path, metadata_path = self._entry_paths(key)
+    tf.io.gfile.makedirs(os.path.dirname(metadata_path))
+    tf.io.gfile.copy(vocals_file, vocals_path, overwrite=True)
+    tf.io.gfile.copy(background_file, background_path, overwrite=True)
+    size_bytes = (
+        tf.io.gfile.stat(vocals_path).length
+        + tf.io.gfile.stat(background_path).length
+    )
+    self._write_metadata(metadata_path, size_bytes)
+    self._evict(keep_key=key)
+
+  def _evict(self, *, keep_key: str) -> None:
+    """Removes the least recently used entries above the maximum size.
+
+    Args:
+      keep_key: The key of the entry that must not be evicted.
+    """
+    entries = []
+    for entry in tf.io.gfile.listdir(self.cache_directory):
+      key = entry.rstrip("/")
+      _, _, metadata_path = self._entry_paths(key)
+      if not tf.io.gfile.exists(metadata_path):
+        continue
+      with tf.io.gfile.GFile(metadata_path, "r") as metadata_file:
+        metadata = json.load(metadata_file)
+      entries.append((metadata["last_accessed"], metadata["size_bytes"], key))
+    total_size_bytes = sum(size_bytes for _, size_bytes, _ in entries)
+    for _, size_bytes, key in sorted(entries):
+      if total_size_bytes <= self.max_size_bytes:
+        break
+      if key == keep_key:
+        continue
+      tf.io.gfile.rmtree(os.path.join(self.cache_directory, key))
+      total_size_bytes -= size_bytes
+      logging.info(f"Evicted the key {key} from the separation cache.")
+
+
 def split_audio_track(
     audio_file: str,
     output_directory: str,
     device: str,
     voice_separation_rounds: int = 2,
+    separator: DemucsSeparator | None = None,
+    cache: SeparationCache | None = None,
+    long_form_threshold_seconds: float | None = (
+        _DEFAULT_LONG_FORM_THRESHOLD_SECONDS
+    ),
+    speech_regions: Sequence[tuple[float, float]] | None = None,
+    speech_padding_seconds: float = _DEFAULT_SPEECH_PADDING_SECONDS,
+    residual_vocals_threshold_db: float | None = (
+        DEFAULT_RESIDUAL_VOCALS_THRESHOLD_DB
+    ),
+    audio_store: DecodedAudioStore | None = None,
 ) -> tuple[str, str]:
   """Splits an audio track into vocal and non-vocal components, with optional iterative refinement.
 
   This function separates the vocals from the background music in an audio file.
   It first checks if the separated files already exist to avoid redundant
-  processing.
-  If not, it uses the `execute_vocal_non_vocals_split` function to perform the
+  processing. If not, it runs an in-process Demucs model to perform the
   initial separation.
 
   To further refine the separation, it can iteratively apply the voice
-  separation
-  process to the background track. This helps to remove any residual vocal
-  traces
-  from the background. Finally, it cleans up temporary files generated by
-  Demucs.
+  separation process to the background track. This helps to remove any
+  residual vocal traces from the background. The refinement rounds run on the
+  in-memory waveform, so the final tracks are encoded only once, and stop
+  early when a round separates almost no vocals from the background.
 
   Args:
     audio_file: The path to the input audio file.
     output_directory: The directory to store the separated audio files.
     device: The device to use for Demucs processing (e.g., "cuda" or "cpu").
-    voice_separation_rounds: The number of times to iteratively apply voice
-      separation to the background track (default is 2).
+    voice_separation_rounds: The maximum number of times to iteratively apply
+      voice separation to the background track (default is 2).
+    separator: The Demucs separator to reuse. A new one running on `device` is
+      created when not provided.
+    cache: An optional cache of the separations shared between the output
+      directories. It's keyed by the decoded audio and the separation settings.
+    long_form_threshold_seconds: The duration above which the audio is
+      separated in overlapping windows with bounded memory. None disables the
+      windowed separation.
+    speech_regions: An optional sequence of (start, end) tuples in seconds
+      with speech. When provided, only the padded speech regions are separated
+      and the original mix is used as the background elsewhere. It's ignored
+      for the long-form audio.
+    speech_padding_seconds: How much to extend each speech region on both
+      sides.
+    residual_vocals_threshold_db: The level of the vocals a separation round
+      removes, in dB relative to the background, below which no more rounds
+      are run. None always runs all the rounds.
+    audio_store: The decoded audio store of `audio_file`. When provided, the
+      audio is read from it instead of being decoded again.
 
   Returns:
     A tuple containing the paths to the separated audio files:
       - The path to the vocals audio file.
       - The path to the background audio file.
   """
-  demucs_command = build_demucs_command(
-      audio_file=audio_file,
-      output_directory=output_directory,
-      device=device,
-  )
-  audio_vocals_file, _ = assemble_split_audio_file_paths(command=demucs_command)
-  file_extension = os.path.splitext(audio_vocals_file)[1]
-  vocals_path = os.path.join(
-      output_directory, AUDIO_PROCESSING, f"vocals{file_extension}"
-  )
+  vocals_path = os.path.join(output_directory, AUDIO_PROCESSING, _VOCALS_FILE)
   background_path = os.path.join(
-      output_directory, AUDIO_PROCESSING, f"no_vocals{file_extension}"
+      output_directory, AUDIO_PROCESSING, _BACKGROUND_FILE
   )
   if tf.io.gfile.exists(vocals_path) and tf.io.gfile.exists(background_path):
     logging.info(
-        "The DEMUCS command will not be executed, because the expected files"
-        f" {vocals_path} and {background_path} already exist."
+        "The Demucs separation will not be executed, because the expected"
+        f" files {vocals_path} and {background_path} already exist."
     )
     return vocals_path, background_path
-  audio_vocals_file, audio_background_file = execute_vocals_non_vocals_split(
-      audio_file=audio_file, output_directory=output_directory, device=device
-  )
-  tf.io.gfile.copy(audio_vocals_file, vocals_path)
-  tf.io.gfile.copy(audio_background_file, background_path)
-  if voice_separation_rounds > 1:
-    for _ in range(1, voice_separation_rounds):
-      _, audio_background_file = execute_vocals_non_vocals_split(
-          audio_file=background_path,
-          output_directory=output_directory,
-          device=device,
-      )
-      tf.io.gfile.copy(audio_background_file, background_path, overwrite=True)
-  tf.io.gfile.rmtree(
-      os.path.join(output_directory, AUDIO_PROCESSING, "htdemucs")
+  if not separator:
+    separator = DemucsSeparator(device=device)
+  audio_source = audio_store if audio_store else audio_file
+  is_long_form = (
+      long_form_threshold_seconds is not None
+      and separator.get_duration(audio_source) > long_form_threshold_seconds
   )
+  waveform = None if is_long_form else separator.read_audio(audio_source)
+  if is_long_form or speech_regions is None:
+    padded_speech_regions = None
+  else:
+    padded_speech_regions = pad_speech_regions(
+        speech_regions, padding_seconds=speech_padding_seconds
+    )
+  if cache:
+    key = cache.make_key(
+        waveform=(
+            separator.read_audio_windows(audio_source, overlap_seconds=0.0)
+            if is_long_form
+            else waveform
+        ),
+        separator=separator,
+        voice_separation_rounds=voice_separation_rounds,
+        speech_regions=padded_speech_regions,
+        residual_vocals_threshold_db=residual_vocals_threshold_db,
+        windows=(
+            (_DEFAULT_WINDOW_SECONDS, _DEFAULT_WINDOW_OVERLAP_SECONDS)
+            if is_long_form
+            else None
+        ),
+    )
+    if cache.get(
+        key=key, vocals_file=vocals_path, background_file=background_path
+    ):
+      return vocals_path, background_path
+  if is_long_form:
+    logging.info(
+        f"The audio file {audio_file} is longer than"
+        f" {long_form_threshold_seconds} seconds and will be separated in"
+        " overlapping windows."
+    )
+    separator.separate_file_in_windows(
+        audio_file=audio_source,
+        vocals_file=vocals_path,
+        background_file=background_path,
+        voice_separation_rounds=voice_separation_rounds,
+        residual_vocals_threshold_db=residual_vocals_threshold_db,
+    )
+  else:
+    if padded_speech_regions is not None:
+      vocals, background = separator.separate_regions(
+          waveform,
+          regions=padded_speech_regions,
+          voice_separation_rounds=voice_separation_rounds,
+          residual_vocals_threshold_db=residual_vocals_threshold_db,
+      )
+    else:
+      vocals, background = separator.separate_in_rounds(
+          waveform,
+          voice_separation_rounds=voice_separation_rounds,
+          residual_vocals_threshold_db=residual_vocals_threshold_db,
+      )
+    separator.save_audio(vocals, vocals_path)
+    separator.save_audio(background, background_path)
+  if cache:
+    cache.put(key=key, vocals_file=vocals_path, background_file=background_path)
   return vocals_path, background_path
 
 
@@ -379,6 +1537,8 @@ def create_pyannote_timestamps(
     number_of_speakers: int,
     pipeline: Pipeline,
     device: str = "cpu",
+    audio_store: DecodedAudioStore | None = None,
+    keep_speaker_labels: bool = False,
 ) -> Sequence[Mapping[str, float]]:
   """Creates timestamps from a vocals file using Pyannote speaker diarization.
 
@@ -387,6 +1547,10 @@ def create_pyannote_timestamps(
       number_of_speakers: The number of speakers in the vocal audio file.
       pipeline: Pre-loaded Pyannote Pipeline object.
       device: The device to use during the process.
+      audio_store: The decoded audio store of `audio_file`. When provided, its
+        16 kHz mono view is passed to the pipeline in memory.
+      keep_speaker_labels: Whether to keep the PyAnnote speaker label of each
+        segment under the "speaker_label" key.
 
   Returns:
       A list of dictionaries containing start and end timestamps for each
@@ -399,11 +1563,16 @@ def create_pyannote_timestamps(
     )
   if device == "cuda":
     pipeline.to(torch.device("cuda"))
-  diarization = pipeline(audio_file, num_speakers=number_of_speakers)
-  utterance_metadata = [
-      {"start": segment.start, "end": segment.end}
-      for segment, _, _ in diarization.itertracks(yield_label=True)
-  ]
+  audio_input = (
+      audio_store.get_pyannote_input() if audio_store else audio_file
+  )
+  diarization = pipeline(audio_input, num_speakers=number_of_speakers)
+  utterance_metadata = []
+  for segment, _, label in diarization.itertracks(yield_label=True):
+    utterance = {"start": segment.start, "end": segment.end}
+    if keep_speaker_labels:
+      utterance["speaker_label"] = label
+    utterance_metadata.append(utterance)
   return utterance_metadata
 
 
@@ -442,9 +1611,89 @@ def merge_utterances(
   return merged_utterances
 
 
+def consolidate_utterances(
+    *,
+    utterance_metadata: Sequence[Mapping[str, str | float]],
+    maximum_gap: float = _DEFAULT_MAXIMUM_MERGE_GAP_SECONDS,
+    maximum_duration: float = _DEFAULT_MAXIMUM_UTTERANCE_SECONDS,
+) -> Sequence[Mapping[str, str | float]]:
+  """Merges adjacent utterances of the same speaker into longer ones.
+
+  Unlike `merge_utterances`, it bridges pauses of up to `maximum_gap` and
+  caps the merged duration, so the many sub-second PyAnnote segments become
+  fewer transcription, translation and text-to-speech calls. The runs of
+  mergeable segments are found on the start and end arrays at once, with the
+  running end time restarted at every speaker change, and each run is split
+  greedily with a binary search on the running end time of the current
+  merged utterance. The segments nested in a merged utterance are
+  always absorbed by it, so the merged utterances never contain one another.
+
+  Args:
+    utterance_metadata: A sequence of utterance metadata sorted by the start
+      time, each represented as a dictionary with keys: "start", "end" and
+      optionally "speaker_label". The segments with different speaker labels
+      are never merged.
+    maximum_gap: The maximum pause in seconds between two segments to merge.
+    maximum_duration: The maximum duration in seconds of a merged utterance.
+      A longer single segment is kept as it is.
+
+  Returns:
+    A list of merged utterance metadata. Each merged utterance is a copy of
+    its first segment with the end time of the last one.
+  """
+  if not utterance_metadata:
+    return []
+  starts = np.array([item["start"] for item in utterance_metadata])
+  ends = np.array([item["end"] for item in utterance_metadata])
+  labels = np.array(
+      [str(item.get("speaker_label")) for item in utterance_metadata]
+  )
+  label_changes = labels[1:] != labels[:-1]
+  running_ends = np.concatenate([
+      np.maximum.accumulate(label_ends)
+      for label_ends in np.split(ends, np.flatnonzero(label_changes) + 1)
+  ])
+  breaks = (starts[1:] - running_ends[:-1] > maximum_gap) | label_changes
+  run_starts = np.flatnonzero(np.concatenate([[True], breaks]))
+  run_ends = np.append(run_starts[1:], len(utterance_metadata))
+  merged_utterances = []
+  for run_start, run_end in zip(run_starts, run_ends):
+    first = run_start
+    while first < run_end:
+      utterance_ends = np.maximum.accumulate(ends[first:run_end])
+      count = max(
+          int(
+              np.searchsorted(
+                  utterance_ends,
+                  starts[first] + maximum_duration,
+                  side="right",
+              )
+          ),
+          1,
+      )
+      end = utterance_ends[count - 1]
+      count = int(np.searchsorted(utterance_ends, end, side="right"))
+      merged_utterance = dict(utterance_metadata[first])
+      merged_utterance["end"] = float(end)
+      merged_utterances.append(merged_utterance)
+      first += count
+  return merged_utterances
+
+
+def _get_chunk_path(
+    *,
+    utterance: Mapping[str, str | float],
+    prefix: str,
+    output_directory: str,
+) -> str:
+  """Returns the path of the audio chunk file of an utterance."""
+  chunk_filename = f"{prefix}_{utterance['start']}_{utterance['end']}.mp3"
+  return f"{output_directory}/{AUDIO_PROCESSING}/{chunk_filename}"
+
+
 def cut_and_save_audio(
     *,
-    audio: AudioSegment,
+    audio: AudioSegment | DecodedAudioStore,
     utterance: Mapping[str, str | float],
     prefix: str,
     output_directory: str,
@@ -452,7 +1701,8 @@ def cut_and_save_audio(
   """Cuts a specified segment from an audio file, saves it as an MP3, and returns the path of the saved file.
 
   Args:
-      audio: The audio file from which to extract the segment.
+      audio: The audio file from which to extract the segment, or its decoded
+        audio store.
       utterance: A dictionary containing the start and end times of the segment
         to be cut. - 'start': The start time of the segment in seconds. - 'end':
         The end time of the segment in seconds.
@@ -464,12 +1714,23 @@ def cut_and_save_audio(
   Returns:
       The path of the saved MP3 file.
   """
-  start_time_ms = int(utterance["start"] * 1000)
-  end_time_ms = int(utterance["end"] * 1000)
-  chunk = audio[start_time_ms:end_time_ms]
-  chunk_filename = f"{prefix}_{utterance['start']}_{utterance['end']}.mp3"
-  chunk_path = f"{output_directory}/{AUDIO_PROCESSING}/{chunk_filename}"
-  chunk.export(chunk_path, format="mp3")
+  chunk_path = _get_chunk_path(
+      utterance=utterance, prefix=prefix, output_directory=output_directory
+  )
+  if isinstance(audio, DecodedAudioStore):
+    audio_io.write_audio(
+        chunk_path,
+        audio.get_range(
+            audio.get_sample_range(
+                start=utterance["start"], end=utterance["end"]
+            )
+        ),
+        frame_rate=audio.sample_rate,
+    )
+  else:
+    start_time_ms = int(utterance["start"] * 1000)
+    end_time_ms = int(utterance["end"] * 1000)
+    audio_io.write_audio_segment(audio[start_time_ms:end_time_ms], chunk_path)
   return chunk_path
 
 
@@ -479,6 +1740,8 @@ def run_cut_and_save_audio(
     audio_file: str,
     output_directory: str,
     elevenlabs_clone_voices: bool = False,
+    audio_store: DecodedAudioStore | None = None,
+    virtual_chunks: bool = False,
 ) -> Sequence[Mapping[str, float]]:
   """Cuts an audio file into chunks based on provided time ranges and saves each chunk to a file.
 
@@ -490,46 +1753,99 @@ def run_cut_and_save_audio(
         saved.
       elevenlabs_clone_voices: Whether to clone source voices. It requires using
         ElevenLabs API.
+      audio_store: The decoded audio store of `audio_file`. When provided, the
+        chunks are cut from it instead of decoding the file again.
+      virtual_chunks: Whether to only reference the chunks as sample ranges
+        of `audio_store` under the 'sample_range' key instead of saving them.
+        The path is still added and the file is written on demand with
+        `materialize_utterance_chunk`.
 
   Returns:
       A list of dictionaries, each containing the path to the saved chunk, and
       the original start and end times.
-  """
 
-  audio = AudioSegment.from_file(audio_file)
+  Raises:
+      ValueError: When the virtual chunks are requested without an audio store.
+  """
+  if virtual_chunks and not audio_store:
+    raise ValueError("The virtual chunks require a decoded audio store.")
+  audio = (
+      audio_store if audio_store else audio_io.read_audio_segment(audio_file)
+  )
   key = "vocals_path" if elevenlabs_clone_voices else "path"
   prefix = "vocals_chunk" if elevenlabs_clone_voices else "chunk"
   updated_utterance_metadata = []
   for utterance in utterance_metadata:
-    if elevenlabs_clone_voices:
-      expected_chunk_filename = (
-          f"{prefix}_{utterance['start']}_{utterance['end']}.mp3"
-      )
-    else:
-      expected_chunk_filename = (
-          f"{prefix}_{utterance['start']}_{utterance['end']}.mp3"
-      )
-    chunk_path = (
-        f"{output_directory}/{AUDIO_PROCESSING}/{expected_chunk_filename}"
+    utterance_copy = utterance.copy()
+    chunk_path = _get_chunk_path(
+        utterance=utterance, prefix=prefix, output_directory=output_directory
     )
-    if not tf.io.gfile.exists(chunk_path):
+    if virtual_chunks:
+      utterance_copy["sample_range"] = audio_store.get_sample_range(
+          start=utterance["start"], end=utterance["end"]
+      )
+    elif not tf.io.gfile.exists(chunk_path):
       chunk_path = cut_and_save_audio(
           audio=audio,
           utterance=utterance,
           prefix=prefix,
           output_directory=output_directory,
       )
-    utterance_copy = utterance.copy()
     utterance_copy[key] = chunk_path
     updated_utterance_metadata.append(utterance_copy)
   return updated_utterance_metadata
 
 
+def _add_virtual_chunk(
+    *,
+    utterance: Mapping[str, str | float],
+    audio_store: DecodedAudioStore,
+    output_directory: str,
+) -> Mapping[str, str | float]:
+  """Returns a copy of an utterance referencing its chunk as a sample range."""
+  utterance_copy = utterance.copy()
+  utterance_copy["sample_range"] = audio_store.get_sample_range(
+      start=utterance["start"], end=utterance["end"]
+  )
+  utterance_copy["path"] = _get_chunk_path(
+      utterance=utterance, prefix="chunk", output_directory=output_directory
+  )
+  return utterance_copy
+
+
+def materialize_utterance_chunk(
+    *,
+    utterance: Mapping[str, str | float],
+    audio_store: DecodedAudioStore,
+) -> str:
+  """Saves the chunk file of a virtual utterance chunk if it's missing.
+
+  It's meant for the consumers that need an actual file, e.g. a preview.
+
+  Args:
+    utterance: The utterance with the "path" and "sample_range" keys.
+    audio_store: The decoded audio store the sample range refers to.
+
+  Returns:
+    The path to the chunk file.
+  """
+  chunk_path = utterance["path"]
+  if not tf.io.gfile.exists(chunk_path):
+    audio_io.write_audio(
+        chunk_path,
+        audio_store.get_range(utterance["sample_range"]),
+        frame_rate=audio_store.sample_rate,
+    )
+  return chunk_path
+
+
 def verify_added_audio_chunk(
     *,
     audio_file: str,
     utterance: Mapping[str, str | float],
     output_directory: str,
+    audio_store: DecodedAudioStore | None = None,
+    virtual_chunks: bool = False,
 ) -> Mapping[str, str | float]:
   """Verifies and processes a newly added audio chunk.
 
@@ -538,6 +1854,10 @@ def verify_added_audio_chunk(
       utterance: A dictionary describing the start and end times of the added
         chunk.
       output_directory: The directory to save the processed chunk(s).
+      audio_store: The decoded audio store of `audio_file`. When provided, the
+        chunk is cut from it instead of decoding the file again.
+      virtual_chunks: Whether to only reference the chunk as a sample range of
+        `audio_store` instead of saving it. It requires `audio_store`.
 
   Returns:
       A modified copy of the utterance dictionary with added paths to the saved
@@ -546,7 +1866,15 @@ def verify_added_audio_chunk(
         - 'vocals_path': The path to the saved vocals chunk (if
         `elevenlabs_clone_voices` is True).
   """
-  audio = AudioSegment.from_file(audio_file)
+  if virtual_chunks:
+    return _add_virtual_chunk(
+        utterance=utterance,
+        audio_store=audio_store,
+        output_directory=output_directory,
+    )
+  audio = (
+      audio_store if audio_store else audio_io.read_audio_segment(audio_file)
+  )
   utterance_copy = utterance.copy()
   chunk_path = cut_and_save_audio(
       audio=audio,
@@ -563,6 +1891,8 @@ def verify_modified_audio_chunk(
     audio_file: str,
     utterance: Mapping[str, str | float],
     output_directory: str,
+    audio_store: DecodedAudioStore | None = None,
+    virtual_chunks: bool = False,
 ) -> Mapping[str, str | float]:
   """Verifies and reprocesses a potentially modified audio chunk, potentially including isolated vocals.
 
@@ -571,6 +1901,10 @@ def verify_modified_audio_chunk(
       utterance: A dictionary describing the start and end times of the modified
         chunk and its expected paths.
       output_directory: The directory to save the processed chunk(s).
+      audio_store: The decoded audio store of `audio_file`. When provided, the
+        chunk is cut from it instead of decoding the file again.
+      virtual_chunks: Whether to only reference the chunk as a sample range of
+        `audio_store` instead of saving it. It requires `audio_store`.
 
   Returns:
       A modified copy of the utterance dictionary with potentially updated paths
@@ -580,12 +1914,21 @@ def verify_modified_audio_chunk(
         - 'vocals_path': The updated path to the saved vocals chunk (if
         `elevenlabs_clone_voices` is True and it was modified).
   """
-  audio = AudioSegment.from_file(audio_file)
   utterance_copy = utterance.copy()
   expected_chunk_path = f"chunk_{utterance['start']}_{utterance['end']}.mp3"
   actual_chunk_path = utterance_copy["path"]
   if expected_chunk_path != actual_chunk_path:
-    tf.io.gfile.remove(actual_chunk_path)
+    if not virtual_chunks or tf.io.gfile.exists(actual_chunk_path):
+      tf.io.gfile.remove(actual_chunk_path)
+    if virtual_chunks:
+      return _add_virtual_chunk(
+          utterance=utterance,
+          audio_store=audio_store,
+          output_directory=output_directory,
+      )
+    audio = (
+        audio_store if audio_store else audio_io.read_audio_segment(audio_file)
+    )
     chunk_path = cut_and_save_audio(
         audio=audio,
         utterance=utterance,
@@ -596,14 +1939,562 @@ def verify_modified_audio_chunk(
   return utterance_copy
 
 
+def audio_segment_to_array(
+    audio: AudioSegment,
+    *,
+    frame_rate: int | None = None,
+    channels: int | None = None,
+) -> np.ndarray:
+  """Converts an AudioSegment to a float32 array.
+
+  Args:
+    audio: The audio to convert.
+    frame_rate: The frame rate to resample the audio to. The original one is
+      kept when not provided.
+    channels: The number of channels to convert the audio to. The original
+      number is kept when not provided.
+
+  Returns:
+    An array of shape (samples, channels) with values in the [-1, 1] range.
+  """
+  if frame_rate:
+    audio = audio.set_frame_rate(frame_rate)
+  if channels:
+    audio = audio.set_channels(channels)
+  samples = np.array(audio.get_array_of_samples(), dtype=np.float32)
+  samples /= 1 << (8 * audio.sample_width - 1)
+  return samples.reshape(-1, audio.channels)
+
+
+def array_to_audio_segment(
+    samples: np.ndarray, *, frame_rate: int
+) -> AudioSegment:
+  """Converts a float array to a 16-bit AudioSegment.
+
+  Args:
+    samples: An array of shape (samples, channels) with values in the [-1, 1]
+      range. The values outside of the range are clipped.
+    frame_rate: The frame rate of the samples.
+
+  Returns:
+    The AudioSegment with the samples.
+  """
+  pcm_samples = np.clip(samples, -1.0, 1.0) * np.iinfo(np.int16).max
+  return AudioSegment(
+      np.round(pcm_samples).astype(np.int16).tobytes(),
+      frame_rate=frame_rate,
+      sample_width=_PCM_SAMPLE_WIDTH,
+      channels=samples.shape[1],
+  )
+
+
+class AudioMixer:
+  """Mixes audio chunks into one preallocated float32 timeline.
+
+  The chunks are added in place at their sample offsets, so the cost of
+  mixing depends only on the chunk lengths and not on the timeline length.
+
+  Attributes:
+    frame_rate: The frame rate of the timeline.
+    channels: The number of channels of the timeline.
+    timeline: The float32 array of shape (samples, channels) with the mix.
+  """
+
+  def __init__(
+      self,
+      *,
+      duration_seconds: float,
+      frame_rate: int = _DEFAULT_RATE,
+      channels: int = 2,
+  ) -> None:
+    """Initializes the AudioMixer with a silent timeline.
+
+    Args:
+      duration_seconds: The duration of the timeline.
+      frame_rate: The frame rate of the timeline.
+      channels: The number of channels of the timeline.
+    """
+    self.frame_rate = int(frame_rate)
+    self.channels = channels
+    self.timeline = np.zeros(
+        (round(duration_seconds * self.frame_rate), channels), dtype=np.float32
+    )
+
+  def add(
+      self, samples: np.ndarray, *, start: float, gain_factor: float = 1.0
+  ) -> None:
+    """Adds samples to the timeline in place.
+
+    The part of the samples that doesn't fit in the timeline is dropped.
+
+    Args:
+      samples: An array of shape (samples, channels) at the timeline frame
+        rate.
+      start: The position of the samples on the timeline in seconds.
+      gain_factor: The linear gain factor to apply to the samples.
+    """
+    start_sample = round(start * self.frame_rate)
+    end_sample = min(start_sample + len(samples), len(self.timeline))
+    if end_sample <= start_sample:
+      return
+    chunk = samples[: end_sample - start_sample]
+    if gain_factor != 1.0:
+      chunk = chunk * np.float32(gain_factor)
+    self.timeline[start_sample:end_sample] += chunk
+
+  def conform(self, samples: np.ndarray, *, frame_rate: int) -> np.ndarray:
+    """Converts samples to the frame rate and channels of the timeline.
+
+    Args:
+      samples: An array of shape (samples, channels).
+      frame_rate: The frame rate of the samples.
+
+    Returns:
+      An array of shape (samples, channels) in the timeline format.
+    """
+    if frame_rate != self.frame_rate:
+      divisor = math.gcd(frame_rate, self.frame_rate)
+      samples = signal.resample_poly(
+          samples, self.frame_rate // divisor, frame_rate // divisor, axis=0
+      ).astype(np.float32)
+    if samples.shape[1] != self.channels:
+      samples = np.repeat(
+          samples.mean(axis=1, keepdims=True), self.channels, axis=1
+      )
+    return samples
+
+  def add_audio_segment(
+      self, audio: AudioSegment, *, start: float, gain_factor: float = 1.0
+  ) -> None:
+    """Adds an AudioSegment to the timeline in place.
+
+    Args:
+      audio: The audio to add. It's converted to the timeline format first.
+      start: The position of the audio on the timeline in seconds.
+      gain_factor: The linear gain factor to apply to the audio.
+    """
+    self.add(
+        audio_segment_to_array(
+            audio, frame_rate=self.frame_rate, channels=self.channels
+        ),
+        start=start,
+        gain_factor=gain_factor,
+    )
+
+  def apply_gain(self, gain_db: float) -> None:
+    """Applies a gain to the whole timeline in place.
+
+    Args:
+      gain_db: The gain in dB.
+    """
+    if gain_db:
+      self.timeline *= np.float32(10 ** (gain_db / 20))
+
+  def normalize(
+      self, *, headroom_db: float = _DEFAULT_NORMALIZATION_HEADROOM_DB
+  ) -> None:
+    """Scales the timeline in place so that its peak is at -headroom dBFS.
+
+    Args:
+      headroom_db: How far below the full scale the peak should be.
+    """
+    peak = np.abs(self.timeline).max(initial=0.0)
+    if peak:
+      self.timeline *= np.float32(10 ** (-headroom_db / 20) / peak)
+
+  def to_audio_segment(self) -> AudioSegment:
+    """Returns the timeline as an AudioSegment."""
+    return array_to_audio_segment(self.timeline, frame_rate=self.frame_rate)
+
+  def export(self, output_file: str, *, format: str = "mp3") -> str:
+    """Encodes the timeline to an audio file.
+
+    Args:
+      output_file: The path to the output audio file.
+      format: The format of the output audio file.
+
+    Returns:
+      The path to the output audio file.
+    """
+    audio_io.write_audio(
+        output_file, self.timeline, frame_rate=self.frame_rate, format=format
+    )
+    return output_file
+
+
+def _read_source_chunk(
+    *,
+    utterance: Mapping[str, str | float],
+    audio_store: DecodedAudioStore | None,
+    frame_rate: int,
+    channels: int,
+) -> np.ndarray:
+  """Reads the original audio chunk of an utterance in the timeline format.
+
+  The virtual chunks are read from the decoded audio store and the other ones
+  from their chunk files.
+
+  Args:
+    utterance: The utterance with the "path" and optionally the
+      "sample_range" keys.
+    audio_store: The decoded audio store the sample ranges refer to.
+    frame_rate: The frame rate of the timeline.
+    channels: The number of channels of the timeline.
+
+  Returns:
+    An array of shape (samples, channels).
+  """
+  if not audio_store or "sample_range" not in utterance:
+    return audio_io.read_audio(
+        utterance["path"], frame_rate=frame_rate, channels=channels
+    )[0]
+  samples = audio_store.get_range(
+      utterance["sample_range"],
+      sample_rate=frame_rate,
+      channels=1 if channels == 1 else None,
+  )
+  if samples.shape[1] != channels:
+    samples = np.repeat(samples.mean(axis=1, keepdims=True), channels, axis=1)
+  return samples
+
+
+def _get_contribution_key(
+    utterance: Mapping[str, str | float],
+    *,
+    audio_store: DecodedAudioStore | None,
+) -> str:
+  """Fingerprints what an utterance contributes to the vocals timeline.
+
+  Args:
+    utterance: The utterance with the "start", "for_dubbing", "path" and
+      "dubbed_path" keys.
+    audio_store: The decoded audio store to read the virtual chunks from.
+
+  Returns:
+    A SHA-256 hex digest of the position and the source audio of the
+    utterance. The source files, including the decoded audio of the virtual
+    chunks, are identified by their size and modification time, so a
+    re-dubbed chunk or a re-created source audio gets a new key.
+  """
+  properties = dict(start=utterance["start"], for_dubbing=False)
+  if utterance["for_dubbing"]:
+    properties.update(for_dubbing=True, audio_file=utterance["dubbed_path"])
+  elif audio_store and "sample_range" in utterance:
+    properties.update(
+        audio_file=audio_store.audio_file,
+        sample_range=list(utterance["sample_range"]),
+    )
+  else:
+    properties.update(audio_file=utterance["path"])
+  stat = tf.io.gfile.stat(properties["audio_file"])
+  properties.update(size=stat.length, modified=stat.mtime_nsec)
+  return hashlib.sha256(
+      json.dumps(properties, sort_keys=True).encode("utf-8")
+  ).hexdigest()
+
+
+class VocalsMixCache:
+  """Keeps the dubbed vocals timeline between the postprocessing runs.
+
+  The timeline is stored before the peak normalization together with an index
+  of the sample ranges each utterance contributed to. When only some
+  utterances change, the ranges of their old and new contributions are
+  cleared and mixed again, instead of decoding and measuring every chunk.
+
+  Attributes:
+    cache_directory: The directory with the cached timeline and its index.
+  """
+
+  def __init__(self, *, cache_directory: str) -> None:
+    """Initializes the VocalsMixCache.
+
+    Args:
+      cache_directory: The directory to store the timeline and its index in.
+    """
+    self.cache_directory = cache_directory
+
+  def _paths(self) -> tuple[str, str]:
+    """Returns the paths to the timeline and the index files."""
+    return (
+        os.path.join(self.cache_directory, _VOCALS_MIX_TIMELINE_FILE),
+        os.path.join(self.cache_directory, _VOCALS_MIX_INDEX_FILE),
+    )
+
+  def load(
+      self, *, timeline_format: Mapping[str, int | float]
+  ) -> tuple[np.ndarray, dict[str, list[int]]] | None:
+    """Loads the cached timeline if it has the requested format.
+
+    Args:
+      timeline_format: The frame rate, the number of channels and the number
+        of samples of the timeline and the target loudness of the chunks.
+
+    Returns:
+      A tuple with the timeline and a mapping from the contribution keys to
+      their [start, end) sample ranges, or None if nothing usable is cached.
+    """
+    timeline_path, index_path = self._paths()
+    if not tf.io.gfile.exists(index_path) or not os.path.exists(
+        timeline_path
+    ):
+      return None
+    with tf.io.gfile.GFile(index_path, "r") as index_file:
+      index = json.load(index_file)
+    if index["format"] != dict(timeline_format):
+      logging.info("The cached vocals timeline has a different format.")
+      return None
+    return np.load(timeline_path), index["contributions"]
+
+  def save(
+      self,
+      *,
+      timeline: np.ndarray,
+      timeline_format: Mapping[str, int | float],
+      contributions: Mapping[str, Sequence[int]],
+  ) -> None:
+    """Stores the timeline and its index.
+
+    Args:
+      timeline: The vocals timeline before the peak normalization.
+      timeline_format: The format the timeline was mixed in.
+      contributions: A mapping from the contribution keys to their [start,
+        end) sample ranges.
+    """
+    timeline_path, index_path = self._paths()
+    tf.io.gfile.makedirs(self.cache_directory)
+    temporary_path = f"{timeline_path}.tmp"
+    with open(temporary_path, "wb") as timeline_file:
+      np.save(timeline_file, timeline)
+    os.replace(temporary_path, timeline_path)
+    with tf.io.gfile.GFile(index_path, "w") as index_file:
+      json.dump(
+          dict(
+              format=dict(timeline_format),
+              contributions={
+                  key: list(sample_range)
+                  for key, sample_range in contributions.items()
+              },
+          ),
+          index_file,
+      )
+
+
+def _read_vocals_contributions(
+    utterance_metadata: Sequence[Mapping[str, str | float]],
+    *,
+    mixer: AudioMixer,
+    audio_store: DecodedAudioStore | None,
+) -> list[tuple[float, np.ndarray, float]]:
+  """Reads the audio the utterances contribute to the vocals timeline.
+
+  Args:
+    utterance_metadata: A sequence of utterance metadata with the "start",
+      "for_dubbing", "path" and "dubbed_path" keys.
+    mixer: The mixer defining the timeline format.
+    audio_store: The decoded audio store to read the virtual chunks from.
+
+  Returns:
+    A list with a (start, samples, gain) tuple per utterance. The dubbed
+    chunks get the gains normalizing their loudness.
+  """
+  contributions = [None] * len(utterance_metadata)
+  dubbed_chunks = []
+  for index, item in enumerate(utterance_metadata):
+    if not item["for_dubbing"]:
+      contributions[index] = (
+          item["start"],
+          _read_source_chunk(
+              utterance=item,
+              audio_store=audio_store,
+              frame_rate=mixer.frame_rate,
+              channels=mixer.channels,
+          ),
+          1.0,
+      )
+    else:
+      dubbed_chunks.append((index, *audio_io.read_audio(item["dubbed_path"])))
+  gains = loudness.normalization_gains(
+      [(samples, rate) for _, samples, rate in dubbed_chunks],
+      target_lufs=_TARGET_LUFS,
+  )
+  for (index, samples, rate), gain in zip(dubbed_chunks, gains):
+    contributions[index] = (
+        utterance_metadata[index]["start"],
+        mixer.conform(samples, frame_rate=rate),
+        gain,
+    )
+  return contributions
+
+
+def _update_cached_vocals(
+    *,
+    mixer: AudioMixer,
+    utterance_metadata: Sequence[Mapping[str, str | float]],
+    audio_store: DecodedAudioStore | None,
+    mix_cache: VocalsMixCache,
+) -> None:
+  """Mixes only the changed utterances into the cached vocals timeline.
+
+  The samples covered by the removed and the added contributions are cleared
+  and the unchanged contributions overlapping them are added there again, so
+  the result is the same as mixing every utterance from scratch.
+
+  Args:
+    mixer: The mixer to set the updated timeline to.
+    utterance_metadata: A sequence of utterance metadata with the "start",
+      "for_dubbing", "path" and "dubbed_path" keys.
+    audio_store: The decoded audio store to read the virtual chunks from.
+    mix_cache: The cache with the timeline of the previous run.
+  """
+  timeline_format = dict(
+      frame_rate=mixer.frame_rate,
+      channels=mixer.channels,
+      samples=len(mixer.timeline),
+      target_lufs=_TARGET_LUFS,
+  )
+  keys = []
+  key_counts = collections.Counter()
+  for item in utterance_metadata:
+    key = _get_contribution_key(item, audio_store=audio_store)
+    keys.append(f"{key}-{key_counts[key]}")
+    key_counts[key] += 1
+  current_keys = set(keys)
+  cached_contributions = {}
+  cached_timeline = mix_cache.load(timeline_format=timeline_format)
+  if cached_timeline:
+    mixer.timeline, cached_contributions = cached_timeline
+  added_indices = [
+      index for index, key in enumerate(keys) if key not in cached_contributions
+  ]
+  removed_ranges = [
+      sample_range
+      for key, sample_range in cached_contributions.items()
+      if key not in current_keys
+  ]
+  if not added_indices and not removed_ranges:
+    logging.info("Reusing the cached dubbed vocals timeline.")
+    return
+  logging.info(
+      f"Mixing {len(added_indices)} changed utterance(s) into the dubbed"
+      " vocals timeline."
+  )
+  added_contributions = _read_vocals_contributions(
+      [utterance_metadata[index] for index in added_indices],
+      mixer=mixer,
+      audio_store=audio_store,
+  )
+  contributions = {
+      key: cached_contributions[key]
+      for key in keys
+      if key in cached_contributions
+  }
+  cleared = np.zeros(len(mixer.timeline), dtype=bool)
+  for start_sample, end_sample in removed_ranges:
+    cleared[start_sample:end_sample] = True
+  for index, (start, samples, _) in zip(added_indices, added_contributions):
+    start_sample = round(start * mixer.frame_rate)
+    end_sample = min(start_sample + len(samples), len(mixer.timeline))
+    contributions[keys[index]] = [start_sample, max(start_sample, end_sample)]
+    cleared[start_sample:end_sample] = True
+  mixer.timeline[cleared] = 0.0
+  overlapping_indices = [
+      index
+      for index, key in enumerate(keys)
+      if key in cached_contributions
+      and cleared[slice(*cached_contributions[key])].any()
+  ]
+  overlapping_contributions = _read_vocals_contributions(
+      [utterance_metadata[index] for index in overlapping_indices],
+      mixer=mixer,
+      audio_store=audio_store,
+  )
+  for index, (_, samples, gain) in zip(
+      overlapping_indices, overlapping_contributions
+  ):
+    start_sample, end_sample = contributions[keys[index]]
+    mask = cleared[start_sample:end_sample]
+    mixer.timeline[start_sample:end_sample][mask] += (
+        samples[: end_sample - start_sample][mask] * np.float32(gain)
+    )
+  for start, samples, gain in added_contributions:
+    mixer.add(samples, start=start, gain_factor=gain)
+  mix_cache.save(
+      timeline=mixer.timeline,
+      timeline_format=timeline_format,
+      contributions=contributions,
+  )
+
+
+def _mix_dubbed_vocals(
+    *,
+    utterance_metadata: Sequence[Mapping[str, str | float]],
+    background: np.ndarray,
+    frame_rate: int,
+    audio_store: DecodedAudioStore | None = None,
+    mix_cache: VocalsMixCache | None = None,
+) -> AudioMixer:
+  """Mixes the dubbed vocals timeline in the background audio format.
+
+  Args:
+    utterance_metadata: A sequence of utterance metadata with the "start",
+      "for_dubbing", "path" and "dubbed_path" keys.
+    background: The background samples of shape (samples, channels) defining
+      the timeline format.
+    frame_rate: The frame rate of the background.
+    audio_store: The decoded audio store to read the virtual chunks from.
+    mix_cache: The cache of the vocals timeline. When provided, only the
+      utterances changed since the previous run are mixed again.
+
+  Returns:
+    The mixer with the peak-normalized dubbed vocals.
+  """
+  mixer = AudioMixer(
+      duration_seconds=len(background) / frame_rate,
+      frame_rate=frame_rate,
+      channels=background.shape[1],
+  )
+  if mix_cache:
+    _update_cached_vocals(
+        mixer=mixer,
+        utterance_metadata=utterance_metadata,
+        audio_store=audio_store,
+        mix_cache=mix_cache,
+    )
+  else:
+    for start, samples, gain in _read_vocals_contributions(
+        utterance_metadata, mixer=mixer, audio_store=audio_store
+    ):
+      mixer.add(samples, start=start, gain_factor=gain)
+  mixer.normalize()
+  return mixer
+
+
+def _get_dubbed_audio_file(
+    *, output_directory: str, target_language: str
+) -> str:
+  """Returns the path to the final dubbed audio file for a language."""
+  target_language_suffix = "_" + target_language.replace("-", "_").lower()
+  return os.path.join(
+      output_directory,
+      _OUTPUT,
+      _DEFAULT_DUBBED_AUDIO_FILE
+      + target_language_suffix
+      + _DEFAULT_OUTPUT_FORMAT,
+  )
+
+
 def insert_audio_at_timestamps(
     *,
     utterance_metadata: Sequence[Mapping[str, str | float]],
     background_audio_file: str,
     output_directory: str,
+    audio_store: DecodedAudioStore | None = None,
 ) -> str:
   """Inserts audio chunks into a background audio track at specified timestamps.
 
+  The chunks are mixed into one preallocated timeline in the background audio
+  format and the result is encoded once.
+
   Args:
     utterance_metadata: A sequence of utterance metadata, each represented as a
       dictionary with keys: "text", "start", "end", "speaker_id", "ssml_gender",
@@ -611,50 +2502,23 @@ def insert_audio_at_timestamps(
       optionally "vocals_path".
     background_audio_file: Path to the background audio file.
     output_directory: Path to save the output audio file.
+    audio_store: The decoded audio store to read the virtual chunks from.
 
   Returns:
     The path to the output audio file.
   """
 
-  background_audio = AudioSegment.from_mp3(background_audio_file)
-  total_duration = background_audio.duration_seconds
-  output_audio = AudioSegment.silent(duration=total_duration * 1000)
-  meter = Meter(rate=_DEFAULT_RATE)
-  for item in utterance_metadata:
-    start_time = int(item["start"] * 1000)
-    if not item["for_dubbing"]:
-      audio_chunk = AudioSegment.from_mp3(item["path"])
-    else:
-      audio_chunk = AudioSegment.from_mp3(item["dubbed_path"])
-      if len(audio_chunk) < _MIN_BLOCK_SIZE_MS:
-        logging.error(
-            f"The dubbed chunk duaration is less than {_MIN_BLOCK_SIZE_MS}."
-            f" Silent padding of {_MIN_BLOCK_SIZE_MS} will be added to"
-            " normalize the volume."
-        )
-        padding_duration = _MIN_BLOCK_SIZE_MS - len(audio_chunk)
-        audio_chunk += AudioSegment.silent(duration=padding_duration)
-      try:
-        samples = np.array(audio_chunk.get_array_of_samples())
-        samples = samples.astype(np.float32) / np.iinfo(samples.dtype).max
-        loudness = meter.integrated_loudness(samples)
-        loudness_difference = _TARGET_LUFS - loudness
-        audio_chunk = audio_chunk.apply_gain(loudness_difference)
-      except ValueError:
-        logging.error(
-            "Dubbed chunk volume could not be normalized. The orginial volume"
-            " is used."
-        )
-        pass
-    output_audio = output_audio.overlay(
-        audio_chunk, position=start_time, loop=False
-    )
+  background, frame_rate = audio_io.read_audio(background_audio_file)
+  mixer = _mix_dubbed_vocals(
+      utterance_metadata=utterance_metadata,
+      background=background,
+      frame_rate=frame_rate,
+      audio_store=audio_store,
+  )
   dubbed_vocals_audio_file = os.path.join(
       output_directory, AUDIO_PROCESSING, _DEFAULT_DUBBED_VOCALS_AUDIO_FILE
   )
-  output_audio = output_audio.normalize()
-  output_audio.export(dubbed_vocals_audio_file, format="mp3")
-  return dubbed_vocals_audio_file
+  return mixer.export(dubbed_vocals_audio_file, format="mp3")
 
 
 def merge_background_and_vocals(
@@ -684,22 +2548,90 @@ def merge_background_and_vocals(
     background audio.
   """
 
-  background = AudioSegment.from_mp3(background_audio_file)
-  vocals = AudioSegment.from_mp3(dubbed_vocals_audio_file)
+  background = audio_io.read_audio_segment(background_audio_file)
+  vocals = audio_io.read_audio_segment(dubbed_vocals_audio_file)
   background = background + background_volume_adjustment
   vocals = vocals + vocals_volume_adjustment
   shortest_length = min(len(background), len(vocals))
   background = background[:shortest_length]
   vocals = vocals[:shortest_length]
   mixed_audio = background.overlay(vocals)
-  target_language_suffix = "_" + target_language.replace("-", "_").lower()
-  dubbed_audio_file = os.path.join(
-      output_directory,
-      _OUTPUT,
-      _DEFAULT_DUBBED_AUDIO_FILE
-      + target_language_suffix
-      + _DEFAULT_OUTPUT_FORMAT,
+  dubbed_audio_file = _get_dubbed_audio_file(
+      output_directory=output_directory, target_language=target_language
   )
   mixed_audio.normalize()
-  mixed_audio.export(dubbed_audio_file, format="mp3")
+  audio_io.write_audio_segment(mixed_audio, dubbed_audio_file)
   return dubbed_audio_file
+
+
+def mix_dubbed_audio(
+    *,
+    utterance_metadata: Sequence[Mapping[str, str | float]],
+    background_audio_file: str,
+    output_directory: str,
+    target_language: str,
+    vocals_volume_adjustment: float = 5.0,
+    background_volume_adjustment: float = 0.0,
+    save_dubbed_vocals: bool = False,
+    audio_store: DecodedAudioStore | None = None,
+    mix_cache: VocalsMixCache | None = None,
+) -> str:
+  """Mixes the dubbed utterances with the background in one in-memory pass.
+
+  It fuses `insert_audio_at_timestamps` and `merge_background_and_vocals`. The
+  dubbed vocals timeline is mixed with the decoded background directly, the
+  volume adjustments and the normalization are applied to the same buffer and
+  only the final audio is encoded.
+
+  Args:
+    utterance_metadata: A sequence of utterance metadata, each represented as a
+      dictionary with keys: "text", "start", "end", "speaker_id", "ssml_gender",
+      "translated_text", "assigned_google_voice", "for_dubbing", "path" and
+      optionally "vocals_path".
+    background_audio_file: Path to the background audio file.
+    output_directory: Path to the output directory.
+    target_language: The language to dub the ad into. It must be ISO 3166-1
+      alpha-2 country code.
+    vocals_volume_adjustment: By how much the vocals audio volume should be
+      adjusted.
+    background_volume_adjustment: By how much the background audio volume
+      should be adjusted.
+    save_dubbed_vocals: Whether to also save the dubbed vocals alone.
+    audio_store: The decoded audio store to read the virtual chunks from.
+    mix_cache: The cache of the dubbed vocals timeline. When provided, only
+      the utterances changed since the previous run are decoded and mixed.
+
+  Returns:
+    The path to the output audio file with merged dubbed vocals and original
+    background audio.
+  """
+  background, frame_rate = audio_io.read_audio(background_audio_file)
+  mixer = _mix_dubbed_vocals(
+      utterance_metadata=utterance_metadata,
+      background=background,
+      frame_rate=frame_rate,
+      audio_store=audio_store,
+      mix_cache=mix_cache,
+  )
+  if save_dubbed_vocals:
+    mixer.export(
+        os.path.join(
+            output_directory,
+            AUDIO_PROCESSING,
+            _DEFAULT_DUBBED_VOCALS_AUDIO_FILE,
+        ),
+        format="mp3",
+    )
+  mixer.apply_gain(vocals_volume_adjustment)
+  mixer.add(
+      background,
+      start=0.0,
+      gain_factor=10 ** (background_volume_adjustment / 20),
+  )
+  mixer.normalize()
+  return mixer.export(
+      _get_dubbed_audio_file(
+          output_directory=output_directory, target_language=target_language
+      ),
+      format="mp3",
+  )
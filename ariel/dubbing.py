@@ -64,6 +64,7 @@ _EXPECTED_ELEVENLABS_ENVIRONMENTAL_VARIABLE_NAME: Final[str] = (
 _DEFAULT_PYANNOTE_MODEL: Final[str] = "pyannote/speaker-diarization-3.1"
 _DEFAULT_ELEVENLABS_MODEL: Final[str] = "eleven_multilingual_v2"
 _DEFAULT_TRANSCRIPTION_MODEL: Final[str] = "large-v3"
+_DEFAULT_TRANSCRIPTION_BEAM_SIZE: Final[int] = 5
 _DEFAULT_GEMINI_MODEL: Final[str] = "gemini-1.5-flash"
 _DEFAULT_GEMINI_TEMPERATURE: Final[float] = 1.0
 _DEFAULT_GEMINI_TOP_P: Final[float] = 0.95
@@ -95,6 +96,10 @@ _NUMBER_OF_STEPS_DUB_AD_WITH_UTTERANCE_METADATA: Final[int] = 3
 _NUMBER_OF_STEPS_DUB_AD_WITH_DIFFERENT_LANGUAGE: Final[int] = 4
 _NUMBER_OF_STEPS_DUB_AD_FROM_SCRIPT: Final[int] = 3
 _MAX_GEMINI_RETRIES: Final[int] = 5
+_DIARIZATION_MODES: Final[tuple[str, str]] = ("gemini", "local")
+_MINIMUM_LOCAL_DIARIZATION_CONFIDENCE: Final[float] = 0.5
+_DIARIZATION_SAMPLE_RATE: Final[int] = 16000
+_TRANSCRIPTION_MODES: Final[tuple[str, str]] = ("chunks", "full_track")
 _EDIT_TRANSLATION_PROMPT: Final[str] = (
     "You were hired by a company called: '{}'. The received script was: '{}'."
     " You translated it as: '{}'. The target language was: '{}'. The company"
@@ -145,7 +150,13 @@ _FLOAT_KEYS: Final[str] = (
     "volume_gain_db",
 )
 _BOOLEAN_KEYS: Final[str] = ("for_dubbing", "use_speaker_boost", "adjust_speed")
-_LOCKED_KEYS: Final[str] = ("path", "dubbed_path", "vocals_path")
+_LOCKED_KEYS: Final[str] = (
+    "path",
+    "dubbed_path",
+    "vocals_path",
+    "sample_range",
+    "speaker_label",
+)
 _AVAILABLE_LANGUAGES_PROMPT: Final[str] = """
                 Arabic - ar-SA, Arabic - ar-EG, Bengali - bn-BD, Bengali - bn-IN, Bulgarian - bg-BG,
                 Chinese (Simplified) - zh-CN, Chinese (Traditional) - zh-TW, Croatian - hr-HR, Czech - cs-CZ,
@@ -577,16 +588,44 @@ class Dubber:
       hugging_face_token: str | None = None,
       no_dubbing_phrases: Sequence[str] | None = None,
       diarization_instructions: str | None = None,
+      diarization_mode: str = "gemini",
       translation_instructions: str | None = None,
       merge_utterances: bool = True,
       minimum_merge_threshold: float = 0.001,
+      consolidate_utterances: bool = False,
+      maximum_merge_gap: float = 0.3,
+      maximum_utterance_duration: float = 10.0,
       preferred_voices: Sequence[str] | None = None,
       assigned_voices_override: Mapping[str, str] | None = None,
       keep_voice_assignments: bool = True,
       adjust_speed: bool = False,
       vocals_volume_adjustment: float = 5.0,
       background_volume_adjustment: float = 0.0,
+      save_dubbed_vocals: bool = False,
+      cache_vocals_mix: bool = False,
       voice_separation_rounds: int = 2,
+      separation_preset: str = "max",
+      residual_vocals_threshold_db: float | None = (
+          audio_processing.DEFAULT_RESIDUAL_VOCALS_THRESHOLD_DB
+      ),
+      separation_cache_directory: str | None = None,
+      separation_cache_max_size_bytes: int = (
+          audio_processing.DEFAULT_SEPARATION_CACHE_SIZE_BYTES
+      ),
+      long_form_threshold_seconds: float | None = 600.0,
+      speech_gated_separation: bool = False,
+      virtual_utterance_chunks: bool = False,
+      transcription_batch_size: int = 1,
+      transcription_mode: str = "chunks",
+      transcription_cpu_threads: int = 0,
+      transcription_num_workers: int = 1,
+      transcription_model: str = _DEFAULT_TRANSCRIPTION_MODEL,
+      transcription_compute_type: str | None = None,
+      transcription_beam_size: int = _DEFAULT_TRANSCRIPTION_BEAM_SIZE,
+      transcript_cache_file: str | None = None,
+      transcript_cache_max_entries: int = (
+          speech_to_text.DEFAULT_TRANSCRIPT_CACHE_MAX_ENTRIES
+      ),
       vocals_audio_file: str | None,
       background_audio_file: str | None,
       clean_up: bool = True,
@@ -637,10 +676,22 @@ class Dubber:
           format as close as possible to how they might appear in the utterance
           (e.g., include punctuation, capitalization if relevant).
         diarization_instructions: Specific instructions for speaker diarization.
+        diarization_mode: Either 'gemini' to diarize the speakers with Gemini,
+          or 'local' to keep the PyAnnote speakers and infer their genders from
+          the pitch of their voice. In the 'local' mode Gemini is used only
+          when the genders can't be inferred confidently.
         translation_instructions: Specific instructions for translation.
         merge_utterances: Whether to merge utterances when the the timestamps
           delta between them is below 'minimum_merge_threshold'.
         minimum_merge_threshold: Threshold for merging utterances in seconds.
+        consolidate_utterances: Whether to merge the adjacent utterances of the
+          same PyAnnote speaker separated by up to 'maximum_merge_gap' instead
+          of using 'minimum_merge_threshold'. Fewer, longer utterances mean
+          fewer speech-to-text and text-to-speech calls.
+        maximum_merge_gap: The maximum pause in seconds bridged when
+          consolidating utterances.
+        maximum_utterance_duration: The maximum duration in seconds of a
+          consolidated utterance.
         preferred_voices: Preferred voice names for text-to-speech. Use
           high-level names, e.g. 'Wavenet', 'Standard' etc. Do not use the full
           voice names, e.g. 'pl-PL-Wavenet-A' etc.
@@ -656,9 +707,61 @@ class Dubber:
           adjusted.
         background_volume_adjustment: By how much the background audio volume
           should be adjusted.
+        save_dubbed_vocals: Whether to also save the dubbed vocals without the
+          background audio in the 'dubbed_vocals.mp3' file.
+        cache_vocals_mix: Whether to keep the dubbed vocals timeline in the
+          output directory between the postprocessing runs, so that a re-dub
+          only re-mixes the changed utterances. The timeline is stored as raw
+          float32 samples, e.g. over 1 GB for an hour of stereo audio.
         voice_separation_rounds: The number of times the background audio file
           should be processed for voice detection and removal. It helps with the
           old voice artifacts being present in the dubbed ad.
+        separation_preset: The Demucs quality/speed preset, one of 'draft',
+          'standard' or 'max'. 'draft' suits quick previews and 'standard'
+          the final renders.
+        residual_vocals_threshold_db: The level of the vocals a voice
+          separation round removes from the background, in dB relative to the
+          background, below which no more rounds are run. None always runs
+          all `voice_separation_rounds`.
+        separation_cache_directory: An optional directory of a separation
+          cache shared between the dubbing jobs. When provided, the vocals and
+          background split of the same audio is reused instead of running
+          Demucs again, e.g. when dubbing one ad into many languages.
+        separation_cache_max_size_bytes: The maximum size of the separation
+          cache. The least recently used entries are removed above it.
+        long_form_threshold_seconds: The audio duration above which the voice
+          separation runs in overlapping windows to keep the memory use
+          constant. None disables the windowed separation.
+        speech_gated_separation: Whether to run the voice separation only on
+          the padded speech regions found by PyAnnote. The original audio is
+          used as the background everywhere else, which saves time on
+          music-heavy ads.
+        virtual_utterance_chunks: Whether to reference the utterance chunks as
+          sample ranges of the decoded input audio instead of saving one MP3
+          file per utterance. The chunk files are then only written when they
+          are actually needed, e.g. for a preview.
+        transcription_batch_size: The number of utterances decoded at once by
+          Whisper. With 1 each utterance is transcribed separately.
+        transcription_mode: Either 'chunks' to transcribe each utterance
+          separately, or 'full_track' to transcribe the whole audio once with
+          word timestamps and assign the words to the utterances they overlap.
+        transcription_cpu_threads: The number of CPU threads used by each
+          Whisper worker. With 0 the CTranslate2 default is used.
+        transcription_num_workers: The number of Whisper workers that
+          transcribe the utterances concurrently on the same model.
+        transcription_model: The Whisper model size, e.g. 'large-v3',
+          'medium' or 'distil-large-v3', or a path to a converted model.
+          Smaller models are faster and often good enough for short ads.
+        transcription_compute_type: The CTranslate2 compute type of the
+          Whisper model, e.g. 'int8' or 'float16'. By default 'float16' is
+          used on CUDA and 'int8' on CPU.
+        transcription_beam_size: The beam size used for Whisper decoding.
+        transcript_cache_file: An optional path to a local SQLite database of
+          the transcripts shared between the dubbing jobs. When provided, the
+          utterances with the same audio, model, language and hotwords are not
+          transcribed again, e.g. when dubbing one ad into many languages.
+        transcript_cache_max_entries: The maximum number of the cached
+          transcripts. The least recently used ones are removed above it.
         vocals_audio_file: An optional path to a file with the speaking part
           only. It will be used instead of AI splitting the entire audio track
           into vocals and background audio files. If this is provided then also
@@ -701,14 +804,46 @@ class Dubber:
     self.number_of_speakers = number_of_speakers
     self.no_dubbing_phrases = no_dubbing_phrases
     self.diarization_instructions = diarization_instructions
+    if diarization_mode not in _DIARIZATION_MODES:
+      raise ValueError(
+          "The diarization mode must be one of:"
+          f" {', '.join(_DIARIZATION_MODES)}. Got: {diarization_mode}"
+      )
+    self.diarization_mode = diarization_mode
     self.translation_instructions = translation_instructions
     self.merge_utterances = merge_utterances
     self.minimum_merge_threshold = minimum_merge_threshold
+    self.consolidate_utterances = consolidate_utterances
+    self.maximum_merge_gap = maximum_merge_gap
+    self.maximum_utterance_duration = maximum_utterance_duration
     self.preferred_voices = preferred_voices
     self.adjust_speed = adjust_speed
     self.vocals_volume_adjustment = vocals_volume_adjustment
     self.background_volume_adjustment = background_volume_adjustment
+    self.save_dubbed_vocals = save_dubbed_vocals
+    self.cache_vocals_mix = cache_vocals_mix
     self.voice_separation_rounds = voice_separation_rounds
+    self.separation_preset = separation_preset
+    self.residual_vocals_threshold_db = residual_vocals_threshold_db
+    self.separation_cache_directory = separation_cache_directory
+    self.separation_cache_max_size_bytes = separation_cache_max_size_bytes
+    self.long_form_threshold_seconds = long_form_threshold_seconds
+    self.speech_gated_separation = speech_gated_separation
+    self.virtual_utterance_chunks = virtual_utterance_chunks
+    self.transcription_batch_size = transcription_batch_size
+    if transcription_mode not in _TRANSCRIPTION_MODES:
+      raise ValueError(
+          "The transcription mode must be one of:"
+          f" {', '.join(_TRANSCRIPTION_MODES)}. Got: {transcription_mode}"
+      )
+    self.transcription_mode = transcription_mode
+    self.transcription_cpu_threads = transcription_cpu_threads
+    self.transcription_num_workers = transcription_num_workers
+    self.transcription_model = transcription_model
+    self.transcription_compute_type = transcription_compute_type
+    self.transcription_beam_size = transcription_beam_size
+    self.transcript_cache_file = transcript_cache_file
+    self.transcript_cache_max_entries = transcript_cache_max_entries
     self.vocals_audio_file = vocals_audio_file
     self.background_audio_file = background_audio_file
     self.clean_up = clean_up
@@ -742,6 +877,8 @@ class Dubber:
     self._dubbing_from_utterance_metadata = False
     self._voice_allocation_needed = False
     self._voice_properties_added = False
+    self.dubbed_audio_files = {}
+    self._decoded_audio_store = None
     create_output_directories(output_directory)
 
   @functools.cached_property
@@ -803,13 +940,62 @@ class Dubber:
         self.pyannote_model, use_auth_token=hugging_face_token
     )
 
+  @functools.cached_property
+  def demucs_separator(self) -> audio_processing.DemucsSeparator:
+    """Initializes the in-process Demucs vocals separator."""
+    return audio_processing.DemucsSeparator.from_preset(
+        self.separation_preset, device=self.device
+    )
+
+  @functools.cached_property
+  def separation_cache(self) -> audio_processing.SeparationCache | None:
+    """Initializes the separation cache if its directory was provided."""
+    if not self.separation_cache_directory:
+      return None
+    return audio_processing.SeparationCache(
+        cache_directory=self.separation_cache_directory,
+        max_size_bytes=self.separation_cache_max_size_bytes,
+    )
+
+  @functools.cached_property
+  def transcript_cache(self) -> speech_to_text.TranscriptCache | None:
+    """Initializes the transcript cache if its file was provided."""
+    if not self.transcript_cache_file:
+      return None
+    return speech_to_text.TranscriptCache(
+        cache_file=self.transcript_cache_file,
+        model_name=self.transcription_model,
+        compute_type=self._transcription_compute_type,
+        max_entries=self.transcript_cache_max_entries,
+    )
+
+  @functools.cached_property
+  def vocals_mix_cache(self) -> audio_processing.VocalsMixCache | None:
+    """Initializes the cache of the dubbed vocals timeline if it's enabled."""
+    if not self.cache_vocals_mix:
+      return None
+    return audio_processing.VocalsMixCache(
+        cache_directory=os.path.join(
+            self.output_directory, audio_processing.AUDIO_PROCESSING
+        )
+    )
+
+  @property
+  def _transcription_compute_type(self) -> str:
+    """Returns the compute type of the Whisper model on the device."""
+    if self.transcription_compute_type:
+      return self.transcription_compute_type
+    return "float16" if self.device == "cuda" else "int8"
+
   @functools.cached_property
   def speech_to_text_model(self) -> WhisperModel:
     """Initializes the Whisper speech-to-text model."""
     return WhisperModel(
-        model_size_or_path=_DEFAULT_TRANSCRIPTION_MODEL,
+        model_size_or_path=self.transcription_model,
         device=self.device,
-        compute_type="float16" if self.device == "cuda" else "int8",
+        compute_type=self._transcription_compute_type,
+        cpu_threads=self.transcription_cpu_threads,
+        num_workers=self.transcription_num_workers,
     )
 
   def configure_gemini_model(
@@ -949,6 +1135,22 @@ class Dubber:
     now = datetime.datetime.now()
     return "dubbing-speakeridentification-" + now.strftime("%Y%m%d%H%M%S%f")
 
+  def _get_decoded_audio_store(
+      self, audio_file: str
+  ) -> audio_processing.DecodedAudioStore:
+    """Returns the store that decodes the audio file once for the whole job."""
+    if (
+        not self._decoded_audio_store
+        or self._decoded_audio_store.audio_file != audio_file
+    ):
+      self._decoded_audio_store = audio_processing.DecodedAudioStore(
+          audio_file=audio_file,
+          cache_directory=os.path.join(
+              self.output_directory, audio_processing.AUDIO_PROCESSING
+          ),
+      )
+    return self._decoded_audio_store
+
   def run_preprocessing(self) -> None:
     """Splits audio/video, applies DEMUCS, and segments audio into utterances with PyAnnote.
 
@@ -962,13 +1164,50 @@ class Dubber:
     else:
       video_file = None
       audio_file = self.input_file
+    audio_store = self._get_decoded_audio_store(audio_file)
+    if not self._dubbing_from_utterance_metadata:
+      utterance_metadata = audio_processing.create_pyannote_timestamps(
+          audio_file=audio_file,
+          number_of_speakers=self.number_of_speakers,
+          pipeline=self.pyannote_pipeline,
+          device=self.device,
+          audio_store=audio_store,
+          keep_speaker_labels=(
+              self.consolidate_utterances or self.diarization_mode == "local"
+          ),
+      )
+      if self.consolidate_utterances:
+        utterance_metadata = audio_processing.consolidate_utterances(
+            utterance_metadata=utterance_metadata,
+            maximum_gap=self.maximum_merge_gap,
+            maximum_duration=self.maximum_utterance_duration,
+        )
+      elif self.merge_utterances:
+        utterance_metadata = audio_processing.merge_utterances(
+            utterance_metadata=utterance_metadata,
+            minimum_merge_threshold=self.minimum_merge_threshold,
+        )
+      self.utterance_metadata = utterance_metadata
     if not self.vocals_audio_file and not self.background_audio_file:
+      if self.speech_gated_separation:
+        speech_regions = [
+            (utterance["start"], utterance["end"])
+            for utterance in self.utterance_metadata
+        ]
+      else:
+        speech_regions = None
       audio_vocals_file, audio_background_file = (
           audio_processing.split_audio_track(
               audio_file=audio_file,
               output_directory=self.output_directory,
               device=self.device,
               voice_separation_rounds=self.voice_separation_rounds,
+              separator=self.demucs_separator,
+              cache=self.separation_cache,
+              long_form_threshold_seconds=self.long_form_threshold_seconds,
+              speech_regions=speech_regions,
+              residual_vocals_threshold_db=self.residual_vocals_threshold_db,
+              audio_store=audio_store,
           )
       )
     else:
@@ -979,23 +1218,12 @@ class Dubber:
               output_directory=self.output_directory,
           )
       )
-    if not self._dubbing_from_utterance_metadata:
-      utterance_metadata = audio_processing.create_pyannote_timestamps(
-          audio_file=audio_file,
-          number_of_speakers=self.number_of_speakers,
-          pipeline=self.pyannote_pipeline,
-          device=self.device,
-      )
-      if self.merge_utterances:
-        utterance_metadata = audio_processing.merge_utterances(
-            utterance_metadata=utterance_metadata,
-            minimum_merge_threshold=self.minimum_merge_threshold,
-        )
-      self.utterance_metadata = utterance_metadata
     utterance_metadata = audio_processing.run_cut_and_save_audio(
         utterance_metadata=self.utterance_metadata,
         audio_file=audio_file,
         output_directory=self.output_directory,
+        audio_store=audio_store,
+        virtual_chunks=self.virtual_utterance_chunks,
     )
     self.preprocessing_output = PreprocessingArtifacts(
         video_file=video_file,
@@ -1027,24 +1255,59 @@ class Dubber:
     logging.info("Completed preprocessing.")
     self.progress_bar.update()
 
-  def run_speech_to_text(self) -> None:
-    """Transcribes audio, applies speaker diarization, and updates metadata with Gemini.
+  def _diarize_speakers_locally(
+      self, utterance_metadata: Sequence[Mapping[str, str | float]]
+  ) -> bool:
+    """Assigns the PyAnnote speakers and their pitch-based genders.
+
+    Args:
+      utterance_metadata: The transcribed utterance metadata.
 
     Returns:
-        Updated utterance metadata with speaker information and transcriptions.
+      True if the speaker information was added, False if Gemini is needed.
+    """
+    if any("speaker_label" not in item for item in utterance_metadata):
+      logging.warning(
+          "The utterances have no PyAnnote speaker labels. Diarizing the"
+          " speakers with Gemini."
+      )
+      return False
+    audio_store = self._get_decoded_audio_store(
+        self.preprocessing_output.audio_vocals_file
+        or self.preprocessing_output.audio_file
+    )
+    vocals = audio_store.get_samples(
+        sample_rate=_DIARIZATION_SAMPLE_RATE, channels=1
+    )
+    speaker_info, confidence = speech_to_text.diarize_speakers_locally(
+        utterance_metadata=utterance_metadata,
+        vocals=vocals[:, 0],
+        rate=_DIARIZATION_SAMPLE_RATE,
+    )
+    if confidence < _MINIMUM_LOCAL_DIARIZATION_CONFIDENCE:
+      logging.warning(
+          f"The local diarization confidence is {confidence:.2f}. Diarizing"
+          " the speakers with Gemini."
+      )
+      return False
+    self.utterance_metadata = speech_to_text.add_speaker_info(
+        utterance_metadata=utterance_metadata, speaker_info=speaker_info
+    )
+    return True
+
+  def _diarize_speakers_with_gemini(
+      self, utterance_metadata: Sequence[Mapping[str, str | float]]
+  ) -> None:
+    """Diarizes the speakers with Gemini based on the uploaded input file.
+
+    Args:
+      utterance_metadata: The transcribed utterance metadata.
     """
     media_file = (
         self.preprocessing_output.video_file
         if self.preprocessing_output.video_file
         else self.preprocessing_output.audio_file
     )
-    utterance_metadata = speech_to_text.transcribe_audio_chunks(
-        utterance_metadata=self.utterance_metadata,
-        advertiser_name=self.advertiser_name,
-        original_language=self.original_language,
-        model=self.speech_to_text_model,
-        no_dubbing_phrases=self.no_dubbing_phrases,
-    )
     speaker_diarization_model = self.configure_gemini_model(
         system_instructions=self.processed_diarization_system_instructions
     )
@@ -1084,6 +1347,53 @@ class Dubber:
         gcp_project_id=self.gcp_project_id,
         gcs_bucket_name=self._gcs_bucket_name,
     )
+
+  def run_speech_to_text(self) -> None:
+    """Transcribes audio, applies speaker diarization, and updates metadata.
+
+    The speakers are diarized locally from the PyAnnote labels and the pitch
+    of the vocals when the diarization mode is 'local', and with Gemini
+    otherwise or when the local diarization is not confident enough.
+
+    Returns:
+        Updated utterance metadata with speaker information and transcriptions.
+    """
+    if self.transcription_mode == "full_track":
+      # The whole track is transcribed from the vocals, like the local
+      # diarization, so the background music doesn't reach the model.
+      vocals_store = self._get_decoded_audio_store(
+          self.preprocessing_output.audio_vocals_file
+          or self.preprocessing_output.audio_file
+      )
+      utterance_metadata = speech_to_text.transcribe_full_track(
+          audio=vocals_store.get_speech_samples()[:, 0],
+          utterance_metadata=self.utterance_metadata,
+          advertiser_name=self.advertiser_name,
+          original_language=self.original_language,
+          model=self.speech_to_text_model,
+          no_dubbing_phrases=self.no_dubbing_phrases,
+          beam_size=self.transcription_beam_size,
+      )
+    else:
+      audio_store = self._get_decoded_audio_store(
+          self.preprocessing_output.audio_file
+      )
+      utterance_metadata = speech_to_text.transcribe_audio_chunks(
+          utterance_metadata=self.utterance_metadata,
+          advertiser_name=self.advertiser_name,
+          original_language=self.original_language,
+          model=self.speech_to_text_model,
+          no_dubbing_phrases=self.no_dubbing_phrases,
+          audio_store=audio_store,
+          batch_size=self.transcription_batch_size,
+          num_workers=self.transcription_num_workers,
+          transcript_cache=self.transcript_cache,
+          beam_size=self.transcription_beam_size,
+      )
+    if self.diarization_mode != "local" or not self._diarize_speakers_locally(
+        utterance_metadata
+    ):
+      self._diarize_speakers_with_gemini(utterance_metadata)
     logging.info("Completed transcription.")
     self.progress_bar.update()
 
@@ -1233,6 +1543,11 @@ class Dubber:
         original_language=self.original_language,
         model=self.speech_to_text_model,
         no_dubbing_phrases=self.no_dubbing_phrases,
+        audio_store=self._get_decoded_audio_store(
+            self.preprocessing_output.audio_file
+        ),
+        transcript_cache=self.transcript_cache,
+        beam_size=self.transcription_beam_size,
     )[0]
 
   def _run_translation_on_single_utterance(
@@ -1285,6 +1600,10 @@ class Dubber:
           audio_file=self.preprocessing_output.audio_file,
           utterance=utterance,
           output_directory=self.output_directory,
+          audio_store=self._get_decoded_audio_store(
+              self.preprocessing_output.audio_file
+          ),
+          virtual_chunks=self.virtual_utterance_chunks,
       )
       if self._voice_properties_added:
         verified_utterance = text_to_speech.add_text_to_speech_properties(
@@ -1304,6 +1623,10 @@ class Dubber:
           audio_file=self.preprocessing_output.audio_file,
           utterance=utterance,
           output_directory=self.output_directory,
+          audio_store=self._get_decoded_audio_store(
+              self.preprocessing_output.audio_file
+          ),
+          virtual_chunks=self.virtual_utterance_chunks,
       )
     transcribed_utterance = self._run_speech_to_text_on_single_utterance(
         verified_utterance
@@ -1768,6 +2091,13 @@ class Dubber:
         clear_output(wait=True)
         for i, utterance in enumerate(self.utterance_metadata):
           if utterance.get("dubbed_path"):
+            if "sample_range" in utterance and not utterance["for_dubbing"]:
+              audio_processing.materialize_utterance_chunk(
+                  utterance=utterance,
+                  audio_store=self._get_decoded_audio_store(
+                      self.preprocessing_output.audio_file
+                  ),
+              )
             print(
                 f"{i+1}. Playing speech chunk (utterance):"
                 f" {utterance.get('translated_text')}"
@@ -2378,22 +2708,20 @@ class Dubber:
         Path to the final dubbed output file (audio or video).
     """
 
-    dubbed_audio_vocals_file = audio_processing.insert_audio_at_timestamps(
+    dubbed_audio_file = audio_processing.mix_dubbed_audio(
         utterance_metadata=self.utterance_metadata,
         background_audio_file=self.preprocessing_output.audio_background_file
         if self.preprocessing_output.audio_background_file
         else self.preprocessing_output.audio_file,
         output_directory=self.output_directory,
-    )
-    dubbed_audio_file = audio_processing.merge_background_and_vocals(
-        background_audio_file=self.preprocessing_output.audio_background_file
-        if self.preprocessing_output.audio_background_file
-        else self.preprocessing_output.audio_file,
-        dubbed_vocals_audio_file=dubbed_audio_vocals_file,
-        output_directory=self.output_directory,
         target_language=self.target_language,
         vocals_volume_adjustment=self.vocals_volume_adjustment,
         background_volume_adjustment=self.background_volume_adjustment,
+        save_dubbed_vocals=self.save_dubbed_vocals,
+        audio_store=self._get_decoded_audio_store(
+            self.preprocessing_output.audio_file
+        ),
+        mix_cache=self.vocals_mix_cache,
     )
     if self.is_video:
       if not self.preprocessing_output.video_file:
@@ -2406,6 +2734,7 @@ class Dubber:
           output_directory=self.output_directory,
           target_language=self.target_language,
       )
+    self.dubbed_audio_files[self.target_language] = dubbed_audio_file
     self.postprocessing_output = PostprocessingArtifacts(
         audio_file=dubbed_audio_file,
         video_file=dubbed_video_file if self.is_video else None,
@@ -2413,6 +2742,50 @@ class Dubber:
     logging.info("Completed postprocessing.")
     self.progress_bar.update()
 
+  def create_multi_language_video(
+      self,
+      *,
+      target_languages: Sequence[str] | None = None,
+      output_format: str = ".mp4",
+  ) -> str:
+    """Combines the audio dubbed into several languages into one video file.
+
+    The dubbed audio files come from the previous `run_postprocessing` calls
+    of this instance, e.g. after `dub_ad` and `dub_ad_with_different_language`.
+
+    Args:
+        target_languages: The languages to include, in the order of the audio
+          tracks. If not provided, all the dubbed languages are used.
+        output_format: The container format of the output file, either '.mp4'
+          or '.mkv'.
+
+    Returns:
+        The path to the video file with one audio track per target language.
+
+    Raises:
+        ValueError: If the input file is not a video or a requested language
+        hasn't been dubbed yet.
+    """
+    if not self.is_video:
+      raise ValueError("A multi-language output requires a video input file.")
+    target_languages = target_languages or list(self.dubbed_audio_files)
+    missing_languages = sorted(
+        set(target_languages) - set(self.dubbed_audio_files)
+    )
+    if missing_languages:
+      raise ValueError(
+          f"The ad hasn't been dubbed into: {', '.join(missing_languages)}."
+      )
+    return video_processing.combine_audio_video_multi_language(
+        video_file=self.preprocessing_output.video_file,
+        dubbed_audio_files={
+            target_language: self.dubbed_audio_files[target_language]
+            for target_language in target_languages
+        },
+        output_directory=self.output_directory,
+        output_format=output_format,
+    )
+
   def run_save_utterance_metadata(self) -> None:
     """Saves a Python dictionary to a JSON file.
 
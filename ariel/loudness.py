@@ -0,0 +1,244 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A loudness module of Ariel package from the Google EMEA gTech Ads Data Science.
+
+It measures the integrated loudness as defined in ITU-R BS.1770-4, the same way
+as `pyloudnorm.Meter`, but for many chunks at once.
+"""
+
+import collections
+import functools
+from typing import Final, Sequence
+from absl import logging
+import numpy as np
+from scipy import signal
+
+_BLOCK_SECONDS: Final[float] = 0.4
+_BLOCK_OVERLAP: Final[float] = 0.75
+_ABSOLUTE_GATE_LUFS: Final[float] = -70.0
+_RELATIVE_GATE_LU: Final[float] = -10.0
+_LOUDNESS_OFFSET: Final[float] = -0.691
+_CHANNEL_WEIGHTS: Final[tuple[float, ...]] = (1.0, 1.0, 1.0, 1.41, 1.41)
+_HIGH_SHELF_GAIN_DB: Final[float] = 4.0
+_HIGH_SHELF_Q: Final[float] = 1 / np.sqrt(2)
+_HIGH_SHELF_FREQUENCY: Final[float] = 1500.0
+_HIGH_PASS_Q: Final[float] = 0.5
+_HIGH_PASS_FREQUENCY: Final[float] = 38.0
+_MAX_BATCH_SAMPLES: Final[int] = 2**22
+
+
+@functools.lru_cache(maxsize=None)
+def k_weighting_filter(rate: int) -> tuple[np.ndarray, np.ndarray]:
+  """Builds the K-weighting filter for a sample rate.
+
+  The filter is a cascade of a high shelf and a high pass biquad with the
+  coefficients used by `pyloudnorm`, combined into a single fourth-order
+  filter. It's built once per sample rate.
+
+  Args:
+    rate: The sample rate in Hz.
+
+  Returns:
+    A tuple with the numerator and the denominator of the filter.
+  """
+  gain = 10 ** (_HIGH_SHELF_GAIN_DB / 40.0)
+  w0 = 2.0 * np.pi * _HIGH_SHELF_FREQUENCY / rate
+  alpha = np.sin(w0) / (2.0 * _HIGH_SHELF_Q)
+  cos_w0 = np.cos(w0)
+  sqrt_gain = 2 * np.sqrt(gain) * alpha
+  high_shelf = np.array([
+      gain * ((gain + 1) + (gain - 1) * cos_w0 + sqrt_gain),
+      -2 * gain * ((gain - 1) + (gain + 1) * cos_w0),
+      gain * ((gain + 1) + (gain - 1) * cos_w0 - sqrt_gain),
+      (gain + 1) - (gain - 1) * cos_w0 + sqrt_gain,
+      2 * ((gain - 1) - (gain + 1) * cos_w0),
+      (gain + 1) - (gain - 1) * cos_w0 - sqrt_gain,
+  ])
+  w0 = 2.0 * np.pi * _HIGH_PASS_FREQUENCY / rate
+  alpha = np.sin(w0) / (2.0 * _HIGH_PASS_Q)
+  cos_w0 = np.cos(w0)
+  high_pass = np.array([
+      (1 + cos_w0) / 2,
+      -(1 + cos_w0),
+      (1 + cos_w0) / 2,
+      1 + alpha,
+      -2 * cos_w0,
+      1 - alpha,
+  ])
+  return signal.sos2tf(np.stack([high_shelf, high_pass]))
+
+
+def _integrated_loudness_batch(
+    chunks: Sequence[np.ndarray], *, rate: int
+) -> np.ndarray:
+  """Measures the integrated loudness of chunks with the same layout.
+
+  Args:
+    chunks: Arrays of shape (samples, channels) with the same number of
+      channels, each at least one gating block long.
+    rate: The sample rate of the chunks in Hz.
+
+  Returns:
+    An array with the integrated loudness of each chunk in LUFS.
+  """
+  lengths = np.array([len(chunk) for chunk in chunks])
+  channels = chunks[0].shape[1]
+  batch = np.zeros((len(chunks), lengths.max(), channels), dtype=np.float64)
+  for index, chunk in enumerate(chunks):
+    batch[index, : len(chunk)] = chunk
+  numerator, denominator = k_weighting_filter(rate)
+  power = signal.lfilter(numerator, denominator, batch, axis=1)
+  np.square(power, out=power)
+  for index, length in enumerate(lengths):
+    power[index, length:] = 0.0
+
+  step = 1.0 - _BLOCK_OVERLAP
+  block_step = _BLOCK_SECONDS * step
+  block_counts = np.round((lengths / rate - _BLOCK_SECONDS) / block_step)
+  block_counts = block_counts.astype(int) + 1
+  block_indices = np.arange(block_counts.max())
+  lower_bounds = (_BLOCK_SECONDS * (block_indices * step) * rate).astype(int)
+  upper_bounds = np.minimum(
+      (_BLOCK_SECONDS * (block_indices * step + 1) * rate).astype(int),
+      power.shape[1],
+  )
+  boundaries = np.union1d(lower_bounds, upper_bounds)
+  segment_starts = boundaries[boundaries < power.shape[1]]
+  cumulative_energy = np.zeros(
+      (len(chunks), len(segment_starts) + 1, channels)
+  )
+  np.cumsum(
+      np.add.reduceat(power, segment_starts, axis=1),
+      axis=1,
+      out=cumulative_energy[:, 1:],
+  )
+  boundaries = np.append(segment_starts, power.shape[1])
+  block_energy = (
+      cumulative_energy[:, np.searchsorted(boundaries, upper_bounds)]
+      - cumulative_energy[:, np.searchsorted(boundaries, lower_bounds)]
+  ) / (_BLOCK_SECONDS * rate)
+  channel_weights = np.array(_CHANNEL_WEIGHTS[:channels])
+  with np.errstate(divide="ignore", invalid="ignore"):
+    block_loudness = _LOUDNESS_OFFSET + 10.0 * np.log10(
+        block_energy @ channel_weights
+    )
+    valid_blocks = block_indices[None, :] < block_counts[:, None]
+    gated_blocks = valid_blocks & (block_loudness >= _ABSOLUTE_GATE_LUFS)
+    gated_energy = (block_energy * gated_blocks[..., None]).sum(1)
+    gated_energy /= gated_blocks.sum(1, keepdims=True)
+    relative_gate = (
+        _LOUDNESS_OFFSET
+        + 10.0 * np.log10(gated_energy @ channel_weights)
+        + _RELATIVE_GATE_LU
+    )
+    gated_blocks = (
+        valid_blocks
+        & (block_loudness > relative_gate[:, None])
+        & (block_loudness > _ABSOLUTE_GATE_LUFS)
+    )
+    gated_energy = (block_energy * gated_blocks[..., None]).sum(1)
+    gated_energy = np.nan_to_num(
+        gated_energy / gated_blocks.sum(1, keepdims=True)
+    )
+    return _LOUDNESS_OFFSET + 10.0 * np.log10(gated_energy @ channel_weights)
+
+
+def integrated_loudness(
+    chunks: Sequence[np.ndarray], *, rate: int
+) -> np.ndarray:
+  """Measures the integrated loudness of many chunks in vectorized batches.
+
+  The chunks are sorted by length and filtered and gated together in batches
+  of a bounded size. The results match `pyloudnorm.Meter.integrated_loudness`.
+
+  Args:
+    chunks: Arrays of shape (samples, channels) with the same number of
+      channels, each at least one gating block (400 ms) long.
+    rate: The sample rate of the chunks in Hz.
+
+  Returns:
+    An array with the integrated loudness of each chunk in LUFS. It's -inf for
+    silent chunks.
+
+  Raises:
+    ValueError: If a chunk is shorter than the gating block.
+  """
+  loudness = np.full(len(chunks), -np.inf)
+  if not chunks:
+    return loudness
+  if min(len(chunk) for chunk in chunks) < _BLOCK_SECONDS * rate:
+    raise ValueError("Audio must have length greater than the block size.")
+  order = sorted(range(len(chunks)), key=lambda index: len(chunks[index]))
+  batch_indices = []
+  for index in order:
+    chunk_samples = chunks[index].size
+    if batch_indices and (len(batch_indices) + 1) * chunk_samples > (
+        _MAX_BATCH_SAMPLES
+    ):
+      loudness[batch_indices] = _integrated_loudness_batch(
+          [chunks[batch_index] for batch_index in batch_indices], rate=rate
+      )
+      batch_indices = []
+    batch_indices.append(index)
+  loudness[batch_indices] = _integrated_loudness_batch(
+      [chunks[batch_index] for batch_index in batch_indices], rate=rate
+  )
+  return loudness
+
+
+def normalization_gains(
+    chunks: Sequence[tuple[np.ndarray, int]], *, target_lufs: float
+) -> np.ndarray:
+  """Calculates the gains that bring each chunk to the target loudness.
+
+  The chunks are grouped by their sample rate and channel layout and measured
+  at their true rate. Chunks shorter than the gating block are padded with
+  silence for the measurement.
+
+  Args:
+    chunks: A sequence of (samples, rate) tuples, where samples is an array of
+      shape (samples, channels) with values in the [-1, 1] range.
+    target_lufs: The target integrated loudness in LUFS.
+
+  Returns:
+    An array with the linear gain factor of each chunk. It's 1.0 for the
+    chunks whose loudness could not be measured, e.g. silent ones.
+  """
+  groups = collections.defaultdict(list)
+  for index, (samples, rate) in enumerate(chunks):
+    groups[(rate, samples.shape[1])].append(index)
+  loudness = np.full(len(chunks), -np.inf)
+  for (rate, _), indices in groups.items():
+    minimum_samples = int(np.ceil(_BLOCK_SECONDS * rate))
+    padded_chunks = []
+    for index in indices:
+      samples = chunks[index][0]
+      if len(samples) < minimum_samples:
+        logging.error(
+            f"The dubbed chunk duration is less than {_BLOCK_SECONDS} seconds."
+            " Silent padding will be added to normalize the volume."
+        )
+        samples = np.pad(samples, ((0, minimum_samples - len(samples)), (0, 0)))
+      padded_chunks.append(samples)
+    loudness[indices] = integrated_loudness(padded_chunks, rate=rate)
+  gains = np.ones(len(chunks))
+  measured = np.isfinite(loudness)
+  if not measured.all():
+    logging.error(
+        f"The volume of {np.sum(~measured)} dubbed chunk(s) could not be"
+        " normalized. The original volume is used."
+    )
+  gains[measured] = 10 ** ((target_lufs - loudness[measured]) / 20)
+  return gains
@@ -14,11 +14,26 @@
 
 """A speech-to-text module of Ariel package from the Google EMEA gTech Ads Data Science."""
 
+from concurrent import futures
+import contextlib
+import functools
+import hashlib
+import json
+import os
 import re
-from typing import Final, Mapping, Sequence
+import sqlite3
+import time
+from typing import Final, Iterator, Mapping, Sequence
 from absl import logging
+from ariel import audio_io
+from ariel import audio_processing
 from faster_whisper import WhisperModel
+from faster_whisper.audio import pad_or_trim
+from faster_whisper.tokenizer import Tokenizer
+from faster_whisper.transcribe import get_compression_ratio
+from faster_whisper.transcribe import get_ctranslate2_storage
 from google.cloud import storage
+import numpy as np
 from vertexai.generative_models import GenerativeModel
 from vertexai.generative_models import Part
 
@@ -32,33 +47,148 @@ _MIME_TYPE_MAPPING: Final[Mapping[str, str]] = {
     ".mp4": "video/mp4",
     ".mp3": "audio/mpeg",
 }
+_WHISPER_SAMPLE_RATE: Final[int] = 16000
+_DEFAULT_BEAM_SIZE: Final[int] = 5
+_NO_SPEECH_THRESHOLD: Final[float] = 0.6
+_LOG_PROBABILITY_THRESHOLD: Final[float] = -1.0
+_COMPRESSION_RATIO_THRESHOLD: Final[float] = 2.4
+_MAXIMUM_WORD_DISTANCE_SECONDS: Final[float] = 0.5
+DEFAULT_TRANSCRIPT_CACHE_MAX_ENTRIES: Final[int] = 100_000
+_TRANSCRIPT_CACHE_TIMEOUT_SECONDS: Final[float] = 30.0
+_PITCH_FRAME_SECONDS: Final[float] = 0.04
+_PITCH_HOP_SECONDS: Final[float] = 0.01
+_MINIMUM_PITCH_HZ: Final[float] = 60.0
+_MAXIMUM_PITCH_HZ: Final[float] = 400.0
+_VOICING_THRESHOLD: Final[float] = 0.5
+_SILENCE_THRESHOLD_DB: Final[float] = -40.0
+_GENDER_PITCH_THRESHOLD_HZ: Final[float] = 165.0
+_GENDER_PITCH_MARGIN_HZ: Final[float] = 30.0
+_MINIMUM_VOICED_SECONDS: Final[float] = 0.5
+_SSML_MALE: Final[str] = "Male"
+_SSML_FEMALE: Final[str] = "Female"
 
 
 def transcribe(
     *,
-    vocals_filepath: str,
+    vocals_filepath: str | np.ndarray,
     advertiser_name: str,
     original_language: str,
     model: WhisperModel,
+    beam_size: int = _DEFAULT_BEAM_SIZE,
 ) -> str:
   """Transcribes an audio.
 
   Args:
-      vocals_filepath: The path to the audio file ot be transcribed.
+      vocals_filepath: The path to the audio file ot be transcribed, or its 16
+        kHz mono samples.
       advertiser_name: The name of the advertiser to use as a hotword.
       original_language: The original language of the audio. It's either ISO
         639-1 or ISO 3166-1 alpha-2 country code, e.g. 'en-US'.
       model: The pre-initialized transcription model.
+      beam_size: The beam size used for decoding.
 
   Returns:
-      The transcribed text.
+      The transcribed text without the leading space Whisper prefixes it with.
   """
   segments, _ = model.transcribe(
       vocals_filepath,
       language=original_language.split("-")[0],
       hotwords=advertiser_name,
+      beam_size=beam_size,
   )
-  return " ".join(segment.text for segment in segments)
+  return " ".join(segment.text for segment in segments).strip()
+
+
+def transcribe_batch(
+    *,
+    audios: Sequence[np.ndarray],
+    advertiser_name: str,
+    original_language: str,
+    model: WhisperModel,
+    batch_size: int,
+    beam_size: int = _DEFAULT_BEAM_SIZE,
+) -> list[str]:
+  """Transcribes many short audios with batched Whisper decoding.
+
+  The audios are padded to the 30 second Whisper window and decoded in
+  batches by the underlying CTranslate2 model, with the same hotwords prompt
+  as `transcribe`. The audios longer than the window and the ones whose
+  decoding looks unreliable are transcribed one by one with `transcribe`,
+  which can fall back to higher temperatures.
+
+  Args:
+      audios: The 16 kHz mono samples of each audio.
+      advertiser_name: The name of the advertiser to use as a hotword.
+      original_language: The original language of the audio. It's either ISO
+        639-1 or ISO 3166-1 alpha-2 country code, e.g. 'en-US'.
+      model: The pre-initialized transcription model.
+      batch_size: The number of audios decoded at once.
+      beam_size: The beam size used for decoding.
+
+  Returns:
+      The transcribed texts in the order of the audios.
+  """
+  tokenizer = Tokenizer(
+      model.hf_tokenizer,
+      model.model.is_multilingual,
+      task="transcribe",
+      language=original_language.split("-")[0],
+  )
+  prompt = model.get_prompt(
+      tokenizer, [], without_timestamps=True, hotwords=advertiser_name
+  )
+  feature_extractor = model.feature_extractor
+  texts = [None] * len(audios)
+  short_indices = [
+      index
+      for index, audio in enumerate(audios)
+      if len(audio) <= feature_extractor.n_samples
+  ]
+  for batch_start in range(0, len(short_indices), batch_size):
+    batch_indices = short_indices[batch_start : batch_start + batch_size]
+    features = np.stack([
+        feature_extractor(
+            pad_or_trim(audios[index], feature_extractor.n_samples),
+            padding=False,
+        )[:, : feature_extractor.nb_max_frames]
+        for index in batch_indices
+    ])
+    results = model.model.generate(
+        get_ctranslate2_storage(features),
+        [prompt] * len(batch_indices),
+        beam_size=beam_size,
+        max_length=model.max_length,
+        return_scores=True,
+        return_no_speech_prob=True,
+        suppress_blank=True,
+        suppress_tokens=[-1],
+    )
+    for index, result in zip(batch_indices, results):
+      tokens = result.sequences_ids[0]
+      average_log_probability = (
+          result.scores[0] * len(tokens) / (len(tokens) + 1)
+      )
+      if average_log_probability < _LOG_PROBABILITY_THRESHOLD:
+        if result.no_speech_prob > _NO_SPEECH_THRESHOLD:
+          texts[index] = ""
+        continue
+      text = tokenizer.decode(tokens).strip()
+      if get_compression_ratio(text) <= _COMPRESSION_RATIO_THRESHOLD:
+        texts[index] = text
+  fallback_indices = [index for index, text in enumerate(texts) if text is None]
+  if fallback_indices:
+    logging.info(
+        f"Transcribing {len(fallback_indices)} audio(s) one by one."
+    )
+  for index in fallback_indices:
+    texts[index] = transcribe(
+        vocals_filepath=audios[index],
+        advertiser_name=advertiser_name,
+        original_language=original_language,
+        model=model,
+        beam_size=beam_size,
+    )
+  return texts
 
 
 def is_substring_present(
@@ -103,6 +233,240 @@ def is_substring_present(
   return True
 
 
+class TranscriptCache:
+  """A persistent, size-bounded cache of the utterance transcripts.
+
+  The transcripts are stored in a SQLite database, keyed by a hash of the
+  utterance samples and the transcription settings, together with the time
+  they were last used. When the cache holds more than its maximum number of
+  entries, the least recently used ones are removed. The database can be
+  shared by the dubbing jobs of the same ad into different languages.
+
+  Attributes:
+    cache_file: The path to the SQLite database. It must be on a local file
+      system.
+    model_name: The name of the Whisper model making the transcripts.
+    compute_type: The compute type of the Whisper model.
+    max_entries: The maximum number of the cached transcripts.
+  """
+
+  def __init__(
+      self,
+      *,
+      cache_file: str,
+      model_name: str,
+      compute_type: str,
+      max_entries: int = DEFAULT_TRANSCRIPT_CACHE_MAX_ENTRIES,
+  ) -> None:
+    """Initializes the TranscriptCache.
+
+    Args:
+      cache_file: The path to the SQLite database.
+      model_name: The name of the Whisper model making the transcripts.
+      compute_type: The compute type of the Whisper model.
+      max_entries: The maximum number of the cached transcripts.
+    """
+    self.cache_file = cache_file
+    self.model_name = model_name
+    self.compute_type = compute_type
+    self.max_entries = max_entries
+    cache_directory = os.path.dirname(cache_file)
+    if cache_directory:
+      os.makedirs(cache_directory, exist_ok=True)
+    with self._connect() as connection:
+      connection.execute(
+          "CREATE TABLE IF NOT EXISTS transcripts (key TEXT PRIMARY KEY, text"
+          " TEXT NOT NULL, last_accessed REAL NOT NULL)"
+      )
+      connection.execute(
+          "CREATE INDEX IF NOT EXISTS transcripts_last_accessed ON"
+          " transcripts (last_accessed)"
+      )
+
+  @contextlib.contextmanager
+  def _connect(self) -> Iterator[sqlite3.Connection]:
+    """Opens a connection that commits the changes on exit."""
+    connection = sqlite3.connect(
+        self.cache_file, timeout=_TRANSCRIPT_CACHE_TIMEOUT_SECONDS
+    )
+    try:
+      with connection:
+        yield connection
+    finally:
+      connection.close()
+
+  def make_key(
+      self,
+      *,
+      samples: np.ndarray,
+      language: str,
+      hotwords: str,
+      decoding: str,
+      beam_size: int,
+  ) -> str:
+    """Builds the cache key of a transcript.
+
+    Args:
+      samples: The 16 kHz mono samples of the utterance.
+      language: The language the utterance is transcribed in.
+      hotwords: The hotwords passed to Whisper.
+      decoding: The decoding path of the transcript, either 'batch' or
+        'sequential', as they can transcribe the same samples differently.
+      beam_size: The beam size used for decoding.
+
+    Returns:
+      A SHA-256 hex digest of the samples and the transcription settings.
+    """
+    hasher = hashlib.sha256()
+    hasher.update(np.ascontiguousarray(samples, dtype=np.float32).tobytes())
+    settings = dict(
+        model_name=self.model_name,
+        compute_type=self.compute_type,
+        language=language,
+        hotwords=hotwords,
+        decoding=decoding,
+        beam_size=beam_size,
+    )
+    hasher.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+    return hasher.hexdigest()
+
+  def get(self, key: str) -> str | None:
+    """Returns a cached transcript and marks it as recently used.
+
+    Args:
+      key: The cache key of the transcript.
+
+    Returns:
+      The transcript, or None if it's not in the cache.
+    """
+    with self._connect() as connection:
+      row = connection.execute(
+          "SELECT text FROM transcripts WHERE key = ?", (key,)
+      ).fetchone()
+      if row is None:
+        return None
+      connection.execute(
+          "UPDATE transcripts SET last_accessed = ? WHERE key = ?",
+          (time.time(), key),
+      )
+    return row[0]
+
+  def put(self, *, key: str, text: str) -> None:
+    """Stores a transcript in the cache and evicts the stale entries.
+
+    Args:
+      key: The cache key of the transcript.
+      text: The transcript.
+    """
+    with self._connect() as connection:
+      connection.execute(
+          "INSERT OR REPLACE INTO transcripts VALUES (?, ?, ?)",
+          (key, text, time.time()),
+      )
+      connection.execute(
+          "DELETE FROM transcripts WHERE last_accessed < (SELECT"
+          " last_accessed FROM transcripts ORDER BY last_accessed DESC LIMIT 1"
+          " OFFSET ?)",
+          (self.max_entries - 1,),
+      )
+
+
+def _read_speech_samples(
+    utterance: Mapping[str, float | str],
+    *,
+    audio_store: audio_processing.DecodedAudioStore | None,
+) -> np.ndarray:
+  """Returns the 16 kHz mono samples of an utterance for Whisper.
+
+  Both the sequential and the batched decoding read the utterances here, so
+  they transcribe the same samples.
+
+  Args:
+      utterance: The utterance metadata with the 'start', 'end' and 'path'
+        keys, and the 'sample_range' key of a virtual chunk.
+      audio_store: The decoded audio store of the source audio, if any. The
+        chunk file is decoded when it's not provided.
+
+  Returns:
+      A 1D array of the 16 kHz mono samples.
+  """
+  if audio_store and "sample_range" in utterance:
+    samples = audio_store.get_range(
+        utterance["sample_range"], sample_rate=_WHISPER_SAMPLE_RATE, channels=1
+    )
+  elif audio_store:
+    return audio_store.get_speech_segment(
+        start=utterance["start"], end=utterance["end"]
+    )
+  else:
+    samples, _ = audio_io.read_audio(
+        utterance["path"], frame_rate=_WHISPER_SAMPLE_RATE, channels=1
+    )
+  return samples[:, 0]
+
+
+def _transcribe_utterance(
+    utterance: Mapping[str, float | str],
+    *,
+    advertiser_name: str,
+    original_language: str,
+    model: WhisperModel,
+    audio_store: audio_processing.DecodedAudioStore | None,
+    beam_size: int,
+) -> str:
+  """Transcribes a single utterance with the sequential decoding."""
+  return transcribe(
+      vocals_filepath=_read_speech_samples(utterance, audio_store=audio_store),
+      advertiser_name=advertiser_name,
+      original_language=original_language,
+      model=model,
+      beam_size=beam_size,
+  )
+
+
+def _transcribe_texts(
+    *,
+    utterance_metadata: Sequence[Mapping[str, float | str]],
+    advertiser_name: str,
+    original_language: str,
+    model: WhisperModel,
+    audio_store: audio_processing.DecodedAudioStore | None,
+    batch_size: int,
+    num_workers: int,
+    beam_size: int,
+) -> list[str]:
+  """Transcribes the utterances in batches, concurrently or one by one."""
+  if not utterance_metadata:
+    return []
+  if batch_size > 1:
+    return transcribe_batch(
+        audios=[
+            _read_speech_samples(item, audio_store=audio_store)
+            for item in utterance_metadata
+        ],
+        advertiser_name=advertiser_name,
+        original_language=original_language,
+        model=model,
+        batch_size=batch_size,
+        beam_size=beam_size,
+    )
+  transcribe_utterance = functools.partial(
+      _transcribe_utterance,
+      advertiser_name=advertiser_name,
+      original_language=original_language,
+      model=model,
+      audio_store=audio_store,
+      beam_size=beam_size,
+  )
+  if num_workers > 1:
+    if audio_store:
+      # Derives the 16 kHz view before the workers read it concurrently.
+      audio_store.get_speech_samples()
+    with futures.ThreadPoolExecutor(max_workers=num_workers) as executor:
+      return list(executor.map(transcribe_utterance, utterance_metadata))
+  return [transcribe_utterance(item) for item in utterance_metadata]
+
+
 def transcribe_audio_chunks(
     *,
     utterance_metadata: Sequence[Mapping[str, float | str]],
@@ -110,6 +474,11 @@ def transcribe_audio_chunks(
     original_language: str,
     model: WhisperModel,
     no_dubbing_phrases: Sequence[str],
+    audio_store: audio_processing.DecodedAudioStore | None = None,
+    batch_size: int = 1,
+    num_workers: int = 1,
+    transcript_cache: TranscriptCache | None = None,
+    beam_size: int = _DEFAULT_BEAM_SIZE,
 ) -> Sequence[Mapping[str, float | str]]:
   """Transcribes each audio chunk in the provided list and returns a new list with transcriptions added.
 
@@ -123,6 +492,17 @@ def transcribe_audio_chunks(
         should not be dubbed. It is critical to provide these phrases in a
         format as close as possible to how they might appear in the utterance
         (e.g., include punctuation, capitalization if relevant).
+      audio_store: The decoded audio store of the source audio. When provided,
+        each chunk is transcribed from its 16 kHz mono view instead of
+        decoding the chunk file.
+      batch_size: The number of chunks decoded at once by Whisper. With 1 each
+        chunk is transcribed with a separate `transcribe` call.
+      num_workers: The number of chunks transcribed concurrently by the same
+        model when `batch_size` is 1. The model should be created with at
+        least as many `num_workers` to actually run them in parallel.
+      transcript_cache: An optional cache of the transcripts. The chunks found
+        in it are not transcribed again, and the new transcripts are added.
+      beam_size: The beam size used for decoding.
 
   Returns:
       A new sequence of mappings, where each mapping is a copy of the original
@@ -130,15 +510,66 @@ def transcribe_audio_chunks(
       key indicating if the phrase should be dubbed or not.
   """
 
-  updated_utterance_metadata = []
-  for item in utterance_metadata:
-    new_item = item.copy()
-    transcribed_text = transcribe(
-        vocals_filepath=item["path"],
+  if transcript_cache is None:
+    transcribed_texts = _transcribe_texts(
+        utterance_metadata=utterance_metadata,
         advertiser_name=advertiser_name,
         original_language=original_language,
         model=model,
+        audio_store=audio_store,
+        batch_size=batch_size,
+        num_workers=num_workers,
+        beam_size=beam_size,
+    )
+  else:
+    keys = [
+        transcript_cache.make_key(
+            samples=_read_speech_samples(item, audio_store=audio_store),
+            language=original_language.split("-")[0],
+            hotwords=advertiser_name,
+            decoding="batch" if batch_size > 1 else "sequential",
+            beam_size=beam_size,
+        )
+        for item in utterance_metadata
+    ]
+    transcribed_texts = [transcript_cache.get(key) for key in keys]
+    missing_indices = [
+        index for index, text in enumerate(transcribed_texts) if text is None
+    ]
+    logging.info(
+        f"Found {len(keys) - len(missing_indices)} of {len(keys)} transcripts"
+        " in the transcript cache."
     )
+    missing_texts = _transcribe_texts(
+        utterance_metadata=[utterance_metadata[i] for i in missing_indices],
+        advertiser_name=advertiser_name,
+        original_language=original_language,
+        model=model,
+        audio_store=audio_store,
+        batch_size=batch_size,
+        num_workers=num_workers,
+        beam_size=beam_size,
+    )
+    for index, text in zip(missing_indices, missing_texts):
+      transcribed_texts[index] = text
+      transcript_cache.put(key=keys[index], text=text)
+  return _add_transcriptions(
+      utterance_metadata=utterance_metadata,
+      transcribed_texts=transcribed_texts,
+      no_dubbing_phrases=no_dubbing_phrases,
+  )
+
+
+def _add_transcriptions(
+    *,
+    utterance_metadata: Sequence[Mapping[str, float | str]],
+    transcribed_texts: Sequence[str],
+    no_dubbing_phrases: Sequence[str],
+) -> Sequence[Mapping[str, float | str]]:
+  """Returns copies of the utterances with their 'text' and 'for_dubbing'."""
+  updated_utterance_metadata = []
+  for item, transcribed_text in zip(utterance_metadata, transcribed_texts):
+    new_item = item.copy()
     new_item["text"] = transcribed_text
     new_item["for_dubbing"] = is_substring_present(
         utterance=transcribed_text, no_dubbing_phrases=no_dubbing_phrases
@@ -147,6 +578,138 @@ def transcribe_audio_chunks(
   return updated_utterance_metadata
 
 
+def assign_words_to_utterances(
+    *,
+    words: Sequence[tuple[float, float, str]],
+    utterance_metadata: Sequence[Mapping[str, float | str]],
+    maximum_distance: float = _MAXIMUM_WORD_DISTANCE_SECONDS,
+) -> list[str]:
+  """Assigns timestamped words to the utterances they overlap the most.
+
+  A word that overlaps no utterance goes to the closest one, as long as it is
+  at most `maximum_distance` away from it. Otherwise it's dropped, as it was
+  most likely spoken outside of the dubbed utterances.
+
+  Args:
+      words: A sequence of (start, end, word) tuples in seconds, where each
+        word keeps the leading space Whisper prefixes it with.
+      utterance_metadata: A sequence of mappings with the 'start' and 'end'
+        keys of each utterance.
+      maximum_distance: The maximum distance in seconds between a word and
+        the closest utterance for a word outside of all the utterances.
+
+  Returns:
+      The text of each utterance in the order of the utterance metadata.
+  """
+  if not words or not utterance_metadata:
+    return ["" for _ in utterance_metadata]
+  word_starts, word_ends = np.array(
+      [(start, end) for start, end, _ in words], dtype=np.float64
+  ).T
+  utterance_starts, utterance_ends = np.array(
+      [(item["start"], item["end"]) for item in utterance_metadata],
+      dtype=np.float64,
+  ).T
+  overlaps = np.minimum(word_ends[:, None], utterance_ends) - np.maximum(
+      word_starts[:, None], utterance_starts
+  )
+  best_utterances = np.argmax(overlaps, axis=1)
+  best_overlaps = overlaps[np.arange(len(words)), best_utterances]
+  texts = [[] for _ in utterance_metadata]
+  for (_, _, word), utterance, overlap in zip(
+      words, best_utterances, best_overlaps
+  ):
+    if overlap > 0 or -overlap <= maximum_distance:
+      texts[utterance].append(word)
+  return ["".join(text).strip() for text in texts]
+
+
+def transcribe_full_track(
+    *,
+    audio: str | np.ndarray,
+    utterance_metadata: Sequence[Mapping[str, float | str]],
+    advertiser_name: str,
+    original_language: str,
+    model: WhisperModel,
+    no_dubbing_phrases: Sequence[str],
+    beam_size: int = _DEFAULT_BEAM_SIZE,
+) -> Sequence[Mapping[str, float | str]]:
+  """Transcribes the whole track once and splits the words into utterances.
+
+  Whisper sees the context of the whole track instead of each chunk
+  separately, and the model is invoked once. The words are assigned to the
+  utterances with `assign_words_to_utterances`.
+
+  Args:
+      audio: The path to the audio file, or its 16 kHz mono samples.
+      utterance_metadata: A sequence of mappings, each containing information
+        about a single utterance, including the 'start' and 'end' keys.
+      advertiser_name: The name of the advertiser to use as a hotword.
+      original_language: The original language of the audio. It's either ISO
+        639-1 or ISO 3166-1 alpha-2 country code, e.g. 'en-US'.
+      model: The pre-initialized transcription model.
+      no_dubbing_phrases: A sequence of strings representing the phrases that
+        should not be dubbed.
+      beam_size: The beam size used for decoding.
+
+  Returns:
+      A new sequence of mappings, where each mapping is a copy of the original
+      with an added 'text' key containing the transcription and 'for_dubbing'
+      key indicating if the phrase should be dubbed or not.
+  """
+  segments, _ = model.transcribe(
+      audio,
+      language=original_language.split("-")[0],
+      hotwords=advertiser_name,
+      beam_size=beam_size,
+      word_timestamps=True,
+  )
+  words = [
+      (word.start, word.end, word.word)
+      for segment in segments
+      for word in segment.words or []
+  ]
+  return _add_transcriptions(
+      utterance_metadata=utterance_metadata,
+      transcribed_texts=assign_words_to_utterances(
+          words=words, utterance_metadata=utterance_metadata
+      ),
+      no_dubbing_phrases=no_dubbing_phrases,
+  )
+
+
+def word_error_rate(*, reference: str, hypothesis: str) -> float:
+  """Calculates the word error rate (WER) of a transcript.
+
+  Both texts are compared case-insensitively and without punctuation.
+
+  Args:
+      reference: The reference transcript.
+      hypothesis: The transcript to evaluate.
+
+  Returns:
+      The number of word substitutions, deletions and insertions divided by
+      the number of the reference words.
+  """
+  reference_words = re.sub(r"[^\w\s]", "", reference.lower()).split()
+  hypothesis_words = re.sub(r"[^\w\s]", "", hypothesis.lower()).split()
+  if not reference_words:
+    return float(bool(hypothesis_words))
+  distances = list(range(len(hypothesis_words) + 1))
+  for index, reference_word in enumerate(reference_words, start=1):
+    previous_distances, distances = distances, [index]
+    for position, hypothesis_word in enumerate(hypothesis_words, start=1):
+      distances.append(
+          min(
+              previous_distances[position - 1]
+              + (reference_word != hypothesis_word),
+              previous_distances[position] + 1,
+              distances[position - 1] + 1,
+          )
+      )
+  return distances[-1] / len(reference_words)
+
+
 def create_gcs_bucket(
     *, gcp_project_id: str, gcs_bucket_name: str, gcp_region: str
 ) -> None:
@@ -264,6 +827,115 @@ def diarize_speakers(
   return process_speaker_diarization_response(response=response.text)
 
 
+def estimate_pitch(samples: np.ndarray, *, rate: int) -> np.ndarray:
+  """Estimates the fundamental frequency of speech frame by frame.
+
+  The pitch is the lag of the highest normalized autocorrelation peak in the
+  human voice range. The autocorrelation of all the frames is calculated at
+  once in the frequency domain.
+
+  Args:
+    samples: A mono array of the speech samples.
+    rate: The sample rate of the samples in Hz.
+
+  Returns:
+    An array with the pitch of each 10 ms hop in Hz. It's NaN for the silent
+    and the unvoiced frames.
+  """
+  frame_samples = int(_PITCH_FRAME_SECONDS * rate)
+  hop_samples = int(_PITCH_HOP_SECONDS * rate)
+  if len(samples) < frame_samples:
+    return np.empty(0)
+  frames = np.lib.stride_tricks.sliding_window_view(
+      np.asarray(samples, dtype=np.float32), frame_samples
+  )[::hop_samples]
+  frames = frames - frames.mean(axis=1, keepdims=True)
+  spectrum = np.fft.rfft(frames, n=2 * frame_samples, axis=1)
+  autocorrelation = np.fft.irfft(np.abs(spectrum) ** 2, axis=1)
+  energy = autocorrelation[:, 0]
+  minimum_lag = int(rate / _MAXIMUM_PITCH_HZ)
+  maximum_lag = min(int(rate / _MINIMUM_PITCH_HZ), frame_samples - 1)
+  with np.errstate(divide="ignore", invalid="ignore"):
+    normalized = autocorrelation[:, minimum_lag : maximum_lag + 1] / (
+        energy[:, None]
+    )
+  lags = np.nanargmax(np.nan_to_num(normalized, nan=-1.0), axis=1)
+  strength = normalized[np.arange(len(frames)), lags]
+  loud = energy > energy.max(initial=0.0) * 10 ** (_SILENCE_THRESHOLD_DB / 10)
+  voiced = loud & (strength > _VOICING_THRESHOLD)
+  return np.where(voiced, rate / (lags + minimum_lag), np.nan)
+
+
+def diarize_speakers_locally(
+    *,
+    utterance_metadata: Sequence[Mapping[str, str | float]],
+    vocals: np.ndarray,
+    rate: int,
+) -> tuple[list[tuple[str, str]], float]:
+  """Assigns speaker IDs from the PyAnnote labels and genders from the pitch.
+
+  The speakers are numbered in the order of their first utterance, the same
+  way Gemini does it. The gender of a speaker is inferred from the median
+  pitch of all their voiced frames.
+
+  Args:
+    utterance_metadata: The sequence of utterance metadata with the "start",
+      "end" and "speaker_label" keys.
+    vocals: A mono array with the vocals of the whole input file.
+    rate: The sample rate of the vocals in Hz.
+
+  Returns:
+    A tuple with the (speaker_id, ssml_gender) tuples in the order of the
+    utterances and the confidence of the least certain gender, between 0 and
+    1.
+
+  Raises:
+    ValueError: If an utterance doesn't have a speaker label.
+  """
+  if any("speaker_label" not in item for item in utterance_metadata):
+    raise ValueError("Each utterance must have a PyAnnote speaker label.")
+  speaker_ids = {}
+  speaker_pitches = {}
+  for item in utterance_metadata:
+    label = item["speaker_label"]
+    if label not in speaker_ids:
+      speaker_ids[label] = f"speaker_{len(speaker_ids) + 1:02d}"
+      speaker_pitches[label] = []
+    pitch = estimate_pitch(
+        vocals[int(item["start"] * rate) : int(item["end"] * rate)], rate=rate
+    )
+    speaker_pitches[label].append(pitch[~np.isnan(pitch)])
+  speaker_genders = {}
+  confidences = []
+  for label, pitches in speaker_pitches.items():
+    pitch = np.concatenate(pitches)
+    if len(pitch) * _PITCH_HOP_SECONDS < _MINIMUM_VOICED_SECONDS:
+      speaker_genders[label] = _SSML_MALE
+      confidences.append(0.0)
+      continue
+    median_pitch = np.median(pitch)
+    speaker_genders[label] = (
+        _SSML_FEMALE
+        if median_pitch >= _GENDER_PITCH_THRESHOLD_HZ
+        else _SSML_MALE
+    )
+    confidences.append(
+        min(
+            abs(median_pitch - _GENDER_PITCH_THRESHOLD_HZ)
+            / _GENDER_PITCH_MARGIN_HZ,
+            1.0,
+        )
+    )
+  speaker_info = [
+      (
+          speaker_ids[item["speaker_label"]],
+          speaker_genders[item["speaker_label"]],
+      )
+      for item in utterance_metadata
+  ]
+  return speaker_info, min(confidences, default=1.0)
+
+
 class GeminiDiarizationError(Exception):
   """Error when Gemini can't diarize speakers correctly."""
 
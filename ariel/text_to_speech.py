@@ -20,14 +20,15 @@ import io
 import os
 from typing import Final, Mapping, Sequence
 from absl import logging
+from ariel import audio_io
 from ariel import audio_processing
+from ariel import time_stretch
 from elevenlabs import VoiceSettings, save
 from elevenlabs.client import ElevenLabs
 from elevenlabs.client import is_voice_id
 from elevenlabs.types.voice import Voice
 from google.cloud import texttospeech
-from pydub import AudioSegment
-from pydub.effects import speedup
+import numpy as np
 import tensorflow as tf
 
 DUBBED_AUDIO_CHUNKS: Final[str] = "dubbed_audio_chunks"
@@ -460,31 +461,78 @@ def update_utterance_metadata(
   return updated_utterance_metadata
 
 
-def convert_text_to_speech(
+@dataclasses.dataclass
+class SynthesizedSpeech:
+  """The in-memory audio of a synthesized utterance.
+
+  Attributes:
+      samples: The decoded samples of shape (samples, channels).
+      frame_rate: The frame rate of the samples.
+      encoded_audio: The audio exactly as returned by the TTS API if it's
+        already compressed, e.g. the ElevenLabs MP3. It's saved as it is
+        unless the samples are changed.
+  """
+
+  samples: np.ndarray
+  frame_rate: int
+  encoded_audio: bytes | None = None
+
+  @property
+  def duration(self) -> float:
+    """The duration of the speech in seconds."""
+    return len(self.samples) / self.frame_rate
+
+
+def save_speech(speech: SynthesizedSpeech, *, output_filename: str) -> str:
+  """Saves synthesized speech to an MP3 file, encoding it at most once.
+
+  Args:
+      speech: The synthesized speech.
+      output_filename: The name of the output MP3 file.
+
+  Returns:
+      The name of the output file.
+  """
+  if speech.encoded_audio is not None:
+    encoded_audio = speech.encoded_audio
+  else:
+    buffer = io.BytesIO()
+    audio_io.write_audio(
+        buffer,
+        speech.samples,
+        frame_rate=speech.frame_rate,
+        format="mp3",
+        bitrate="320k",
+    )
+    encoded_audio = buffer.getvalue()
+  with tf.io.gfile.GFile(output_filename, "wb") as out:
+    out.write(encoded_audio)
+  return output_filename
+
+
+def synthesize_speech(
     *,
     client: texttospeech.TextToSpeechClient,
     assigned_google_voice: str,
     target_language: str,
-    output_filename: str,
     text: str,
     pitch: float,
     speed: float,
     volume_gain_db: float,
-) -> str:
-  """Converts text to speech using Google Cloud Text-to-Speech API.
+) -> SynthesizedSpeech:
+  """Synthesizes speech in memory using Google Cloud Text-to-Speech API.
 
   Args:
       client: The TextToSpeechClient object to use.
       assigned_google_voice: The name of the Google Cloud voice to use.
       target_language: The target language (ISO 3166-1 alpha-2).
-      output_filename: The name of the output MP3 file.
       text: The text to be converted to speech.
       pitch: The pitch of the synthesized speech.
       speed: The speaking rate of the synthesized speech.
       volume_gain_db: The volume gain of the synthesized speech.
 
   Returns:
-      The name of the output file.
+      The synthesized speech decoded from the LINEAR16 response.
   """
 
   input_text = texttospeech.SynthesisInput(text=text)
@@ -510,14 +558,50 @@ def convert_text_to_speech(
       voice=voice_selection,
       audio_config=audio_config,
   )
-  converted_audio_content = AudioSegment(
-      data=response.audio_content,
+  samples, frame_rate = audio_io.read_audio(
+      io.BytesIO(response.audio_content)
+  )
+  return SynthesizedSpeech(samples=samples, frame_rate=frame_rate)
+
+
+def convert_text_to_speech(
+    *,
+    client: texttospeech.TextToSpeechClient,
+    assigned_google_voice: str,
+    target_language: str,
+    output_filename: str,
+    text: str,
+    pitch: float,
+    speed: float,
+    volume_gain_db: float,
+) -> str:
+  """Converts text to speech using Google Cloud Text-to-Speech API.
+
+  Args:
+      client: The TextToSpeechClient object to use.
+      assigned_google_voice: The name of the Google Cloud voice to use.
+      target_language: The target language (ISO 3166-1 alpha-2).
+      output_filename: The name of the output MP3 file.
+      text: The text to be converted to speech.
+      pitch: The pitch of the synthesized speech.
+      speed: The speaking rate of the synthesized speech.
+      volume_gain_db: The volume gain of the synthesized speech.
+
+  Returns:
+      The name of the output file.
+  """
+  return save_speech(
+      synthesize_speech(
+          client=client,
+          assigned_google_voice=assigned_google_voice,
+          target_language=target_language,
+          text=text,
+          pitch=pitch,
+          speed=speed,
+          volume_gain_db=volume_gain_db,
+      ),
+      output_filename=output_filename,
   )
-  buffer = io.BytesIO()
-  converted_audio_content.export(buffer, format="mp3", bitrate="320k")
-  with tf.io.gfile.GFile(output_filename, "wb") as out:
-    out.write(buffer.getvalue())
-  return output_filename
 
 
 def calculate_target_utterance_speed(
@@ -532,8 +616,7 @@ def calculate_target_utterance_speed(
       dubbed_file: The path to the dubbed MP3 file.
   """
 
-  dubbed_audio = AudioSegment.from_file(dubbed_file)
-  dubbed_duration = dubbed_audio.duration_seconds
+  dubbed_duration = audio_io.get_duration(dubbed_file)
   return dubbed_duration / reference_length
 
 
@@ -619,6 +702,34 @@ def elevenlabs_convert_text_to_speech(
   Returns:
       The path and filename of the saved audio file (same as `output_filename`).
   """
+  audio = _request_elevenlabs_speech(
+      client=client,
+      model=model,
+      assigned_elevenlabs_voice=assigned_elevenlabs_voice,
+      text=text,
+      target_language=target_language,
+      stability=stability,
+      similarity_boost=similarity_boost,
+      style=style,
+      use_speaker_boost=use_speaker_boost,
+  )
+  save(audio, output_filename)
+  return output_filename
+
+
+def _request_elevenlabs_speech(
+    *,
+    client: ElevenLabs,
+    model: str,
+    assigned_elevenlabs_voice: str,
+    text: str,
+    target_language: str,
+    stability: float,
+    similarity_boost: float,
+    style: float,
+    use_speaker_boost: bool,
+) -> bytes:
+  """Returns the MP3 audio of the text synthesized by ElevenLabs."""
   elevenlabs_language_code = (
       target_language.split("-")[0]
       if model == _ALTERNATIVE_ELEVENLABS_MODEL
@@ -638,8 +749,56 @@ def elevenlabs_convert_text_to_speech(
       ),
       language_code=elevenlabs_language_code,
   )
-  save(audio, output_filename)
-  return output_filename
+  return audio if isinstance(audio, bytes) else b"".join(audio)
+
+
+def elevenlabs_synthesize_speech(
+    *,
+    client: ElevenLabs,
+    model: str,
+    assigned_elevenlabs_voice: str,
+    text: str,
+    target_language: str,
+    stability: float = _DEFAULT_STABILITY,
+    similarity_boost: float = _DEFAULT_SIMILARITY_BOOST,
+    style: float = _DEFAULT_STYLE,
+    use_speaker_boost: bool = _DEFAULT_USE_SPEAKER_BOOST,
+) -> SynthesizedSpeech:
+  """Synthesizes speech in memory using the ElevenLabs API.
+
+  Args:
+      client: An authenticated ElevenLabs client object for API interaction.
+      model: The name of the ElevenLabs speech model to use.
+      assigned_elevenlabs_voice: The name of the ElevenLabs voice to use for
+        generation.
+      text: The text content to convert to speech.
+      target_language: The language to dub the ad into. It must be ISO 3166-1
+        alpha-2 country code.
+      stability: Controls the stability of the generated voice (0.0 to 1.0).
+      similarity_boost: Enhances the voice's similarity to the original (0.0 to
+        1.0).
+      style: Adjusts the speaking style (0.0 to 1.0).
+      use_speaker_boost: Whether to use speaker boost to enhance clarity.
+
+  Returns:
+      The synthesized speech, with both the MP3 returned by ElevenLabs and its
+      decoded samples.
+  """
+  encoded_audio = _request_elevenlabs_speech(
+      client=client,
+      model=model,
+      assigned_elevenlabs_voice=assigned_elevenlabs_voice,
+      text=text,
+      target_language=target_language,
+      stability=stability,
+      similarity_boost=similarity_boost,
+      style=style,
+      use_speaker_boost=use_speaker_boost,
+  )
+  samples, frame_rate = audio_io.read_audio(io.BytesIO(encoded_audio))
+  return SynthesizedSpeech(
+      samples=samples, frame_rate=frame_rate, encoded_audio=encoded_audio
+  )
 
 
 @dataclasses.dataclass
@@ -722,28 +881,66 @@ def adjust_audio_speed(
   """Adjusts the speed of an MP3 file to match the reference file duration.
 
   The speed will not be adjusted if the dubbed file has a duration that
-  is the same or shorter than the duration of the reference file.
+  is the same or shorter than the duration of the reference file. The audio is
+  time-stretched with WSOLA, so the pitch of the voice is preserved. The
+  speech synthesized by `TextToSpeech` is stretched in memory with
+  `stretch_speech` instead, so it's never decoded from the MP3 file.
 
   Args:
       speed: The desired speed in seconds. If None it will be determined based
         on the duration of the reference_file and dubbed_file.
       dubbed_path: The path to the dubbed MP3 file.
-      chunk_size: Duration of audio chunks (in ms) to preserve in the
-        adjustement process.
+      chunk_size: Duration of the time-stretch frames (in ms). The shorter
+        frames follow the pitch better, the longer ones the rhythm.
   """
 
-  dubbed_audio = AudioSegment.from_file(dubbed_path)
   if speed <= 1.0:
     return
+  samples, frame_rate = audio_io.read_audio(dubbed_path)
+  speech = stretch_speech(
+      SynthesizedSpeech(samples=samples, frame_rate=frame_rate),
+      speed=speed,
+      chunk_size=chunk_size,
+  )
+  audio_io.write_audio(dubbed_path, speech.samples, frame_rate=frame_rate)
+
+
+def stretch_speech(
+    speech: SynthesizedSpeech,
+    *,
+    speed: float,
+    chunk_size: int = _DEFAULT_CHUNK_SIZE,
+) -> SynthesizedSpeech:
+  """Speeds up in-memory speech to match the reference duration.
+
+  The speech is returned unchanged if the speed is 1.0 or lower. Otherwise
+  the samples are time-stretched with WSOLA, so the pitch of the voice is
+  preserved, and the speech has to be encoded again.
+
+  Args:
+      speech: The synthesized speech.
+      speed: The ratio between the speech and the reference duration.
+      chunk_size: Duration of the time-stretch frames (in ms). The shorter
+        frames follow the pitch better, the longer ones the rhythm.
+
+  Returns:
+      The time-stretched speech.
+  """
+  if speed <= 1.0:
+    return speech
   logging.warning(
       "Adjusting audio speed will prevent overlaps of utterances. However,"
       " it might change the voice sligthly."
   )
-  crossfade = max(1, chunk_size // 2)
-  output_audio = speedup(
-      dubbed_audio, speed, chunk_size=chunk_size, crossfade=crossfade
+  return SynthesizedSpeech(
+      samples=time_stretch.time_stretch(
+          speech.samples,
+          rate=speech.frame_rate,
+          speed=speed,
+          frame_seconds=chunk_size / 1000,
+      ),
+      frame_rate=speech.frame_rate,
   )
-  output_audio.export(dubbed_path, format="mp3")
 
 
 class TextToSpeech:
@@ -811,6 +1008,7 @@ class TextToSpeech:
     self.cloned_voices = None
     self.keep_voice_assignments = keep_voice_assignments
     self.voice_assignments = voice_assignments
+    self._synthesized_speech = {}
 
   def _clone_voices(self) -> Mapping[str, str] | None:
     """Clones voices using ElevenLabs API.
@@ -906,6 +1104,9 @@ class TextToSpeech:
   ) -> Mapping[str, str | float]:
     """Converts the translated text to speech using the chosen TTS engine.
 
+    The synthesized speech is kept in memory until `_adjust_speed` saves it, so
+    it's encoded only once, after the speed adjustment.
+
     Args:
       utterance: A dictionary containing utterance metadata.
 
@@ -913,24 +1114,23 @@ class TextToSpeech:
       The updated utterance metadata with the path to the dubbed audio.
     """
     if not utterance["for_dubbing"]:
-      dubbed_path = utterance["path"]
-    elif utterance["for_dubbing"] and not self.use_elevenlabs:
-      dubbed_path = convert_text_to_speech(
+      utterance.update(dict(dubbed_path=utterance["path"]))
+      return utterance
+    if not self.use_elevenlabs:
+      speech = synthesize_speech(
           client=self.client,
           assigned_google_voice=self._find_voice(utterance),
           target_language=self.target_language,
-          output_filename=self._assign_output_path(utterance),
           text=utterance["translated_text"],
           pitch=utterance["pitch"],
           speed=utterance["speed"],
           volume_gain_db=utterance["volume_gain_db"],
       )
-    elif utterance["for_dubbing"] and self.use_elevenlabs:
-      dubbed_path = elevenlabs_convert_text_to_speech(
+    else:
+      speech = elevenlabs_synthesize_speech(
           client=self.client,
           model=self.elevenlabs_model,
           assigned_elevenlabs_voice=self._find_voice(utterance),
-          output_filename=self._assign_output_path(utterance),
           text=utterance["translated_text"],
           target_language=self.target_language,
           stability=utterance["stability"],
@@ -938,6 +1138,8 @@ class TextToSpeech:
           style=utterance["style"],
           use_speaker_boost=utterance["use_speaker_boost"],
       )
+    dubbed_path = self._assign_output_path(utterance)
+    self._synthesized_speech[dubbed_path] = speech
     utterance.update(dict(dubbed_path=dubbed_path))
     return utterance
 
@@ -978,25 +1180,34 @@ class TextToSpeech:
     return speed != 1.0 and not self.use_elevenlabs and condition_one
 
   def _run_adjust_speed(
-      self, *, utterance: Mapping[str, str | float], speed: float
-  ) -> Mapping[str, str | float]:
-    """Adjusts the speed of the dubbed audio using the `adjust_audio_speed` function.
+      self,
+      *,
+      utterance: Mapping[str, str | float],
+      speed: float,
+      speech: SynthesizedSpeech | None = None,
+  ) -> SynthesizedSpeech | None:
+    """Adjusts the speed of the dubbed audio.
 
     Args:
       utterance: A dictionary containing utterance metadata.
       speed: The target speed for the audio.
+      speech: The speech synthesized for the utterance, if it's still in
+        memory. Otherwise the dubbed audio file is adjusted with the
+        `adjust_audio_speed` function.
 
     Returns:
-      The updated utterance metadata with the adjusted audio.
+      The adjusted speech, or None if the dubbed audio file was adjusted.
     """
     chunk_size = utterance.get("chunk_size", _DEFAULT_CHUNK_SIZE)
+    utterance.update(dict(chunk_size=chunk_size))
+    if speech:
+      return stretch_speech(speech, speed=speed, chunk_size=chunk_size)
     adjust_audio_speed(
         speed=speed,
         dubbed_path=utterance["dubbed_path"],
         chunk_size=chunk_size,
     )
-    utterance.update(dict(chunk_size=chunk_size))
-    return utterance
+    return None
 
   def _adjust_speed(
       self, utterance: Mapping[str, str | float]
@@ -1015,12 +1226,23 @@ class TextToSpeech:
     Returns:
       The updated utterance metadata with the speed-adjusted audio.
     """
+    if not utterance["for_dubbing"] and "sample_range" in utterance:
+      # The virtual chunks play the original audio, which is never adjusted.
+      utterance.update(dict(speed=1.0))
+      return utterance
     reference_length = utterance["end"] - utterance["start"]
-    speed = calculate_target_utterance_speed(
-        reference_length=reference_length, dubbed_file=utterance["dubbed_path"]
-    )
+    speech = self._synthesized_speech.pop(utterance["dubbed_path"], None)
+    if speech:
+      speed = speech.duration / reference_length
+    else:
+      speed = calculate_target_utterance_speed(
+          reference_length=reference_length,
+          dubbed_file=utterance["dubbed_path"],
+      )
     if self._verify_run_adjust_speed_elevenlabs_google(utterance):
-      self._run_adjust_speed(utterance=utterance, speed=speed)
+      speech = self._run_adjust_speed(
+          utterance=utterance, speed=speed, speech=speech
+      )
     if self._verify_run_adjust_speed_google(utterance, speed=speed):
       convert_text_to_speech(
           client=self.client,
@@ -1032,6 +1254,8 @@ class TextToSpeech:
           speed=speed,
           volume_gain_db=utterance["volume_gain_db"],
       )
+    elif speech:
+      save_speech(speech, output_filename=utterance["dubbed_path"])
     utterance.update(dict(speed=speed))
     return utterance
 
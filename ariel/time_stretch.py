@@ -0,0 +1,88 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A time-stretch module of Ariel package from the Google EMEA gTech Ads Data Science.
+
+It changes the tempo of speech without changing its pitch with the Waveform
+Similarity Overlap-Add (WSOLA) algorithm working on NumPy arrays.
+"""
+
+from typing import Final
+import numpy as np
+from scipy import signal
+
+_DEFAULT_FRAME_SECONDS: Final[float] = 0.04
+_TOLERANCE_RATIO: Final[float] = 0.5
+
+
+def time_stretch(
+    samples: np.ndarray,
+    *,
+    rate: int,
+    speed: float,
+    frame_seconds: float = _DEFAULT_FRAME_SECONDS,
+) -> np.ndarray:
+  """Changes the tempo of audio while preserving its pitch.
+
+  The output is built from Hann-windowed frames overlapping by half. Each
+  frame is read around its ideal position in the input, shifted by up to half
+  a hop so that its first half is the most similar to the natural continuation
+  of the previous frame. The overlap-add is done for all the frames at once.
+
+  Args:
+    samples: An array of shape (samples, channels).
+    rate: The sample rate of the audio in Hz.
+    speed: The tempo ratio. Values above 1.0 speed the audio up and values
+      below 1.0 slow it down.
+    frame_seconds: The duration of the frames in seconds.
+
+  Returns:
+    A float32 array of shape (round(samples / speed), channels).
+
+  Raises:
+    ValueError: If the speed is not positive.
+  """
+  if speed <= 0:
+    raise ValueError(f"The speed must be positive, got: {speed}")
+  samples = np.asarray(samples, dtype=np.float32)
+  output_length = int(round(len(samples) / speed))
+  hop = max(1, int(round(frame_seconds * rate / 2)))
+  frame = 2 * hop
+  tolerance = max(1, int(hop * _TOLERANCE_RATIO))
+  frame_count = -(-output_length // hop) + 1
+  ideal_positions = tolerance + np.round(
+      np.arange(frame_count) * hop * speed
+  ).astype(int)
+  lead = hop + tolerance
+  padded_length = ideal_positions[-1] + 2 * tolerance + 2 * frame
+  padded = np.zeros((padded_length, samples.shape[1]), dtype=np.float32)
+  padded[lead : lead + len(samples)] = samples
+  mono = padded.mean(1)
+  positions = ideal_positions.copy()
+  for index in range(1, frame_count):
+    continuation_start = positions[index - 1] + hop
+    search_start = ideal_positions[index] - tolerance
+    similarity = np.correlate(
+        mono[search_start : search_start + 2 * tolerance + hop],
+        mono[continuation_start : continuation_start + hop],
+    )
+    if similarity.any():
+      positions[index] = search_start + np.argmax(similarity)
+
+  window = signal.windows.hann(frame, sym=False).astype(np.float32)
+  frames = padded[positions[:, None] + np.arange(frame)] * window[:, None]
+  output = np.zeros(((frame_count + 1) * hop, samples.shape[1]), np.float32)
+  output[: frame_count * hop] += frames[:, :hop].reshape(-1, samples.shape[1])
+  output[hop:] += frames[:, hop:].reshape(-1, samples.shape[1])
+  return output[hop : hop + output_length]
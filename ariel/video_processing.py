@@ -15,9 +15,12 @@
 """An video processing module of Ariel package from the Google EMEA gTech Ads Data Science."""
 
 import os
-from typing import Final
+import subprocess
+from typing import Final, Mapping, Sequence
 from absl import logging
+from moviepy.config import get_setting
 from moviepy.editor import AudioFileClip, VideoFileClip, concatenate_videoclips
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
 import tensorflow as tf
 
 VIDEO_PROCESSING: Final[str] = "video_processing"
@@ -25,16 +28,159 @@ _OUTPUT: Final[str] = "output"
 _DEFAULT_FPS: Final[int] = 30
 _DEFAULT_DUBBED_VIDEO_FILE: Final[str] = "dubbed_video"
 _DEFAULT_OUTPUT_FORMAT: Final[str] = ".mp4"
+_DEFAULT_AUDIO_SAMPLE_RATE: Final[int] = 44100
+_MULTI_LANGUAGE_SUFFIX: Final[str] = "_multi_language"
+_MULTI_LANGUAGE_OUTPUT_FORMATS: Final[tuple[str, ...]] = (".mp4", ".mkv")
+_UNDEFINED_LANGUAGE_CODE: Final[str] = "und"
+_ISO_639_2_LANGUAGE_CODES: Final[Mapping[str, str]] = {
+    "ar": "ara",
+    "bg": "bul",
+    "bn": "ben",
+    "cs": "ces",
+    "da": "dan",
+    "de": "deu",
+    "el": "ell",
+    "en": "eng",
+    "es": "spa",
+    "et": "est",
+    "fi": "fin",
+    "fr": "fra",
+    "gu": "guj",
+    "he": "heb",
+    "hi": "hin",
+    "hr": "hrv",
+    "hu": "hun",
+    "id": "ind",
+    "it": "ita",
+    "ja": "jpn",
+    "kn": "kan",
+    "ko": "kor",
+    "lt": "lit",
+    "lv": "lav",
+    "ml": "mal",
+    "mr": "mar",
+    "nb": "nob",
+    "nl": "nld",
+    "nn": "nno",
+    "pl": "pol",
+    "pt": "por",
+    "ro": "ron",
+    "ru": "rus",
+    "sk": "slk",
+    "sl": "slv",
+    "sr": "srp",
+    "sv": "swe",
+    "sw": "swa",
+    "ta": "tam",
+    "te": "tel",
+    "th": "tha",
+    "tr": "tur",
+    "uk": "ukr",
+    "vi": "vie",
+    "zh": "zho",
+}
+
+
+class FFmpegCommandError(Exception):
+  """Error when an FFmpeg command can't be executed successfully."""
+
+  pass
+
+
+_STREAM_COPY_ERRORS: Final[tuple[type[Exception], ...]] = (
+    FFmpegCommandError,
+    IOError,
+    KeyError,
+)
+
+
+def _run_ffmpeg(arguments: Sequence[str]) -> None:
+  """Runs FFmpeg with the provided arguments.
+
+  The FFmpeg binary is the same one MoviePy is configured to use.
+
+  Args:
+      arguments: The command line arguments passed to FFmpeg.
+
+  Raises:
+      FFmpegCommandError: If FFmpeg exits with a non-zero status.
+  """
+  command = [get_setting("FFMPEG_BINARY"), "-y", "-loglevel", "error"]
+  command.extend(arguments)
+  try:
+    subprocess.run(command, capture_output=True, text=True, check=True)
+  except subprocess.CalledProcessError as error:
+    raise FFmpegCommandError(
+        f"Error when running FFmpeg: {error}\n{error.stderr}"
+    )
+
+
+def _split_audio_video_with_stream_copy(
+    *, video_file: str, video_output_file: str, audio_output_file: str
+) -> None:
+  """Demuxes the video stream and extracts the audio in a single FFmpeg pass.
+
+  The video stream is copied bit-for-bit, without decoding or re-encoding.
+
+  Args:
+      video_file: The full path to the input video file.
+      video_output_file: The full path to the output video file with no audio.
+      audio_output_file: The full path to the output MP3 audio file.
+  """
+  _run_ffmpeg([
+      "-i",
+      video_file,
+      "-map",
+      "0:v:0",
+      "-c:v",
+      "copy",
+      "-an",
+      video_output_file,
+      "-map",
+      "0:a:0",
+      "-vn",
+      "-ar",
+      str(_DEFAULT_AUDIO_SAMPLE_RATE),
+      "-c:a",
+      "libmp3lame",
+      audio_output_file,
+  ])
+
+
+def _split_audio_video_with_reencoding(
+    *, video_file: str, video_output_file: str, audio_output_file: str
+) -> None:
+  """Splits an audio/video file by decoding it and re-encoding the video.
+
+  Args:
+      video_file: The full path to the input video file.
+      video_output_file: The full path to the output video file with no audio.
+      audio_output_file: The full path to the output MP3 audio file.
+  """
+  with VideoFileClip(video_file) as video_clip:
+    audio_clip = video_clip.audio
+    audio_clip.write_audiofile(audio_output_file, verbose=False, logger=None)
+    video_clip_without_audio = video_clip.set_audio(None)
+    fps = video_clip.fps or _DEFAULT_FPS
+    video_clip_without_audio.write_videofile(
+        video_output_file, codec="libx264", fps=fps, verbose=False, logger=None
+    )
 
 
 def split_audio_video(
-    *, video_file: str, output_directory: str
+    *, video_file: str, output_directory: str, stream_copy: bool = True
 ) -> tuple[str, str]:
   """Splits an audio/video file into separate audio and video files.
 
+  By default the video stream is copied as-is into the output file and the
+  audio is extracted in the same FFmpeg pass. The video is re-encoded with
+  'libx264' only when the stream copy fails, e.g. when the codec can't be
+  stored in an MP4 container.
+
   Args:
       video_file: The full path to the input video file.
       output_directory: The full path to the output directory.
+      stream_copy: Whether to copy the video stream without re-encoding it.
 
   Returns:
     A tuple with a path to a video ad file with no audio and the second path to
@@ -57,48 +203,138 @@ def split_audio_video(
         f" files {video_output_file} and {audio_output_file} already exist."
     )
     return video_output_file, audio_output_file
-  with VideoFileClip(video_file) as video_clip:
-    audio_clip = video_clip.audio
-    audio_clip.write_audiofile(audio_output_file, verbose=False, logger=None)
-    video_clip_without_audio = video_clip.set_audio(None)
-    fps = video_clip.fps or _DEFAULT_FPS
-    video_clip_without_audio.write_videofile(
-        video_output_file, codec="libx264", fps=fps, verbose=False, logger=None
-    )
+  if stream_copy:
+    try:
+      _split_audio_video_with_stream_copy(
+          video_file=video_file,
+          video_output_file=video_output_file,
+          audio_output_file=audio_output_file,
+      )
+      return video_output_file, audio_output_file
+    except FFmpegCommandError as error:
+      logging.warning(
+          "The video stream could not be copied, it will be re-encoded"
+          f" instead: {error}"
+      )
+  _split_audio_video_with_reencoding(
+      video_file=video_file,
+      video_output_file=video_output_file,
+      audio_output_file=audio_output_file,
+  )
   return video_output_file, audio_output_file
 
 
+def _get_video_duration(video_file: str) -> float:
+  """Returns the duration of the video stream of a file in seconds.
+
+  Args:
+      video_file: Path to the video file.
+
+  Raises:
+      IOError: If FFmpeg can't read the file.
+      KeyError: If FFmpeg reports no duration for the file.
+  """
+  video_information = ffmpeg_parse_infos(video_file)
+  return video_information.get("video_duration", video_information["duration"])
+
+
+def _combine_audio_video_with_stream_copy(
+    *, video_file: str, dubbed_audio_file: str, dubbed_video_file: str
+) -> None:
+  """Muxes the dubbed audio with the video stream copied as-is.
+
+  Only the audio is encoded (to AAC). It's padded with silence or trimmed to
+  match the video duration.
+
+  Args:
+      video_file: Path to the video file.
+      dubbed_audio_file: Path to the audio file.
+      dubbed_video_file: Path to the output video file.
+
+  Raises:
+      FFmpegCommandError: If FFmpeg can't copy the video stream.
+      IOError: If FFmpeg can't read the video file.
+      KeyError: If FFmpeg reports no duration for the video file.
+  """
+  video_duration = _get_video_duration(video_file)
+  _run_ffmpeg([
+      "-i",
+      video_file,
+      "-i",
+      dubbed_audio_file,
+      "-map",
+      "0:v:0",
+      "-map",
+      "1:a:0",
+      "-c:v",
+      "copy",
+      "-c:a",
+      "aac",
+      "-af",
+      "apad",
+      "-t",
+      str(video_duration),
+      dubbed_video_file,
+  ])
+
+
+def _combine_audio_video_with_reencoding(
+    *, video_file: str, dubbed_audio_file: str, dubbed_video_file: str
+) -> None:
+  """Combines an audio file with a video file by re-encoding the video.
+
+  Args:
+      video_file: Path to the video file.
+      dubbed_audio_file: Path to the audio file.
+      dubbed_video_file: Path to the output video file.
+  """
+  video = VideoFileClip(video_file)
+  audio = AudioFileClip(dubbed_audio_file)
+  duration_difference = video.duration - audio.duration
+  if duration_difference > 0:
+    silence = AudioFileClip(duration=duration_difference).set_duration(
+        duration_difference
+    )
+    audio = concatenate_videoclips([audio, silence])
+  elif duration_difference < 0:
+    audio = audio.subclip(0, video.duration)
+  final_clip = video.set_audio(audio)
+  final_clip.write_videofile(
+      dubbed_video_file,
+      codec="libx264",
+      audio_codec="aac",
+      temp_audiofile="temp-audio.m4a",
+      remove_temp=True,
+      verbose=False,
+      logger=None,
+  )
+
+
 def combine_audio_video(
     *,
     video_file: str,
     dubbed_audio_file: str,
     output_directory: str,
     target_language: str,
+    stream_copy: bool = True,
 ) -> str:
   """Combines an audio file with a video file, ensuring they have the same duration.
 
+  By default the video stream is copied without re-encoding and only the dubbed
+  audio is encoded to AAC. The video is re-encoded with 'libx264' only when
+  the stream copy fails.
+
   Args:
     video_file: Path to the video file.
     dubbed_audio_file: Path to the audio file.
     output_directory: Path to save the combined video file.
     target_language: The language to dub the ad into. It must be ISO 3166-1
       alpha-2 country code.
+    stream_copy: Whether to copy the video stream without re-encoding it.
 
   Returns:
     The path to the output video file with dubbed audio.
   """
-
-  video = VideoFileClip(video_file)
-  audio = AudioFileClip(dubbed_audio_file)
-  duration_difference = video.duration - audio.duration
-  if duration_difference > 0:
-    silence = AudioFileClip(duration=duration_difference).set_duration(
-        duration_difference
-    )
-    audio = concatenate_videoclips([audio, silence])
-  elif duration_difference < 0:
-    audio = audio.subclip(0, video.duration)
-  final_clip = video.set_audio(audio)
   target_language_suffix = "_" + target_language.replace("-", "_").lower()
   dubbed_video_file = os.path.join(
       output_directory,
@@ -107,13 +343,155 @@ def combine_audio_video(
       + target_language_suffix
       + _DEFAULT_OUTPUT_FORMAT,
   )
-  final_clip.write_videofile(
-      dubbed_video_file,
-      codec="libx264",
-      audio_codec="aac",
-      temp_audiofile="temp-audio.m4a",
-      remove_temp=True,
-      verbose=False,
-      logger=None,
+  if stream_copy:
+    try:
+      _combine_audio_video_with_stream_copy(
+          video_file=video_file,
+          dubbed_audio_file=dubbed_audio_file,
+          dubbed_video_file=dubbed_video_file,
+      )
+      return dubbed_video_file
+    except _STREAM_COPY_ERRORS as error:
+      logging.warning(
+          "The video stream could not be copied, it will be re-encoded"
+          f" instead: {error}"
+      )
+  _combine_audio_video_with_reencoding(
+      video_file=video_file,
+      dubbed_audio_file=dubbed_audio_file,
+      dubbed_video_file=dubbed_video_file,
   )
   return dubbed_video_file
+
+
+def _get_language_tag(language: str) -> str:
+  """Returns the ISO 639-2 language tag for audio track metadata.
+
+  Args:
+    language: The language in the ISO 3166-1 alpha-2 format, e.g. 'fr-FR'.
+
+  Returns:
+    The three-letter ISO 639-2 code, e.g. 'fra', or 'und' if it's unknown.
+  """
+  primary_language = language.split("-")[0].lower()
+  return _ISO_639_2_LANGUAGE_CODES.get(
+      primary_language, _UNDEFINED_LANGUAGE_CODE
+  )
+
+
+def _build_multi_language_command(
+    *,
+    video_file: str,
+    dubbed_audio_files: Mapping[str, str],
+    dubbed_video_file: str,
+    video_duration: float | None,
+    stream_copy: bool,
+) -> Sequence[str]:
+  """Builds the FFmpeg arguments muxing N language-tagged audio tracks.
+
+  Args:
+    video_file: Path to the video file.
+    dubbed_audio_files: A mapping between target languages and the paths to
+      their dubbed audio files.
+    dubbed_video_file: Path to the output video file.
+    video_duration: The duration of the video in seconds. When it's unknown,
+      the output ends with the video stream instead.
+    stream_copy: Whether to copy the video stream without re-encoding it.
+
+  Returns:
+    A sequence with the FFmpeg arguments.
+  """
+  arguments = ["-i", video_file]
+  for dubbed_audio_file in dubbed_audio_files.values():
+    arguments.extend(["-i", dubbed_audio_file])
+  arguments.extend(["-map", "0:v:0"])
+  for input_index in range(1, len(dubbed_audio_files) + 1):
+    arguments.extend(["-map", f"{input_index}:a:0"])
+  arguments.extend(["-c:v", "copy" if stream_copy else "libx264"])
+  arguments.extend(["-c:a", "aac", "-af", "apad"])
+  for track_index, target_language in enumerate(dubbed_audio_files):
+    arguments.extend([
+        f"-metadata:s:a:{track_index}",
+        f"language={_get_language_tag(target_language)}",
+        f"-metadata:s:a:{track_index}",
+        f"title={target_language}",
+        f"-disposition:a:{track_index}",
+        "default" if track_index == 0 else "0",
+    ])
+  if video_duration is None:
+    arguments.append("-shortest")
+  else:
+    arguments.extend(["-t", str(video_duration)])
+  arguments.append(dubbed_video_file)
+  return arguments
+
+
+def combine_audio_video_multi_language(
+    *,
+    video_file: str,
+    dubbed_audio_files: Mapping[str, str],
+    output_directory: str,
+    output_format: str = _DEFAULT_OUTPUT_FORMAT,
+) -> str:
+  """Combines dubbed audio files in several languages with one video file.
+
+  The output is a single container with one language-tagged audio track per
+  target language. The video stream is copied without re-encoding, unless the
+  stream copy fails. Each audio track is padded or trimmed to the video
+  duration.
+
+  Args:
+    video_file: Path to the video file.
+    dubbed_audio_files: A mapping between target languages (ISO 3166-1 alpha-2
+      country codes) and the paths to their dubbed audio files. The first
+      language becomes the default audio track.
+    output_directory: Path to save the combined video file.
+    output_format: The container format of the output file, either '.mp4' or
+      '.mkv'.
+
+  Returns:
+    The path to the output video file with all the dubbed audio tracks.
+
+  Raises:
+    ValueError: If no dubbed audio files are provided or the output format is
+    not supported.
+  """
+  if not dubbed_audio_files:
+    raise ValueError("At least one dubbed audio file must be provided.")
+  if output_format not in _MULTI_LANGUAGE_OUTPUT_FORMATS:
+    raise ValueError(
+        f"Unsupported output format: {output_format}. It must be one of:"
+        f" {', '.join(_MULTI_LANGUAGE_OUTPUT_FORMATS)}."
+    )
+  dubbed_video_file = os.path.join(
+      output_directory,
+      _OUTPUT,
+      _DEFAULT_DUBBED_VIDEO_FILE + _MULTI_LANGUAGE_SUFFIX + output_format,
+  )
+  video_duration = None
+  try:
+    video_duration = _get_video_duration(video_file)
+    _run_ffmpeg(
+        _build_multi_language_command(
+            video_file=video_file,
+            dubbed_audio_files=dubbed_audio_files,
+            dubbed_video_file=dubbed_video_file,
+            video_duration=video_duration,
+            stream_copy=True,
+        )
+    )
+  except _STREAM_COPY_ERRORS as error:
+    logging.warning(
+        "The video stream could not be copied, it will be re-encoded"
+        f" instead: {error}"
+    )
+    _run_ffmpeg(
+        _build_multi_language_command(
+            video_file=video_file,
+            dubbed_audio_files=dubbed_audio_files,
+            dubbed_video_file=dubbed_video_file,
+            video_duration=video_duration,
+            stream_copy=False,
+        )
+    )
+  return dubbed_video_file
@@ -300,6 +300,9 @@ class GcpDubbingProcessor:
 		self.dubber_params["gcp_region"] = self.region
 		self.dubber_params['with_verification'] = False
 		self.dubber_params['clean_up'] = False
+		# Keeps the dubbed vocals timeline between the renders, so a re-render
+		# after a review re-mixes only the edited utterances.
+		self.dubber_params['cache_vocals_mix'] = True
 		self.dubber_params["vocals_audio_file"]= None
 		self.dubber_params["background_audio_file"]= None
 
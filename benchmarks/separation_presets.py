@@ -0,0 +1,146 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmarks the Demucs separation presets on an audio file.
+
+For every preset it reports the separation wall time, the real-time factor,
+the level of the vocals one more separation round would remove from the
+background and the signal-to-distortion ratio (SDR) of the separated tracks.
+The level is the one the early stopping of the rounds compares against
+`residual_vocals_threshold_db`, so it shows which threshold would stop on the
+audio. The SDR is calculated against the reference tracks when they are
+provided, and against the 'max' preset otherwise.
+
+Example:
+  python benchmarks/separation_presets.py --input_file=ad.mp3
+"""
+
+import time
+from typing import Final, Sequence
+from absl import app
+from absl import flags
+from absl import logging
+from ariel import audio_processing
+import torch
+
+_REFERENCE_PRESET: Final[str] = "max"
+
+_INPUT_FILE = flags.DEFINE_string(
+    "input_file", None, "Path to the audio file to separate."
+)
+_REFERENCE_VOCALS_FILE = flags.DEFINE_string(
+    "reference_vocals_file",
+    None,
+    "An optional path to the ground truth vocals of the input file.",
+)
+_REFERENCE_BACKGROUND_FILE = flags.DEFINE_string(
+    "reference_background_file",
+    None,
+    "An optional path to the ground truth background of the input file.",
+)
+_PRESETS = flags.DEFINE_list(
+    "presets",
+    list(audio_processing.SEPARATION_PRESETS),
+    "The separation presets to benchmark.",
+)
+_VOICE_SEPARATION_ROUNDS = flags.DEFINE_integer(
+    "voice_separation_rounds",
+    1,
+    "The number of voice separation rounds.",
+)
+_DEVICE = flags.DEFINE_enum(
+    "device",
+    "cuda" if torch.cuda.is_available() else "cpu",
+    ["cpu", "cuda"],
+    "The device to run Demucs on.",
+)
+
+
+def main(argv: Sequence[str]) -> None:
+  """Runs the separation benchmark for every requested preset."""
+  if len(argv) > 1:
+    raise app.UsageError("Too many command-line arguments.")
+  separators = {
+      preset: audio_processing.DemucsSeparator.from_preset(
+          preset, device=_DEVICE.value
+      )
+      for preset in _PRESETS.value
+  }
+  reference_separator = next(iter(separators.values()))
+  waveform = reference_separator.read_audio(_INPUT_FILE.value)
+  duration = waveform.shape[-1] / reference_separator.sample_rate
+  reference_tracks = None
+  if _REFERENCE_VOCALS_FILE.value and _REFERENCE_BACKGROUND_FILE.value:
+    reference_tracks = (
+        reference_separator.read_audio(_REFERENCE_VOCALS_FILE.value),
+        reference_separator.read_audio(_REFERENCE_BACKGROUND_FILE.value),
+    )
+  if reference_tracks is None and _REFERENCE_PRESET in separators:
+    separators = {
+        _REFERENCE_PRESET: separators.pop(_REFERENCE_PRESET),
+        **separators,
+    }
+  results = []
+  for preset, separator in separators.items():
+    separator.separate(waveform[..., : separator.sample_rate])
+    start_time = time.perf_counter()
+    vocals, background = separator.separate_in_rounds(
+        waveform,
+        voice_separation_rounds=_VOICE_SEPARATION_ROUNDS.value,
+        residual_vocals_threshold_db=None,
+    )
+    wall_time = time.perf_counter() - start_time
+    if reference_tracks is None and preset == _REFERENCE_PRESET:
+      reference_tracks = (vocals, background)
+    if reference_tracks is None:
+      vocals_sdr = background_sdr = float("nan")
+    else:
+      length = min(vocals.shape[-1], reference_tracks[0].shape[-1])
+      vocals_sdr = audio_processing.signal_to_distortion_ratio(
+          reference=reference_tracks[0][..., :length],
+          estimate=vocals[..., :length],
+      )
+      background_sdr = audio_processing.signal_to_distortion_ratio(
+          reference=reference_tracks[1][..., :length],
+          estimate=background[..., :length],
+      )
+    next_round_vocals, next_round_background = separator.separate(background)
+    next_round_db = audio_processing.measure_vocals_db(
+        vocals=next_round_vocals, background=next_round_background
+    )
+    results.append((
+        preset,
+        wall_time,
+        wall_time / duration,
+        next_round_db,
+        vocals_sdr,
+        background_sdr,
+    ))
+  logging.info(f"Benchmarked a {duration:.1f} second audio file.")
+  print(
+      f"{'preset':<10}{'time [s]':>10}{'RTF':>8}{'next round [dB]':>17}"
+      f"{'vocals SDR':>12}{'background SDR':>16}"
+  )
+  for preset, wall_time, rtf, next_round_db, vocals_sdr, background_sdr in (
+      results
+  ):
+    print(
+        f"{preset:<10}{wall_time:>10.2f}{rtf:>8.3f}{next_round_db:>17.1f}"
+        f"{vocals_sdr:>12.1f}{background_sdr:>16.1f}"
+    )
+
+
+if __name__ == "__main__":
+  flags.mark_flag_as_required("input_file")
+  app.run(main)
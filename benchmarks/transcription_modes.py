@@ -0,0 +1,137 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmarks the per-chunk and the full-track transcription modes.
+
+Both modes transcribe the utterances of an utterance metadata file saved by
+the Dubber. For every mode it reports the transcription wall time and the
+real-time factor, and for the full-track mode also the word error rate (WER)
+against the per-chunk transcripts, which shows how much the modes agree.
+
+Example:
+  python benchmarks/transcription_modes.py --input_file=ad.mp3
+    --utterance_metadata_file=utterance_metadata.json --original_language=en
+"""
+
+import json
+import tempfile
+import time
+from typing import Sequence
+from absl import app
+from absl import flags
+from absl import logging
+from ariel import audio_processing
+from ariel import speech_to_text
+from faster_whisper import WhisperModel
+import torch
+
+_INPUT_FILE = flags.DEFINE_string(
+    "input_file", None, "Path to the audio file to transcribe."
+)
+_UTTERANCE_METADATA_FILE = flags.DEFINE_string(
+    "utterance_metadata_file",
+    None,
+    "Path to a JSON file with the utterances and their 'start' and 'end'"
+    " keys.",
+)
+_ORIGINAL_LANGUAGE = flags.DEFINE_string(
+    "original_language", None, "The language of the audio, e.g. 'en-US'."
+)
+_ADVERTISER_NAME = flags.DEFINE_string(
+    "advertiser_name", "", "The name of the advertiser to use as a hotword."
+)
+_MODEL = flags.DEFINE_string(
+    "model", "large-v3", "The Whisper model to transcribe with."
+)
+_TRANSCRIPTION_BATCH_SIZE = flags.DEFINE_integer(
+    "transcription_batch_size",
+    1,
+    "The number of utterances decoded at once in the per-chunk mode.",
+)
+_DEVICE = flags.DEFINE_enum(
+    "device",
+    "cuda" if torch.cuda.is_available() else "cpu",
+    ["cpu", "cuda"],
+    "The device to run Whisper on.",
+)
+
+
+def main(argv: Sequence[str]) -> None:
+  """Runs both transcription modes and compares their transcripts."""
+  if len(argv) > 1:
+    raise app.UsageError("Too many command-line arguments.")
+  with open(_UTTERANCE_METADATA_FILE.value, "r", encoding="utf-8") as file:
+    utterance_metadata = json.load(file)
+  model = WhisperModel(
+      model_size_or_path=_MODEL.value,
+      device=_DEVICE.value,
+      compute_type="float16" if _DEVICE.value == "cuda" else "int8",
+  )
+  with tempfile.TemporaryDirectory() as cache_directory:
+    audio_store = audio_processing.DecodedAudioStore(
+        audio_file=_INPUT_FILE.value, cache_directory=cache_directory
+    )
+    samples = audio_store.get_speech_samples()[:, 0]
+    duration = audio_store.duration
+    start_time = time.perf_counter()
+    chunk_utterances = speech_to_text.transcribe_audio_chunks(
+        utterance_metadata=utterance_metadata,
+        advertiser_name=_ADVERTISER_NAME.value,
+        original_language=_ORIGINAL_LANGUAGE.value,
+        model=model,
+        no_dubbing_phrases=[],
+        audio_store=audio_store,
+        batch_size=_TRANSCRIPTION_BATCH_SIZE.value,
+    )
+    chunks_time = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    full_track_utterances = speech_to_text.transcribe_full_track(
+        audio=samples,
+        utterance_metadata=utterance_metadata,
+        advertiser_name=_ADVERTISER_NAME.value,
+        original_language=_ORIGINAL_LANGUAGE.value,
+        model=model,
+        no_dubbing_phrases=[],
+    )
+    full_track_time = time.perf_counter() - start_time
+  agreement_wer = speech_to_text.word_error_rate(
+      reference=" ".join(item["text"] for item in chunk_utterances),
+      hypothesis=" ".join(item["text"] for item in full_track_utterances),
+  )
+  logging.info(
+      f"Benchmarked {len(utterance_metadata)} utterances of a"
+      f" {duration:.1f} second audio file."
+  )
+  print(f"{'mode':<12}{'time [s]':>10}{'RTF':>8}{'WER vs chunks':>15}")
+  print(f"{'chunks':<12}{chunks_time:>10.2f}{chunks_time / duration:>8.3f}")
+  print(
+      f"{'full_track':<12}{full_track_time:>10.2f}"
+      f"{full_track_time / duration:>8.3f}{agreement_wer:>15.3f}"
+  )
+  for chunk_item, full_track_item in zip(
+      chunk_utterances, full_track_utterances
+  ):
+    if chunk_item["text"] != full_track_item["text"]:
+      logging.info(
+          f"[{chunk_item['start']:.2f}-{chunk_item['end']:.2f}]"
+          f" chunks: {chunk_item['text']!r}"
+          f" full_track: {full_track_item['text']!r}"
+      )
+
+
+if __name__ == "__main__":
+  flags.mark_flags_as_required(
+      ["input_file", "utterance_metadata_file", "original_language"]
+  )
+  app.run(main)
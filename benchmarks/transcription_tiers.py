@@ -0,0 +1,199 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmarks the Whisper model tiers on a directory of reference clips.
+
+Every audio clip in the directory needs a reference transcript next to it,
+in a text file with the same name, e.g. 'ad.mp3' and 'ad.txt'. For every
+model it reports the model loading time, the real-time factor (RTF) of the
+transcription, the peak memory of the process and the mean word error rate
+(WER) against the reference transcripts. Each model runs in a separate
+process, so that the peak memory is measured for that model only.
+
+Example:
+  python benchmarks/transcription_tiers.py --clips_directory=clips
+    --original_language=en --models=large-v3,medium,distil-large-v3
+"""
+
+import multiprocessing
+import os
+import resource
+import time
+from typing import Final, Sequence
+from absl import app
+from absl import flags
+from absl import logging
+from ariel import audio_io
+from ariel import speech_to_text
+from faster_whisper import WhisperModel
+import torch
+
+_AUDIO_EXTENSIONS: Final[tuple[str, ...]] = (".mp3", ".wav", ".flac", ".m4a")
+_TRANSCRIPT_EXTENSION: Final[str] = ".txt"
+_SAMPLE_RATE: Final[int] = 16000
+
+_CLIPS_DIRECTORY = flags.DEFINE_string(
+    "clips_directory",
+    None,
+    "The directory with the audio clips and their reference transcripts.",
+)
+_ORIGINAL_LANGUAGE = flags.DEFINE_string(
+    "original_language", None, "The language of the clips, e.g. 'en-US'."
+)
+_MODELS = flags.DEFINE_list(
+    "models",
+    ["large-v3", "distil-large-v3", "medium", "small"],
+    "The Whisper models to benchmark.",
+)
+_COMPUTE_TYPE = flags.DEFINE_string(
+    "compute_type",
+    None,
+    "The compute type of the models. By default 'float16' is used on CUDA"
+    " and 'int8' on CPU.",
+)
+_BEAM_SIZE = flags.DEFINE_integer(
+    "beam_size", 5, "The beam size used for decoding."
+)
+_DEVICE = flags.DEFINE_enum(
+    "device",
+    "cuda" if torch.cuda.is_available() else "cpu",
+    ["cpu", "cuda"],
+    "The device to run Whisper on.",
+)
+
+
+def _find_clips(clips_directory: str) -> list[tuple[str, str]]:
+  """Returns the (audio path, reference transcript) pairs of the clips."""
+  clips = []
+  for file_name in sorted(os.listdir(clips_directory)):
+    name, extension = os.path.splitext(file_name)
+    if extension.lower() not in _AUDIO_EXTENSIONS:
+      continue
+    transcript_path = os.path.join(
+        clips_directory, name + _TRANSCRIPT_EXTENSION
+    )
+    if not os.path.exists(transcript_path):
+      logging.warning(f"Skipping {file_name} without a reference transcript.")
+      continue
+    with open(transcript_path, "r", encoding="utf-8") as transcript_file:
+      clips.append(
+          (os.path.join(clips_directory, file_name), transcript_file.read())
+      )
+  return clips
+
+
+def _benchmark_model(
+    *,
+    model_name: str,
+    clips: Sequence[tuple[str, str]],
+    original_language: str,
+    device: str,
+    compute_type: str,
+    beam_size: int,
+) -> tuple[float, float, float, float]:
+  """Transcribes all the clips with one model.
+
+  Args:
+    model_name: The Whisper model to benchmark.
+    clips: The (audio path, reference transcript) pairs of the clips.
+    original_language: The language of the clips.
+    device: The device to run Whisper on.
+    compute_type: The compute type of the model.
+    beam_size: The beam size used for decoding.
+
+  Returns:
+    A tuple with the model loading time in seconds, the real-time factor, the
+    peak memory of the process in MiB and the mean WER.
+  """
+  start_time = time.perf_counter()
+  model = WhisperModel(
+      model_size_or_path=model_name, device=device, compute_type=compute_type
+  )
+  loading_time = time.perf_counter() - start_time
+  total_duration = total_time = 0.0
+  word_error_rates = []
+  for audio_path, reference in clips:
+    samples, _ = audio_io.read_audio(
+        audio_path, frame_rate=_SAMPLE_RATE, channels=1
+    )
+    start_time = time.perf_counter()
+    hypothesis = speech_to_text.transcribe(
+        vocals_filepath=samples[:, 0],
+        advertiser_name="",
+        original_language=original_language,
+        model=model,
+        beam_size=beam_size,
+    )
+    total_time += time.perf_counter() - start_time
+    total_duration += len(samples) / _SAMPLE_RATE
+    word_error_rates.append(
+        speech_to_text.word_error_rate(
+            reference=reference, hypothesis=hypothesis
+        )
+    )
+  peak_memory_mib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+  return (
+      loading_time,
+      total_time / total_duration,
+      peak_memory_mib,
+      sum(word_error_rates) / len(word_error_rates),
+  )
+
+
+def main(argv: Sequence[str]) -> None:
+  """Runs the transcription benchmark for every requested model."""
+  if len(argv) > 1:
+    raise app.UsageError("Too many command-line arguments.")
+  clips = _find_clips(_CLIPS_DIRECTORY.value)
+  if not clips:
+    raise app.UsageError(
+        f"No clips with reference transcripts in {_CLIPS_DIRECTORY.value}."
+    )
+  compute_type = _COMPUTE_TYPE.value or (
+      "float16" if _DEVICE.value == "cuda" else "int8"
+  )
+  context = multiprocessing.get_context("spawn")
+  results = []
+  for model_name in _MODELS.value:
+    logging.info(f"Benchmarking the {model_name} model.")
+    with context.Pool(processes=1) as pool:
+      results.append((
+          model_name,
+          *pool.apply(
+              _benchmark_model,
+              kwds=dict(
+                  model_name=model_name,
+                  clips=clips,
+                  original_language=_ORIGINAL_LANGUAGE.value,
+                  device=_DEVICE.value,
+                  compute_type=compute_type,
+                  beam_size=_BEAM_SIZE.value,
+              ),
+          ),
+      ))
+  logging.info(f"Benchmarked {len(clips)} clips with {compute_type} models.")
+  print(
+      f"{'model':<20}{'load [s]':>10}{'RTF':>8}{'peak memory [MiB]':>19}"
+      f"{'WER':>8}"
+  )
+  for model_name, loading_time, rtf, peak_memory_mib, wer in results:
+    print(
+        f"{model_name:<20}{loading_time:>10.2f}{rtf:>8.3f}"
+        f"{peak_memory_mib:>19.0f}{wer:>8.3f}"
+    )
+
+
+if __name__ == "__main__":
+  flags.mark_flags_as_required(["clips_directory", "original_language"])
+  app.run(main)
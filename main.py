@@ -18,6 +18,8 @@ import ast
 from typing import Sequence
 from absl import app
 from absl import flags
+from ariel import audio_processing
+from ariel import speech_to_text
 from ariel.dubbing import Dubber
 from ariel.dubbing import get_safety_settings
 
@@ -95,6 +97,13 @@ _DIARIZATION_INSTRUCTIONS = flags.DEFINE_string(
     None,
     "Specific instructions for speaker diarization.",
 )
+_DIARIZATION_MODE = flags.DEFINE_enum(
+    "diarization_mode",
+    "gemini",
+    ["gemini", "local"],
+    "Diarize the speakers with Gemini, or keep the PyAnnote speakers and infer"
+    " their genders from the pitch, using Gemini only on low confidence.",
+)
 _TRANSLATION_INSTRUCTIONS = flags.DEFINE_string(
     "translation_instructions",
     None,
@@ -110,6 +119,22 @@ _MINIMUM_MERGE_THRESHOLD = flags.DEFINE_float(
     0.001,
     "Threshold for merging utterances in seconds.",
 )
+_CONSOLIDATE_UTTERANCES = flags.DEFINE_bool(
+    "consolidate_utterances",
+    False,
+    "Merge the adjacent utterances of the same speaker up to the maximum gap"
+    " and duration instead of using the minimum merge threshold.",
+)
+_MAXIMUM_MERGE_GAP = flags.DEFINE_float(
+    "maximum_merge_gap",
+    0.3,
+    "The maximum pause in seconds bridged when consolidating utterances.",
+)
+_MAXIMUM_UTTERANCE_DURATION = flags.DEFINE_float(
+    "maximum_utterance_duration",
+    10.0,
+    "The maximum duration in seconds of a consolidated utterance.",
+)
 _PREFERRED_VOICES = flags.DEFINE_list(
     "preferred_voices",
     [],
@@ -146,13 +171,108 @@ _BACKGROUND_VOLUME_ADJUSTMENT = flags.DEFINE_float(
     0.0,
     "By how much the background audio volume should be adjusted.",
 )
-_VOICE_SEPARATION_ROUNDS = flags.DEFINE_float(
+_CACHE_VOCALS_MIX = flags.DEFINE_bool(
+    "cache_vocals_mix",
+    False,
+    "Keep the dubbed vocals timeline in the output directory, so that a"
+    " re-dub only re-mixes the changed utterances.",
+)
+_VOICE_SEPARATION_ROUNDS = flags.DEFINE_integer(
     "voice_separation_rounds",
     2,
-    "The number of times the background audio file"
+    "The maximum number of times the background audio file"
     " should be processed for voice detection and removal. It helps with"
     " the old voice artifacts being present in the dubbed ad.",
 )
+_SEPARATION_PRESET = flags.DEFINE_enum(
+    "separation_preset",
+    "max",
+    list(audio_processing.SEPARATION_PRESETS),
+    "The Demucs quality/speed preset used to separate the vocals from the"
+    " background.",
+)
+_RESIDUAL_VOCALS_THRESHOLD_DB = flags.DEFINE_float(
+    "residual_vocals_threshold_db",
+    audio_processing.DEFAULT_RESIDUAL_VOCALS_THRESHOLD_DB,
+    "The level of the vocals a voice separation round removes from the"
+    " background, in dB relative to the background, below which no more"
+    " rounds are run. Use -inf to always run all the rounds.",
+)
+_SEPARATION_CACHE_DIRECTORY = flags.DEFINE_string(
+    "separation_cache_directory",
+    None,
+    "An optional directory of the vocals and background separation cache"
+    " shared between the dubbing jobs.",
+)
+_SEPARATION_CACHE_MAX_SIZE_BYTES = flags.DEFINE_integer(
+    "separation_cache_max_size_bytes",
+    audio_processing.DEFAULT_SEPARATION_CACHE_SIZE_BYTES,
+    "The maximum size of the separation cache in bytes.",
+)
+_SPEECH_GATED_SEPARATION = flags.DEFINE_bool(
+    "speech_gated_separation",
+    False,
+    "Run the voice separation only on the speech regions and use the original"
+    " audio as the background elsewhere.",
+)
+_VIRTUAL_UTTERANCE_CHUNKS = flags.DEFINE_bool(
+    "virtual_utterance_chunks",
+    False,
+    "Reference the utterance chunks as sample ranges of the decoded input"
+    " audio instead of saving one MP3 file per utterance.",
+)
+_TRANSCRIPTION_BATCH_SIZE = flags.DEFINE_integer(
+    "transcription_batch_size",
+    1,
+    "The number of utterances decoded at once by Whisper. With 1 each"
+    " utterance is transcribed separately.",
+)
+_TRANSCRIPTION_MODE = flags.DEFINE_enum(
+    "transcription_mode",
+    "chunks",
+    ["chunks", "full_track"],
+    "Transcribe each utterance separately, or the whole audio once with word"
+    " timestamps assigned to the utterances.",
+)
+_TRANSCRIPTION_CPU_THREADS = flags.DEFINE_integer(
+    "transcription_cpu_threads",
+    0,
+    "The number of CPU threads used by each Whisper worker. With 0 the"
+    " CTranslate2 default is used.",
+)
+_TRANSCRIPTION_NUM_WORKERS = flags.DEFINE_integer(
+    "transcription_num_workers",
+    1,
+    "The number of Whisper workers transcribing utterances concurrently.",
+)
+_TRANSCRIPTION_MODEL = flags.DEFINE_string(
+    "transcription_model",
+    "large-v3",
+    "The Whisper model size, e.g. 'large-v3', 'medium' or 'distil-large-v3',"
+    " or a path to a converted model.",
+)
+_TRANSCRIPTION_COMPUTE_TYPE = flags.DEFINE_string(
+    "transcription_compute_type",
+    None,
+    "The compute type of the Whisper model, e.g. 'int8' or 'float16'. By"
+    " default 'float16' is used on CUDA and 'int8' on CPU.",
+)
+_TRANSCRIPTION_BEAM_SIZE = flags.DEFINE_integer(
+    "transcription_beam_size",
+    5,
+    "The beam size used for Whisper decoding.",
+)
+_TRANSCRIPT_CACHE_FILE = flags.DEFINE_string(
+    "transcript_cache_file",
+    None,
+    "An optional path to a local SQLite database of the transcripts shared"
+    " between the dubbing jobs.",
+)
+_TRANSCRIPT_CACHE_MAX_ENTRIES = flags.DEFINE_integer(
+    "transcript_cache_max_entries",
+    speech_to_text.DEFAULT_TRANSCRIPT_CACHE_MAX_ENTRIES,
+    "The maximum number of the transcripts in the transcript cache.",
+)
 _CLEAN_UP = flags.DEFINE_bool(
     "clean_up",
     False,
@@ -237,16 +357,36 @@ def main(argv: Sequence[str]) -> None:
       hugging_face_token=_HUGGING_FACE_TOKEN.value,
       no_dubbing_phrases=_NO_DUBBING_PHRASES.value,
       diarization_instructions=_DIARIZATION_INSTRUCTIONS.value,
+      diarization_mode=_DIARIZATION_MODE.value,
       translation_instructions=_TRANSLATION_INSTRUCTIONS.value,
       merge_utterances=_MERGE_UTTERANCES.value,
       minimum_merge_threshold=_MINIMUM_MERGE_THRESHOLD.value,
+      consolidate_utterances=_CONSOLIDATE_UTTERANCES.value,
+      maximum_merge_gap=_MAXIMUM_MERGE_GAP.value,
+      maximum_utterance_duration=_MAXIMUM_UTTERANCE_DURATION.value,
       preferred_voices=_PREFERRED_VOICES.value,
       assigned_voices_override=ast.literal_eval(_ASSIGNED_VOICES_OVERRIDE),
       keep_voice_assignments=_KEEP_VOICE_ASSIGNMENTS.value,
       adjust_speed=_ADJUST_SPEED.value,
       vocals_volume_adjustment=_VOCALS_VOLUME_ADJUSTMENT.value,
       background_volume_adjustment=_BACKGROUND_VOLUME_ADJUSTMENT.value,
+      cache_vocals_mix=_CACHE_VOCALS_MIX.value,
       voice_separation_rounds=_VOICE_SEPARATION_ROUNDS.value,
+      separation_preset=_SEPARATION_PRESET.value,
+      residual_vocals_threshold_db=_RESIDUAL_VOCALS_THRESHOLD_DB.value,
+      separation_cache_directory=_SEPARATION_CACHE_DIRECTORY.value,
+      separation_cache_max_size_bytes=_SEPARATION_CACHE_MAX_SIZE_BYTES.value,
+      speech_gated_separation=_SPEECH_GATED_SEPARATION.value,
+      virtual_utterance_chunks=_VIRTUAL_UTTERANCE_CHUNKS.value,
+      transcription_batch_size=_TRANSCRIPTION_BATCH_SIZE.value,
+      transcription_mode=_TRANSCRIPTION_MODE.value,
+      transcription_cpu_threads=_TRANSCRIPTION_CPU_THREADS.value,
+      transcription_num_workers=_TRANSCRIPTION_NUM_WORKERS.value,
+      transcription_model=_TRANSCRIPTION_MODEL.value,
+      transcription_compute_type=_TRANSCRIPTION_COMPUTE_TYPE.value,
+      transcription_beam_size=_TRANSCRIPTION_BEAM_SIZE.value,
+      transcript_cache_file=_TRANSCRIPT_CACHE_FILE.value,
+      transcript_cache_max_entries=_TRANSCRIPT_CACHE_MAX_ENTRIES.value,
       clean_up=_CLEAN_UP.value,
       gemini_model_name=_GEMINI_MODEL_NAME.value,
       temperature=_TEMPERATURE.value,
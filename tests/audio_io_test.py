@@ -0,0 +1,149 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for utility functions in audio_io.py."""
+
+import io
+import os
+import tempfile
+from unittest.mock import patch
+from absl.testing import absltest
+from absl.testing import parameterized
+from ariel import audio_io
+import av
+import numpy as np
+from pydub import AudioSegment
+
+
+def _make_tone(seconds: float, frame_rate: int = 44100) -> np.ndarray:
+  time = np.arange(int(seconds * frame_rate)) / frame_rate
+  tone = 0.5 * np.sin(2 * np.pi * 440 * time)
+  return np.stack([tone, 0.5 * tone], axis=1).astype(np.float32)
+
+
+class AudioIoTest(parameterized.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    temporary_directory = tempfile.TemporaryDirectory()
+    self.addCleanup(temporary_directory.cleanup)
+    self.temp_dir = temporary_directory.name
+
+  @parameterized.named_parameters(("mp3", "mp3", 0.01), ("wav", "wav", 1e-4))
+  def test_write_and_read_audio(self, format, tolerance):
+    audio_file = os.path.join(self.temp_dir, f"tone.{format}")
+    tone = _make_tone(1.0)
+    audio_io.write_audio(
+        audio_file, tone, frame_rate=44100, format=format, bitrate="320k"
+    )
+    samples, frame_rate = audio_io.read_audio(audio_file)
+    self.assertEqual(frame_rate, 44100)
+    self.assertEqual(samples.shape, tone.shape)
+    np.testing.assert_allclose(samples, tone, atol=tolerance)
+
+  def test_read_audio_converts_format(self):
+    audio_file = os.path.join(self.temp_dir, "tone.wav")
+    audio_io.write_audio(
+        audio_file, _make_tone(1.0), frame_rate=44100, format="wav"
+    )
+    samples, frame_rate = audio_io.read_audio(
+        audio_file, frame_rate=16000, channels=1
+    )
+    self.assertEqual(frame_rate, 16000)
+    self.assertEqual(samples.shape, (16000, 1))
+
+  def test_read_audio_segment_matches_pydub(self):
+    audio_file = os.path.join(self.temp_dir, "tone.wav")
+    audio_io.write_audio(
+        audio_file, _make_tone(1.0), frame_rate=44100, format="wav"
+    )
+    self.assertEqual(
+        audio_io.read_audio_segment(audio_file),
+        AudioSegment.from_wav(audio_file),
+    )
+
+  def test_write_audio_segment_to_file_object(self):
+    buffer = io.BytesIO()
+    audio_io.write_audio_segment(
+        AudioSegment.silent(duration=1500, frame_rate=24000), buffer
+    )
+    buffer.seek(0)
+    self.assertAlmostEqual(audio_io.get_duration(buffer), 1.5, delta=0.01)
+
+  def test_get_duration(self):
+    audio_file = os.path.join(self.temp_dir, "tone.mp3")
+    audio_io.write_audio(audio_file, _make_tone(2.0), frame_rate=44100)
+    self.assertAlmostEqual(audio_io.get_duration(audio_file), 2.0, delta=0.01)
+
+  @patch.object(audio_io, "av", None)
+  def test_pydub_fallback(self):
+    audio_file = os.path.join(self.temp_dir, "tone.wav")
+    audio_io.write_audio(
+        audio_file, _make_tone(1.0), frame_rate=44100, format="wav"
+    )
+    samples, frame_rate = audio_io.read_audio(audio_file, channels=1)
+    self.assertEqual(samples.shape, (44100, 1))
+    self.assertEqual(frame_rate, 44100)
+    self.assertAlmostEqual(audio_io.get_duration(audio_file), 1.0)
+
+  def test_pydub_fallback_on_decoding_error(self):
+    audio = AudioSegment.silent(duration=1000, frame_rate=44100)
+    with patch.object(
+        audio_io,
+        "_decode",
+        side_effect=av.error.InvalidDataError(1, "Invalid data"),
+    ), patch.object(
+        AudioSegment, "from_file", return_value=audio
+    ) as mock_from_file:
+      self.assertEqual(audio_io.read_audio_segment("audio.mp3"), audio)
+    mock_from_file.assert_called_once_with("audio.mp3")
+
+
+  def test_no_audio_stream(self):
+    video_file = os.path.join(self.temp_dir, "video.mp4")
+    with av.open(video_file, "w") as container:
+      stream = container.add_stream("mpeg4", rate=25)
+      stream.width = stream.height = 16
+      frame = av.VideoFrame.from_ndarray(
+          np.zeros((16, 16, 3), dtype=np.uint8), format="rgb24"
+      )
+      for packet in stream.encode(frame):
+        container.mux(packet)
+      for packet in stream.encode(None):
+        container.mux(packet)
+    for read in (
+        audio_io.read_audio,
+        audio_io.read_audio_segment,
+        audio_io.get_duration,
+    ):
+      with self.assertRaisesRegex(
+          audio_io.NoAudioStreamError, "no audio stream"
+      ):
+        read(video_file)
+
+  def test_pydub_fallback_on_encoding_error_truncates(self):
+    buffer = io.BytesIO()
+
+    def _failing_encode(file, *args, **kwargs):
+      file.write(b"stale" * 1000)
+      raise av.error.InvalidDataError(1, "Invalid data")
+
+    audio = AudioSegment.silent(duration=100, frame_rate=8000)
+    with patch.object(audio_io, "_encode", side_effect=_failing_encode):
+      audio_io.write_audio_segment(audio, buffer, format="wav")
+    self.assertEqual(buffer.getvalue(), audio.export(format="wav").read())
+
+
+if __name__ == "__main__":
+  absltest.main()
@@ -22,11 +22,14 @@ from unittest.mock import MagicMock
 from unittest.mock import patch
 from absl.testing import absltest
 from absl.testing import parameterized
+from ariel import audio_io
 from ariel import audio_processing
 from moviepy.audio.AudioClip import AudioArrayClip
 import numpy as np
 from pyannote.audio import Pipeline
 from pydub import AudioSegment
+from scipy import signal
+import torch
 
 
 class BuildDemucsCommandTest(parameterized.TestCase):
@@ -305,58 +308,619 @@ class TestExecuteVocalNonVocalsSplit(absltest.TestCase):
     )
 
 
-class TestSplitAudioTrack(absltest.TestCase):
+class PadSpeechRegionsTest(absltest.TestCase):
 
-  @patch("tensorflow.io.gfile.exists")
-  @patch("tensorflow.io.gfile.copy")
-  @patch("tensorflow.io.gfile.rmtree")
-  @patch("ariel.audio_processing.execute_vocals_non_vocals_split")
-  @patch("ariel.audio_processing.build_demucs_command")
-  @patch("ariel.audio_processing.assemble_split_audio_file_paths")
-  def test_split_audio_track(
-      self,
-      mock_assemble_split_paths,
-      mock_build_command,
-      mock_execute_split,
-      mock_rmtree,
-      mock_copy,
-      mock_exists,
+  def test_pad_speech_regions(self):
+    self.assertEqual(
+        audio_processing.pad_speech_regions(
+            [(5.0, 6.0), (0.5, 1.0), (6.5, 8.0)], padding_seconds=1.0
+        ),
+        [(0.0, 2.0), (4.0, 9.0)],
+    )
+
+
+class MeasureVocalsDbTest(parameterized.TestCase):
+
+  @parameterized.named_parameters(
+      ("quieter_vocals", 0.1, -20.0),
+      ("equal_vocals", 1.0, 0.0),
+      ("silent_vocals", 0.0, float("-inf")),
+  )
+  def test_measure_vocals_db(self, amplitude, expected_db):
+    background = torch.ones(2, 44100)
+    self.assertAlmostEqual(
+        audio_processing.measure_vocals_db(
+            vocals=amplitude * background, background=background
+        ),
+        expected_db,
+        places=4,
+    )
+
+  def test_silent_background(self):
+    self.assertEqual(
+        audio_processing.measure_vocals_db(
+            vocals=torch.ones(2, 10), background=torch.zeros(2, 10)
+        ),
+        float("inf"),
+    )
+
+
+class SignalToDistortionRatioTest(parameterized.TestCase):
+
+  @parameterized.named_parameters(
+      ("half_error", 0.5, 6.0206),
+      ("tenth_error", 0.9, 20.0),
+      ("perfect", 1.0, float("inf")),
+  )
+  def test_signal_to_distortion_ratio(self, scale, expected_sdr):
+    reference = torch.ones(2, 100)
+    self.assertAlmostEqual(
+        audio_processing.signal_to_distortion_ratio(
+            reference=reference, estimate=reference * scale
+        ),
+        expected_sdr,
+        places=3,
+    )
+
+
+class DecodedAudioStoreTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    temporary_directory = tempfile.TemporaryDirectory()
+    self.addCleanup(temporary_directory.cleanup)
+    self.temp_dir = temporary_directory.name
+    self.audio_file = os.path.join(self.temp_dir, "input.wav")
+    time = np.arange(44100 * 3) / 44100
+    self.tone = np.stack(
+        [0.5 * np.sin(2 * np.pi * 440 * time), 0.25 * np.sin(2 * np.pi * time)],
+        axis=1,
+    )
+    AudioSegment(
+        np.round(self.tone * 32767).astype(np.int16).tobytes(),
+        frame_rate=44100,
+        sample_width=2,
+        channels=2,
+    ).export(self.audio_file, format="wav")
+    self.store = audio_processing.DecodedAudioStore(
+        audio_file=self.audio_file,
+        cache_directory=os.path.join(self.temp_dir, "cache"),
+    )
+
+  def test_samples(self):
+    self.assertEqual(self.store.samples.shape, (44100 * 3, 2))
+    self.assertAlmostEqual(self.store.duration, 3.0)
+    np.testing.assert_allclose(self.store.samples, self.tone, atol=1e-4)
+
+  def test_speech_samples_match_whole_track_resampling(self):
+    with patch.object(audio_processing, "_RESAMPLING_BLOCK_SECONDS", 0.5):
+      speech_samples = self.store.get_speech_samples()
+    expected = signal.resample_poly(
+        np.asarray(self.store.samples).mean(axis=1), 160, 441
+    )
+    self.assertEqual(speech_samples.shape, (16000 * 3, 1))
+    np.testing.assert_allclose(speech_samples[:, 0], expected, atol=1e-5)
+
+  def test_views_are_decoded_once(self):
+    with patch(
+        "ariel.audio_processing.subprocess.run", wraps=subprocess.run
+    ) as mock_run:
+      self.store.get_speech_samples()
+      self.store.get_samples(sample_rate=22050)
+      self.store.get_segment(start=0.5, end=1.0, sample_rate=16000, channels=1)
+      audio_processing.DecodedAudioStore(
+          audio_file=self.audio_file, cache_directory=self.store.cache_directory
+      ).get_speech_samples()
+    mock_run.assert_called_once()
+
+  def test_views_of_files_with_same_name_are_separate(self):
+    other_directory = os.path.join(self.temp_dir, "other")
+    os.makedirs(other_directory)
+    other_file = os.path.join(other_directory, "input.wav")
+    AudioSegment.silent(duration=1000, frame_rate=44100).set_channels(
+        2
+    ).export(other_file, format="wav")
+    other_store = audio_processing.DecodedAudioStore(
+        audio_file=other_file, cache_directory=self.store.cache_directory
+    )
+    self.assertEqual(self.store.get_speech_samples().shape, (16000 * 3, 1))
+    self.assertEqual(other_store.get_speech_samples().shape, (16000, 1))
+
+  def test_replaced_file_is_decoded_again(self):
+    self.store.get_speech_samples()
+    AudioSegment.silent(duration=1000, frame_rate=44100).set_channels(
+        2
+    ).export(self.audio_file, format="wav")
+    os.utime(self.audio_file, ns=(10**9, 10**9))
+    store = audio_processing.DecodedAudioStore(
+        audio_file=self.audio_file, cache_directory=self.store.cache_directory
+    )
+    self.assertEqual(store.samples.shape, (44100, 2))
+
+  def test_get_segment(self):
+    segment = self.store.get_segment(start=1.0, end=1.5)
+    np.testing.assert_allclose(
+        segment, self.tone[44100 : 44100 + 22050], atol=1e-4
+    )
+
+  def test_get_audio_segment(self):
+    audio = self.store.get_audio_segment(start=0.5, end=2.0)
+    self.assertEqual(len(audio), 1500)
+    self.assertEqual(audio.channels, 2)
+
+  def test_get_speech_segment(self):
+    segment = self.store.get_speech_segment(start=1.0, end=2.0)
+    self.assertEqual(segment.shape, (16000,))
+
+  def test_get_pyannote_input(self):
+    pyannote_input = self.store.get_pyannote_input()
+    self.assertEqual(pyannote_input["sample_rate"], 16000)
+    self.assertEqual(pyannote_input["waveform"].shape, (1, 16000 * 3))
+
+  def test_invalid_channels(self):
+    with self.assertRaisesRegex(ValueError, "number of channels"):
+      self.store.get_samples(channels=3)
+
+  def test_get_range(self):
+    sample_range = self.store.get_sample_range(start=0.5, end=1.0)
+    self.assertEqual(sample_range, [22050, 44100])
+    np.testing.assert_array_equal(
+        self.store.get_range(sample_range), self.store.samples[22050:44100]
+    )
+    self.assertEqual(
+        self.store.get_range(sample_range, sample_rate=16000, channels=1).shape,
+        (8000, 1),
+    )
+
+  def test_materialize_utterance_chunk(self):
+    chunk_path = os.path.join(self.temp_dir, "chunk_0.5_1.5.mp3")
+    utterance = {
+        "path": chunk_path,
+        "sample_range": self.store.get_sample_range(start=0.5, end=1.5),
+    }
+    self.assertEqual(
+        audio_processing.materialize_utterance_chunk(
+            utterance=utterance, audio_store=self.store
+        ),
+        chunk_path,
+    )
+    self.assertAlmostEqual(
+        AudioSegment.from_mp3(chunk_path).duration_seconds, 1.0, delta=0.05
+    )
+
+
+class DemucsSeparatorTest(parameterized.TestCase):
+
+  def _make_model(self):
+    model = MagicMock()
+    model.sources = ["drums", "bass", "other", "vocals"]
+    model.samplerate = 44100
+    model.audio_channels = 2
+    return model
+
+  @patch("ariel.audio_processing.apply_model")
+  @patch("ariel.audio_processing.load_demucs_model")
+  def test_separate(self, mock_load_model, mock_apply_model):
+    mock_load_model.return_value = self._make_model()
+    waveform = torch.ones(2, 10)
+    sources = torch.stack([torch.full((2, 10), float(i)) for i in range(4)])
+    mock_apply_model.return_value = sources[None]
+    separator = audio_processing.DemucsSeparator(shifts=1)
+    vocals, background = separator.separate(waveform)
+    torch.testing.assert_close(vocals, torch.full((2, 10), 4.0))
+    torch.testing.assert_close(background, torch.full((2, 10), 6.0))
+    mock_load_model.assert_called_with("htdemucs", "cpu")
+    self.assertEqual(mock_apply_model.call_args.kwargs["shifts"], 1)
+
+  @patch("ariel.audio_processing.load_demucs_model")
+  def test_read_audio_from_store(self, mock_load_model):
+    mock_load_model.return_value = self._make_model()
+    audio_store = MagicMock(spec=audio_processing.DecodedAudioStore)
+    audio_store.get_samples.return_value = np.ones((44100 * 3, 2), np.float32)
+    audio_store.duration = 3.0
+    separator = audio_processing.DemucsSeparator()
+    waveform = separator.read_audio(audio_store)
+    windows = list(
+        separator.read_audio_windows(
+            audio_store, window_seconds=2.0, overlap_seconds=1.0
+        )
+    )
+    self.assertEqual(waveform.shape, (2, 44100 * 3))
+    self.assertEqual(separator.get_duration(audio_store), 3.0)
+    self.assertEqual(
+        [window.shape[-1] for window in windows], [88200, 88200]
+    )
+    audio_store.get_samples.assert_called_with(sample_rate=44100, channels=2)
+
+  @parameterized.named_parameters(
+      ("zero_step", 1.0, 1.0),
+      ("negative_step", 1.0, 2.0),
+  )
+  @patch("ariel.audio_processing.load_demucs_model")
+  def test_read_audio_windows_with_invalid_overlap(
+      self, window_seconds, overlap_seconds, mock_load_model
   ):
-    mock_execute_split.return_value = ("vocals_file.wav", "background_file.wav")
-    mock_build_command.return_value = "demucs_command"
-    mock_assemble_split_paths.return_value = (
-        "vocals_file.wav",
-        "background_file.wav",
+    mock_load_model.return_value = self._make_model()
+    separator = audio_processing.DemucsSeparator()
+    with self.assertRaisesRegex(ValueError, "longer than the overlap"):
+      next(
+          separator.read_audio_windows(
+              MagicMock(spec=audio_processing.DecodedAudioStore),
+              window_seconds=window_seconds,
+              overlap_seconds=overlap_seconds,
+          )
+      )
+
+  @patch("ariel.audio_processing.load_demucs_model")
+  def test_separate_file_in_windows(self, mock_load_model):
+    mock_load_model.return_value = self._make_model()
+    separator = audio_processing.DemucsSeparator()
+    separator.separate = lambda waveform: (waveform, waveform * 0.5)
+    with tempfile.TemporaryDirectory() as temp_dir:
+      audio_file = os.path.join(temp_dir, "input.wav")
+      time = np.arange(44100 * 5) / 44100
+      tone = 0.5 * np.sin(2 * np.pi * 440 * time)
+      AudioSegment(
+          (tone * 32767).astype(np.int16).tobytes(),
+          frame_rate=44100,
+          sample_width=2,
+          channels=1,
+      ).set_channels(2).export(audio_file, format="wav")
+      vocals_file, background_file = separator.separate_file_in_windows(
+          audio_file=audio_file,
+          vocals_file=os.path.join(temp_dir, "vocals.mp3"),
+          background_file=os.path.join(temp_dir, "no_vocals.mp3"),
+          window_seconds=2.0,
+          overlap_seconds=0.5,
+      )
+      vocals = AudioSegment.from_file(vocals_file)
+      background = AudioSegment.from_file(background_file)
+      self.assertAlmostEqual(vocals.duration_seconds, 5.0, delta=0.1)
+      self.assertAlmostEqual(vocals.dBFS - background.dBFS, 6.0, delta=0.5)
+      self.assertAlmostEqual(
+          vocals.dBFS, 20 * np.log10(0.5 / np.sqrt(2)), delta=0.5
+      )
+      self.assertCountEqual(
+          os.listdir(temp_dir), ["input.wav", "vocals.mp3", "no_vocals.mp3"]
+      )
+
+  @patch("ariel.audio_processing.load_demucs_model")
+  def test_separate_regions(self, mock_load_model):
+    model = self._make_model()
+    model.samplerate = 10
+    mock_load_model.return_value = model
+    separator = audio_processing.DemucsSeparator()
+    separator.separate = MagicMock(
+        side_effect=lambda waveform: (waveform, torch.zeros_like(waveform))
+    )
+    waveform = torch.ones(2, 100)
+    vocals, background = separator.separate_regions(
+        waveform, regions=[(2.0, 5.0)], crossfade_seconds=0.5
+    )
+    separator.separate.assert_called_once()
+    self.assertEqual(separator.separate.call_args.args[0].shape, (2, 30))
+    torch.testing.assert_close(vocals[:, :20], torch.zeros(2, 20))
+    torch.testing.assert_close(vocals[:, 25:45], torch.ones(2, 20))
+    torch.testing.assert_close(background[:, 50:], torch.ones(2, 50))
+    torch.testing.assert_close(vocals + background, waveform)
+
+  @patch("ariel.audio_processing.load_demucs_model")
+  def test_separate_in_rounds_stops_without_vocals(self, mock_load_model):
+    mock_load_model.return_value = self._make_model()
+    separator = audio_processing.DemucsSeparator()
+    background = torch.randn(2, 44100)
+    separator.separate = MagicMock(return_value=(background * 0.01, background))
+    separator.separate_in_rounds(
+        torch.zeros(2, 44100),
+        voice_separation_rounds=3,
+        residual_vocals_threshold_db=-30.0,
+    )
+    self.assertEqual(separator.separate.call_count, 1)
+
+  @patch("ariel.audio_processing.load_demucs_model")
+  def test_separate_in_rounds_stops_after_clean_round(self, mock_load_model):
+    mock_load_model.return_value = self._make_model()
+    separator = audio_processing.DemucsSeparator()
+    vocals = torch.randn(2, 44100)
+    background = torch.randn(2, 44100)
+    separator.separate = MagicMock(
+        side_effect=[(vocals, background), (background * 0.01, background)]
+    )
+    returned_vocals, _ = separator.separate_in_rounds(
+        torch.zeros(2, 44100),
+        voice_separation_rounds=4,
+        residual_vocals_threshold_db=-30.0,
     )
+    self.assertEqual(separator.separate.call_count, 2)
+    torch.testing.assert_close(returned_vocals, vocals)
+
+  @patch("ariel.audio_processing.load_demucs_model")
+  def test_separate_in_rounds_runs_all_rounds(self, mock_load_model):
+    mock_load_model.return_value = self._make_model()
+    separator = audio_processing.DemucsSeparator()
+    vocals = torch.randn(2, 44100)
+    separator.separate = MagicMock(return_value=(vocals, vocals * 0.5))
+    separator.separate_in_rounds(
+        torch.zeros(2, 44100),
+        voice_separation_rounds=3,
+        residual_vocals_threshold_db=-30.0,
+    )
+    self.assertEqual(separator.separate.call_count, 3)
+
+  @parameterized.named_parameters(
+      ("draft", "draft", 1, 0.1),
+      ("standard", "standard", 3, 0.25),
+      ("max", "max", 10, 0.25),
+  )
+  def test_from_preset(self, preset, expected_shifts, expected_overlap):
+    separator = audio_processing.DemucsSeparator.from_preset(preset)
+    self.assertEqual(separator.shifts, expected_shifts)
+    self.assertEqual(separator.overlap, expected_overlap)
+
+  def test_from_preset_invalid(self):
+    with self.assertRaisesRegex(ValueError, "Unsupported separation preset"):
+      audio_processing.DemucsSeparator.from_preset("ultra")
+
+  def test_invalid_device(self):
+    with self.assertRaisesRegex(ValueError, "Unsupported device"):
+      audio_processing.DemucsSeparator(device="tpu")
+
+  @patch("ariel.audio_processing.get_model")
+  def test_load_demucs_model_is_cached(self, mock_get_model):
+    audio_processing.load_demucs_model.cache_clear()
+    first_model = audio_processing.load_demucs_model("htdemucs", "cpu")
+    second_model = audio_processing.load_demucs_model("htdemucs", "cpu")
+    audio_processing.load_demucs_model.cache_clear()
+    self.assertIs(first_model, second_model)
+    mock_get_model.assert_called_once_with("htdemucs")
+
+
+class SeparationCacheTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    temporary_directory = tempfile.TemporaryDirectory()
+    self.addCleanup(temporary_directory.cleanup)
+    self.temp_dir = temporary_directory.name
+    self.cache = audio_processing.SeparationCache(
+        cache_directory=os.path.join(self.temp_dir, "cache"),
+        max_size_bytes=20,
+    )
+    self.vocals_file = os.path.join(self.temp_dir, "vocals.mp3")
+    self.background_file = os.path.join(self.temp_dir, "no_vocals.mp3")
+
+  def _write_files(self, content):
+    for path in (self.vocals_file, self.background_file):
+      with open(path, "w") as f:
+        f.write(content)
+
+  def test_make_key(self):
+    separator = MagicMock(
+        model_name="htdemucs",
+        sample_rate=44100,
+        shifts=10,
+        overlap=0.25,
+        split=True,
+        segment=None,
+        mp3_bitrate=320,
+        mp3_preset=2,
+    )
+    waveform = torch.zeros(2, 100)
+    key = self.cache.make_key(
+        waveform=waveform, separator=separator, voice_separation_rounds=2
+    )
+    self.assertEqual(
+        key,
+        self.cache.make_key(
+            waveform=waveform.clone(),
+            separator=separator,
+            voice_separation_rounds=2,
+        ),
+    )
+    self.assertNotEqual(
+        key,
+        self.cache.make_key(
+            waveform=waveform, separator=separator, voice_separation_rounds=3
+        ),
+    )
+    self.assertNotEqual(
+        key,
+        self.cache.make_key(
+            waveform=torch.ones(2, 100),
+            separator=separator,
+            voice_separation_rounds=2,
+        ),
+    )
+    self.assertNotEqual(
+        key,
+        self.cache.make_key(
+            waveform=waveform,
+            separator=separator,
+            voice_separation_rounds=2,
+            windows=(60.0, 5.0),
+        ),
+    )
+    separator.mp3_preset = 7
+    self.assertNotEqual(
+        key,
+        self.cache.make_key(
+            waveform=waveform, separator=separator, voice_separation_rounds=2
+        ),
+    )
+
+  def test_get_and_put(self):
+    self.assertFalse(
+        self.cache.get(
+            key="key",
+            vocals_file=self.vocals_file,
+            background_file=self.background_file,
+        )
+    )
+    self._write_files("12345")
+    self.cache.put(
+        key="key",
+        vocals_file=self.vocals_file,
+        background_file=self.background_file,
+    )
+    os.remove(self.vocals_file)
+    self.assertTrue(
+        self.cache.get(
+            key="key",
+            vocals_file=self.vocals_file,
+            background_file=self.background_file,
+        )
+    )
+    with open(self.vocals_file) as f:
+      self.assertEqual(f.read(), "12345")
+
+  def test_evicts_least_recently_used(self):
+    for key in ("first", "second"):
+      self._write_files("12345")
+      self.cache.put(
+          key=key,
+          vocals_file=self.vocals_file,
+          background_file=self.background_file,
+      )
+    self.cache.get(
+        key="first",
+        vocals_file=self.vocals_file,
+        background_file=self.background_file,
+    )
+    self._write_files("12345")
+    self.cache.put(
+        key="third",
+        vocals_file=self.vocals_file,
+        background_file=self.background_file,
+    )
+    self.assertCountEqual(
+        os.listdir(self.cache.cache_directory), ["first", "third"]
+    )
+
+
+class TestSplitAudioTrack(absltest.TestCase):
+
+  @patch("tensorflow.io.gfile.exists")
+  def test_split_audio_track(self, mock_exists):
     mock_exists.side_effect = [False, False]
+    separator = MagicMock()
+    separator.get_duration.return_value = 30.0
+    separator.separate_in_rounds.return_value = ("vocals", "background")
     vocals_path, background_path = audio_processing.split_audio_track(
         audio_file="input.wav",
         output_directory="output_dir",
         device="cpu",
-        voice_separation_rounds=2,
+        voice_separation_rounds=3,
+        separator=separator,
+        residual_vocals_threshold_db=None,
     )
     self.assertEqual(
         vocals_path,
         os.path.join(
-            "output_dir", audio_processing.AUDIO_PROCESSING, "vocals.wav"
+            "output_dir", audio_processing.AUDIO_PROCESSING, "vocals.mp3"
         ),
     )
     self.assertEqual(
         background_path,
         os.path.join(
-            "output_dir", audio_processing.AUDIO_PROCESSING, "no_vocals.wav"
+            "output_dir", audio_processing.AUDIO_PROCESSING, "no_vocals.mp3"
         ),
     )
+    separator.read_audio.assert_called_once_with("input.wav")
+    separator.separate_in_rounds.assert_called_once_with(
+        separator.read_audio.return_value,
+        voice_separation_rounds=3,
+        residual_vocals_threshold_db=None,
+    )
+    separator.save_audio.assert_has_calls([
+        mock.call("vocals", vocals_path),
+        mock.call("background", background_path),
+    ])
+    self.assertEqual(separator.save_audio.call_count, 2)
 
-    mock_build_command.assert_called_once_with(
-        audio_file="input.wav", output_directory="output_dir", device="cpu"
+  @patch("tensorflow.io.gfile.exists")
+  def test_split_audio_track_long_form(self, mock_exists):
+    mock_exists.side_effect = [False, False]
+    separator = MagicMock()
+    separator.get_duration.return_value = 3600.0
+    vocals_path, background_path = audio_processing.split_audio_track(
+        audio_file="input.wav",
+        output_directory="output_dir",
+        device="cpu",
+        voice_separation_rounds=2,
+        separator=separator,
     )
-    mock_copy.assert_any_call("vocals_file.wav", vocals_path)
-    mock_copy.assert_any_call("background_file.wav", background_path)
-    mock_rmtree.assert_called_once_with(
-        os.path.join(
-            "output_dir", audio_processing.AUDIO_PROCESSING, "htdemucs"
-        )
+    separator.read_audio.assert_not_called()
+    separator.separate_file_in_windows.assert_called_once_with(
+        audio_file="input.wav",
+        vocals_file=vocals_path,
+        background_file=background_path,
+        voice_separation_rounds=2,
+        residual_vocals_threshold_db=(
+            audio_processing.DEFAULT_RESIDUAL_VOCALS_THRESHOLD_DB
+        ),
+    )
+
+  @patch("tensorflow.io.gfile.exists")
+  def test_split_audio_track_speech_regions(self, mock_exists):
+    mock_exists.side_effect = [False, False]
+    separator = MagicMock()
+    separator.get_duration.return_value = 30.0
+    separator.separate_regions.return_value = ("vocals", "background")
+    audio_processing.split_audio_track(
+        audio_file="input.wav",
+        output_directory="output_dir",
+        device="cpu",
+        voice_separation_rounds=2,
+        separator=separator,
+        speech_regions=[(3.0, 4.0)],
+        speech_padding_seconds=0.5,
+    )
+    separator.separate.assert_not_called()
+    separator.separate_regions.assert_called_once_with(
+        separator.read_audio.return_value,
+        regions=[(2.5, 4.5)],
+        voice_separation_rounds=2,
+        residual_vocals_threshold_db=(
+            audio_processing.DEFAULT_RESIDUAL_VOCALS_THRESHOLD_DB
+        ),
+    )
+
+  @patch("tensorflow.io.gfile.exists")
+  def test_split_audio_track_cache_hit(self, mock_exists):
+    mock_exists.side_effect = [False, False]
+    separator = MagicMock()
+    separator.get_duration.return_value = 30.0
+    cache = MagicMock()
+    cache.make_key.return_value = "key"
+    cache.get.return_value = True
+    audio_processing.split_audio_track(
+        audio_file="input.wav",
+        output_directory="output_dir",
+        device="cpu",
+        separator=separator,
+        cache=cache,
+    )
+    separator.separate.assert_not_called()
+    cache.put.assert_not_called()
+
+  @patch("tensorflow.io.gfile.exists")
+  def test_split_audio_track_cache_miss(self, mock_exists):
+    mock_exists.side_effect = [False, False]
+    separator = MagicMock()
+    separator.get_duration.return_value = 30.0
+    separator.separate_in_rounds.return_value = ("vocals", "background")
+    cache = MagicMock()
+    cache.make_key.return_value = "key"
+    cache.get.return_value = False
+    vocals_path, background_path = audio_processing.split_audio_track(
+        audio_file="input.wav",
+        output_directory="output_dir",
+        device="cpu",
+        separator=separator,
+        cache=cache,
+    )
+    cache.put.assert_called_once_with(
+        key="key", vocals_file=vocals_path, background_file=background_path
     )
 
   @patch("tensorflow.io.gfile.exists")
@@ -460,6 +1024,48 @@ class CreatePyannoteTimestampsTest(absltest.TestCase):
       )
       self.assertEqual(timestamps, [{"start": 0.0, "end": 10}])
 
+  def test_create_timestamps_from_store(self):
+    mock_pipeline = MagicMock(spec=Pipeline)
+    mock_pipeline.return_value.itertracks.return_value = [
+        (MagicMock(start=0.0, end=1.0), None, None)
+    ]
+    audio_store = MagicMock(spec=audio_processing.DecodedAudioStore)
+    audio_store.get_pyannote_input.return_value = {
+        "waveform": torch.zeros(1, 16000),
+        "sample_rate": 16000,
+    }
+    timestamps = audio_processing.create_pyannote_timestamps(
+        audio_file="input.mp3",
+        number_of_speakers=1,
+        pipeline=mock_pipeline,
+        audio_store=audio_store,
+    )
+    self.assertEqual(timestamps, [{"start": 0.0, "end": 1.0}])
+    self.assertIs(
+        mock_pipeline.call_args.args[0],
+        audio_store.get_pyannote_input.return_value,
+    )
+
+  def test_create_timestamps_with_speaker_labels(self):
+    mock_pipeline = MagicMock(spec=Pipeline)
+    mock_pipeline.return_value.itertracks.return_value = [
+        (MagicMock(start=0.0, end=1.0), None, "SPEAKER_00"),
+        (MagicMock(start=1.5, end=2.0), None, "SPEAKER_01"),
+    ]
+    timestamps = audio_processing.create_pyannote_timestamps(
+        audio_file="input.mp3",
+        number_of_speakers=2,
+        pipeline=mock_pipeline,
+        keep_speaker_labels=True,
+    )
+    self.assertEqual(
+        timestamps,
+        [
+            {"start": 0.0, "end": 1.0, "speaker_label": "SPEAKER_00"},
+            {"start": 1.5, "end": 2.0, "speaker_label": "SPEAKER_01"},
+        ],
+    )
+
 
 class MergeUtterancesTest(parameterized.TestCase):
 
@@ -538,6 +1144,93 @@ class MergeUtterancesTest(parameterized.TestCase):
     self.assertSequenceEqual(merged, expected_merged_utterances)
 
 
+class ConsolidateUtterancesTest(parameterized.TestCase):
+
+  @parameterized.named_parameters(
+      (
+          "bridges_short_gaps",
+          [
+              {"start": 0.0, "end": 1.0},
+              {"start": 1.2, "end": 2.0},
+              {"start": 3.0, "end": 4.0},
+          ],
+          [{"start": 0.0, "end": 2.0}, {"start": 3.0, "end": 4.0}],
+      ),
+      (
+          "keeps_speakers_apart",
+          [
+              {"start": 0.0, "end": 1.0, "speaker_label": "SPEAKER_00"},
+              {"start": 1.1, "end": 2.0, "speaker_label": "SPEAKER_01"},
+              {"start": 2.1, "end": 3.0, "speaker_label": "SPEAKER_01"},
+          ],
+          [
+              {"start": 0.0, "end": 1.0, "speaker_label": "SPEAKER_00"},
+              {"start": 1.1, "end": 3.0, "speaker_label": "SPEAKER_01"},
+          ],
+      ),
+      (
+          "caps_duration",
+          [
+              {"start": 0.0, "end": 2.0},
+              {"start": 2.1, "end": 4.0},
+              {"start": 4.1, "end": 6.0},
+              {"start": 6.1, "end": 12.0},
+          ],
+          [
+              {"start": 0.0, "end": 4.0},
+              {"start": 4.1, "end": 6.0},
+              {"start": 6.1, "end": 12.0},
+          ],
+      ),
+      (
+          "overlapping_segments",
+          [
+              {"start": 0.0, "end": 3.0},
+              {"start": 1.0, "end": 2.0},
+              {"start": 3.2, "end": 4.0},
+          ],
+          [{"start": 0.0, "end": 4.0}],
+      ),
+      (
+          "absorbs_segments_nested_in_long_segment",
+          [
+              {"start": 0.0, "end": 6.0},
+              {"start": 1.0, "end": 2.0},
+              {"start": 2.5, "end": 3.0},
+              {"start": 6.1, "end": 7.0},
+          ],
+          [{"start": 0.0, "end": 6.0}, {"start": 6.1, "end": 7.0}],
+      ),
+      (
+          "keeps_pause_hidden_by_other_speaker",
+          [
+              {"start": 0.0, "end": 10.0, "speaker_label": "SPEAKER_00"},
+              {"start": 1.0, "end": 2.0, "speaker_label": "SPEAKER_01"},
+              {"start": 5.0, "end": 6.0, "speaker_label": "SPEAKER_01"},
+          ],
+          [
+              {"start": 0.0, "end": 10.0, "speaker_label": "SPEAKER_00"},
+              {"start": 1.0, "end": 2.0, "speaker_label": "SPEAKER_01"},
+              {"start": 5.0, "end": 6.0, "speaker_label": "SPEAKER_01"},
+          ],
+      ),
+  )
+  def test_consolidate_utterances(
+      self, utterance_metadata, expected_utterances
+  ):
+    consolidated = audio_processing.consolidate_utterances(
+        utterance_metadata=utterance_metadata,
+        maximum_gap=0.3,
+        maximum_duration=5.0,
+    )
+    self.assertSequenceEqual(consolidated, expected_utterances)
+
+  def test_empty(self):
+    self.assertEmpty(
+        audio_processing.consolidate_utterances(utterance_metadata=[])
+    )
+
+
 class TestCutAndSaveAudio(absltest.TestCase):
 
   def test_cut_and_save_audio_no_clone(self):
@@ -595,9 +1288,88 @@ class TestRunCutAndSaveAudio(absltest.TestCase):
         )
         self.assertTrue(os.path.exists(expected_file))
 
+  @patch("pydub.AudioSegment.from_file")
+  def test_run_cut_and_save_audio_from_store(self, mock_from_file):
+    audio_store = MagicMock(spec=audio_processing.DecodedAudioStore)
+    audio_store.sample_rate = 44100
+    audio_store.get_sample_range.return_value = [0, 220500]
+    audio_store.get_range.return_value = np.zeros((220500, 2), np.float32)
+    with tempfile.TemporaryDirectory() as output_directory:
+      os.makedirs(
+          os.path.join(output_directory, audio_processing.AUDIO_PROCESSING)
+      )
+      result = audio_processing.run_cut_and_save_audio(
+          utterance_metadata=[{"start": 0.0, "end": 5.0}],
+          audio_file="input.mp3",
+          output_directory=output_directory,
+          audio_store=audio_store,
+      )
+      self.assertTrue(os.path.exists(result[0]["path"]))
+    audio_store.get_sample_range.assert_called_once_with(start=0.0, end=5.0)
+    mock_from_file.assert_not_called()
+
+
+  def test_run_cut_and_save_audio_virtual_chunks(self):
+    audio_store = MagicMock(spec=audio_processing.DecodedAudioStore)
+    audio_store.get_sample_range.return_value = [0, 220500]
+    with tempfile.TemporaryDirectory() as output_directory:
+      result = audio_processing.run_cut_and_save_audio(
+          utterance_metadata=[{"start": 0.0, "end": 5.0}],
+          audio_file="input.mp3",
+          output_directory=output_directory,
+          audio_store=audio_store,
+          virtual_chunks=True,
+      )
+      expected_path = (
+          f"{output_directory}/{audio_processing.AUDIO_PROCESSING}/"
+          "chunk_0.0_5.0.mp3"
+      )
+      self.assertEqual(
+          result,
+          [{
+              "start": 0.0,
+              "end": 5.0,
+              "sample_range": [0, 220500],
+              "path": expected_path,
+          }],
+      )
+      self.assertFalse(os.path.exists(expected_path))
+    audio_store.get_audio_segment.assert_not_called()
+
+  def test_run_cut_and_save_audio_virtual_chunks_without_store(self):
+    with self.assertRaisesRegex(ValueError, "decoded audio store"):
+      audio_processing.run_cut_and_save_audio(
+          utterance_metadata=[{"start": 0.0, "end": 5.0}],
+          audio_file="input.mp3",
+          output_directory="output",
+          virtual_chunks=True,
+      )
+
 
 class VerifyAddedAudioChunkTest(absltest.TestCase):
 
+  @patch("ariel.audio_processing.cut_and_save_audio")
+  def test_verify_added_audio_chunk_virtual(self, mock_cut_and_save_audio):
+    audio_store = MagicMock(spec=audio_processing.DecodedAudioStore)
+    audio_store.get_sample_range.return_value = [22050, 110250]
+    result = audio_processing.verify_added_audio_chunk(
+        audio_file="input.mp3",
+        utterance={"start": 0.5, "end": 2.5},
+        output_directory="output",
+        audio_store=audio_store,
+        virtual_chunks=True,
+    )
+    self.assertEqual(
+        result,
+        {
+            "start": 0.5,
+            "end": 2.5,
+            "sample_range": [22050, 110250],
+            "path": "output/audio_processing/chunk_0.5_2.5.mp3",
+        },
+    )
+    mock_cut_and_save_audio.assert_not_called()
+
   @patch("ariel.audio_processing.cut_and_save_audio")
   def test_verify_added_audio_chunk(self, mock_cut_and_save_audio):
     with tempfile.TemporaryDirectory() as tmpdir:
@@ -664,13 +1436,45 @@ class VerifyModifiedAudioChunkTest(absltest.TestCase):
           mock.call("wrong_chunk.mp3"),
       ])
       mock_cut_and_save_audio.assert_any_call(
-          audio=AudioSegment.from_file(audio_file_path),
+          audio=audio_io.read_audio_segment(audio_file_path),
           utterance=utterance,
           prefix="chunk",
           output_directory=tmpdir,
       )
 
 
+class AudioMixerTest(absltest.TestCase):
+
+  def test_add(self):
+    mixer = audio_processing.AudioMixer(
+        duration_seconds=1.0, frame_rate=10, channels=1
+    )
+    mixer.add(np.ones((4, 1), dtype=np.float32), start=0.2)
+    mixer.add(np.ones((4, 1), dtype=np.float32), start=0.4, gain_factor=0.501)
+    mixer.add(np.ones((4, 1), dtype=np.float32), start=0.8)
+    np.testing.assert_allclose(
+        mixer.timeline[:, 0],
+        [0, 0, 1, 1, 1.501, 1.501, 0.501, 0.501, 1, 1],
+        atol=0.001,
+    )
+
+  def test_normalize(self):
+    mixer = audio_processing.AudioMixer(
+        duration_seconds=1.0, frame_rate=10, channels=1
+    )
+    mixer.add(np.full((2, 1), 0.5, dtype=np.float32), start=0.0)
+    mixer.normalize(headroom_db=0.0)
+    self.assertAlmostEqual(np.abs(mixer.timeline).max(), 1.0, places=5)
+
+  def test_audio_segment_conversion(self):
+    samples = np.array([[0.5, -0.5], [0.25, 0.0]], dtype=np.float32)
+    audio = audio_processing.array_to_audio_segment(samples, frame_rate=8000)
+    self.assertEqual(audio.channels, 2)
+    np.testing.assert_allclose(
+        audio_processing.audio_segment_to_array(audio), samples, atol=0.0001
+    )
+
+
 class TestInsertAudioAtTimestamps(absltest.TestCase):
 
   def test_insert_audio_at_timestamps(self):
@@ -705,6 +1509,36 @@ class TestInsertAudioAtTimestamps(absltest.TestCase):
       )
       self.assertTrue(os.path.exists(output_path))
 
+  def test_insert_audio_at_timestamps_position(self):
+    with tempfile.TemporaryDirectory() as temporary_directory:
+      os.makedirs(
+          os.path.join(temporary_directory, audio_processing.AUDIO_PROCESSING)
+      )
+      background_audio_file = f"{temporary_directory}/test_background.mp3"
+      AudioSegment.silent(duration=4000, frame_rate=44100).set_channels(
+          2
+      ).export(background_audio_file, format="mp3")
+      audio_chunk_path = f"{temporary_directory}/test_chunk.mp3"
+      time = np.arange(44100) / 44100
+      tone = (0.3 * np.sin(2 * np.pi * 440 * time) * 32767).astype(np.int16)
+      AudioSegment(
+          tone.tobytes(), frame_rate=44100, sample_width=2, channels=1
+      ).export(audio_chunk_path, format="mp3")
+      output_path = audio_processing.insert_audio_at_timestamps(
+          utterance_metadata=[{
+              "start": 2.0,
+              "end": 3.0,
+              "dubbed_path": audio_chunk_path,
+              "for_dubbing": True,
+          }],
+          background_audio_file=background_audio_file,
+          output_directory=temporary_directory,
+      )
+      output = AudioSegment.from_mp3(output_path)
+      self.assertEqual(output.channels, 2)
+      self.assertLess(output[:1900].dBFS, -60)
+      self.assertAlmostEqual(output[2100:2900].max_dBFS, -0.1, delta=0.5)
+
 
 class MixMusicAndVocalsTest(absltest.TestCase):
 
@@ -734,5 +1568,255 @@ class MixMusicAndVocalsTest(absltest.TestCase):
       self.assertTrue(os.path.exists(output_audio_path))
 
 
+class MixDubbedAudioTest(absltest.TestCase):
+
+  def test_mix_dubbed_audio(self):
+    with tempfile.TemporaryDirectory() as temporary_directory:
+      for directory in (audio_processing.AUDIO_PROCESSING, "output"):
+        os.makedirs(os.path.join(temporary_directory, directory))
+      background_audio_file = f"{temporary_directory}/test_background.mp3"
+      time = np.arange(44100 * 4) / 44100
+      tone = (0.1 * np.sin(2 * np.pi * 220 * time) * 32767).astype(np.int16)
+      AudioSegment(
+          tone.tobytes(), frame_rate=44100, sample_width=2, channels=1
+      ).set_channels(2).export(background_audio_file, format="mp3")
+      audio_chunk_path = f"{temporary_directory}/test_chunk.mp3"
+      AudioSegment(
+          tone[:44100].tobytes(), frame_rate=44100, sample_width=2, channels=1
+      ).export(audio_chunk_path, format="mp3")
+      output_path = audio_processing.mix_dubbed_audio(
+          utterance_metadata=[{
+              "start": 1.0,
+              "end": 2.0,
+              "dubbed_path": audio_chunk_path,
+              "for_dubbing": True,
+          }],
+          background_audio_file=background_audio_file,
+          output_directory=temporary_directory,
+          target_language="en-US",
+          save_dubbed_vocals=True,
+      )
+      self.assertEqual(
+          output_path,
+          os.path.join(temporary_directory, "output", "dubbed_audio_en_us.mp3"),
+      )
+      output = AudioSegment.from_mp3(output_path)
+      self.assertAlmostEqual(output.duration_seconds, 4.0, delta=0.1)
+      self.assertAlmostEqual(output.max_dBFS, -0.1, delta=0.5)
+      self.assertGreater(output[1100:1900].dBFS, output[2500:3500].dBFS)
+      self.assertTrue(
+          os.path.exists(
+              os.path.join(
+                  temporary_directory,
+                  audio_processing.AUDIO_PROCESSING,
+                  "dubbed_vocals.mp3",
+              )
+          )
+      )
+
+  def test_mix_dubbed_audio_virtual_chunks(self):
+    with tempfile.TemporaryDirectory() as temporary_directory:
+      for directory in (audio_processing.AUDIO_PROCESSING, "output"):
+        os.makedirs(os.path.join(temporary_directory, directory))
+      background_audio_file = f"{temporary_directory}/test_background.mp3"
+      AudioSegment.silent(duration=4000, frame_rate=44100).set_channels(
+          2
+      ).export(background_audio_file, format="mp3")
+      audio_store = MagicMock(spec=audio_processing.DecodedAudioStore)
+      audio_store.get_range.return_value = np.full(
+          (44100, 2), 0.5, dtype=np.float32
+      )
+      output_path = audio_processing.mix_dubbed_audio(
+          utterance_metadata=[{
+              "start": 1.0,
+              "end": 2.0,
+              "path": "missing_chunk.mp3",
+              "sample_range": [44100, 88200],
+              "for_dubbing": False,
+          }],
+          background_audio_file=background_audio_file,
+          output_directory=temporary_directory,
+          target_language="en-US",
+          audio_store=audio_store,
+      )
+      output = AudioSegment.from_mp3(output_path)
+      self.assertGreater(output[1100:1900].dBFS, output[2500:3500].dBFS)
+      audio_store.get_range.assert_called_once_with(
+          [44100, 88200], sample_rate=44100, channels=None
+      )
+
+
+class VocalsMixCacheTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    temporary_directory = tempfile.TemporaryDirectory()
+    self.addCleanup(temporary_directory.cleanup)
+    self.temp_dir = temporary_directory.name
+    self.mix_cache = audio_processing.VocalsMixCache(
+        cache_directory=os.path.join(self.temp_dir, "cache")
+    )
+    self.background = np.zeros((16000 * 4, 2), dtype=np.float32)
+
+  def _write_chunk(
+      self, name: str, *, seconds: float, amplitude: float, modified: int = 0
+  ) -> str:
+    path = os.path.join(self.temp_dir, name)
+    time = np.arange(int(seconds * 16000)) / 16000
+    tone = amplitude * np.sin(2 * np.pi * 220 * time)[:, None]
+    audio_io.write_audio(path, tone, frame_rate=16000, format="wav")
+    os.utime(path, ns=(modified, modified))
+    return path
+
+  def _mix(self, utterance_metadata, mix_cache=None):
+    return audio_processing._mix_dubbed_vocals(
+        utterance_metadata=utterance_metadata,
+        background=self.background,
+        frame_rate=16000,
+        mix_cache=mix_cache,
+    ).timeline
+
+  def _utterance_metadata(self):
+    return [
+        dict(
+            start=0.5,
+            path=self._write_chunk("source.wav", seconds=1.0, amplitude=0.3),
+            for_dubbing=False,
+        ),
+        dict(
+            start=1.0,
+            dubbed_path=self._write_chunk(
+                "dubbed_1.wav", seconds=1.5, amplitude=0.2
+            ),
+            for_dubbing=True,
+        ),
+        dict(
+            start=2.0,
+            dubbed_path=self._write_chunk(
+                "dubbed_2.wav", seconds=1.0, amplitude=0.4
+            ),
+            for_dubbing=True,
+        ),
+    ]
+
+  def test_matches_full_mix(self):
+    utterance_metadata = self._utterance_metadata()
+    np.testing.assert_allclose(
+        self._mix(utterance_metadata, self.mix_cache),
+        self._mix(utterance_metadata),
+        atol=1e-6,
+    )
+
+  def test_updates_changed_utterances(self):
+    utterance_metadata = self._utterance_metadata()
+    self._mix(utterance_metadata, self.mix_cache)
+    self._write_chunk("dubbed_1.wav", seconds=1.2, amplitude=0.1, modified=1)
+    updated_metadata = utterance_metadata[:2]
+    with patch.object(
+        audio_io, "read_audio", wraps=audio_io.read_audio
+    ) as mock_read_audio:
+      timeline = self._mix(updated_metadata, self.mix_cache)
+    self.assertCountEqual(
+        [call.args[0] for call in mock_read_audio.call_args_list],
+        [utterance_metadata[0]["path"], utterance_metadata[1]["dubbed_path"]],
+    )
+    np.testing.assert_allclose(
+        timeline, self._mix(updated_metadata), atol=1e-6
+    )
+
+  def test_reuses_unchanged_timeline(self):
+    utterance_metadata = self._utterance_metadata()
+    expected_timeline = self._mix(utterance_metadata, self.mix_cache)
+    with patch.object(audio_io, "read_audio") as mock_read_audio:
+      timeline = self._mix(utterance_metadata, self.mix_cache)
+    mock_read_audio.assert_not_called()
+    np.testing.assert_array_equal(timeline, expected_timeline)
+
+  def test_second_render_reads_only_changed_utterances(self):
+    os.makedirs(os.path.join(self.temp_dir, "output"))
+    background_audio_file = os.path.join(self.temp_dir, "background.wav")
+    audio_io.write_audio(
+        background_audio_file, self.background, frame_rate=16000, format="wav"
+    )
+    utterance_metadata = [
+        dict(
+            start=0.5,
+            dubbed_path=self._write_chunk(
+                "dubbed_1.wav", seconds=1.0, amplitude=0.2
+            ),
+            for_dubbing=True,
+        ),
+        dict(
+            start=2.5,
+            dubbed_path=self._write_chunk(
+                "dubbed_2.wav", seconds=1.0, amplitude=0.4
+            ),
+            for_dubbing=True,
+        ),
+    ]
+
+    def _render(target_language, mix_cache=None):
+      return audio_processing.mix_dubbed_audio(
+          utterance_metadata=utterance_metadata,
+          background_audio_file=background_audio_file,
+          output_directory=self.temp_dir,
+          target_language=target_language,
+          mix_cache=mix_cache,
+      )
+
+    _render("en-US", self.mix_cache)
+    self._write_chunk(
+        "dubbed_2.wav", seconds=1.0, amplitude=0.1, modified=10**9
+    )
+    with patch.object(
+        audio_io, "read_audio", wraps=audio_io.read_audio
+    ) as mock_read_audio:
+      output_path = _render(
+          "en-US",
+          audio_processing.VocalsMixCache(
+              cache_directory=self.mix_cache.cache_directory
+          ),
+      )
+    self.assertCountEqual(
+        [call.args[0] for call in mock_read_audio.call_args_list],
+        [background_audio_file, utterance_metadata[1]["dubbed_path"]],
+    )
+    np.testing.assert_allclose(
+        audio_io.read_audio(output_path)[0],
+        audio_io.read_audio(_render("de-DE"))[0],
+        atol=1e-4,
+    )
+
+  def test_contribution_key_of_virtual_chunk(self):
+    audio_file = self._write_chunk("audio.wav", seconds=1.0, amplitude=0.1)
+    audio_store = MagicMock(spec=audio_processing.DecodedAudioStore)
+    audio_store.audio_file = audio_file
+    utterance = dict(
+        start=0.0, for_dubbing=False, path="chunk.mp3", sample_range=[0, 10]
+    )
+    key = audio_processing._get_contribution_key(
+        utterance, audio_store=audio_store
+    )
+    self._write_chunk(
+        "audio.wav", seconds=1.0, amplitude=0.2, modified=10**9
+    )
+    self.assertNotEqual(
+        key,
+        audio_processing._get_contribution_key(
+            utterance, audio_store=audio_store
+        ),
+    )
+
+  def test_ignores_different_format(self):
+    utterance_metadata = self._utterance_metadata()
+    self._mix(utterance_metadata, self.mix_cache)
+    self.background = np.zeros((16000 * 5, 2), dtype=np.float32)
+    timeline = self._mix(utterance_metadata, self.mix_cache)
+    self.assertLen(timeline, 16000 * 5)
+    np.testing.assert_allclose(
+        timeline, self._mix(utterance_metadata), atol=1e-6
+    )
+
+
 if __name__ == "__main__":
   absltest.main()
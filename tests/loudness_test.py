@@ -0,0 +1,85 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for utility functions in loudness.py."""
+
+from absl.testing import absltest
+from absl.testing import parameterized
+from ariel import loudness
+import numpy as np
+from pyloudnorm import Meter
+
+
+class IntegratedLoudnessTest(parameterized.TestCase):
+
+  @parameterized.named_parameters(
+      ("mono_16k", 16000, 1),
+      ("stereo_24k", 24000, 2),
+      ("stereo_44k", 44100, 2),
+  )
+  def test_matches_pyloudnorm(self, rate, channels):
+    generator = np.random.default_rng(0)
+    chunks = [
+        amplitude * generator.standard_normal((int(duration * rate), channels))
+        for duration, amplitude in ((0.4, 0.1), (1.3, 0.5), (3.7, 0.01))
+    ]
+    chunks[2][:rate] = 0.0
+    expected_loudness = [
+        Meter(rate).integrated_loudness(chunk) for chunk in chunks
+    ]
+    np.testing.assert_allclose(
+        loudness.integrated_loudness(chunks, rate=rate),
+        expected_loudness,
+        atol=1e-5,
+    )
+
+  def test_silence(self):
+    self.assertEqual(
+        loudness.integrated_loudness([np.zeros((8000, 1))], rate=16000)[0],
+        -np.inf,
+    )
+
+  def test_too_short(self):
+    with self.assertRaisesRegex(ValueError, "block size"):
+      loudness.integrated_loudness([np.zeros((100, 1))], rate=16000)
+
+
+class NormalizationGainsTest(absltest.TestCase):
+
+  def test_normalization_gains(self):
+    generator = np.random.default_rng(0)
+    loud_chunk = 0.5 * generator.standard_normal((24000, 1))
+    quiet_chunk = 0.01 * generator.standard_normal((44100 * 2, 2))
+    short_chunk = 0.1 * generator.standard_normal((1000, 1))
+    gains = loudness.normalization_gains(
+        [
+            (loud_chunk, 24000),
+            (quiet_chunk, 44100),
+            (np.zeros((44100, 2)), 44100),
+            (short_chunk, 24000),
+        ],
+        target_lufs=-16.0,
+    )
+    self.assertAlmostEqual(
+        Meter(24000).integrated_loudness(loud_chunk * gains[0]), -16.0
+    )
+    self.assertAlmostEqual(
+        Meter(44100).integrated_loudness(quiet_chunk * gains[1]), -16.0
+    )
+    self.assertEqual(gains[2], 1.0)
+    self.assertGreater(gains[3], 0.0)
+
+
+if __name__ == "__main__":
+  absltest.main()
@@ -15,12 +15,17 @@
 """Tests for utility functions in speech_to_text.py."""
 
 from collections import namedtuple
+import itertools
+import os
 import tempfile
+import time
 from unittest.mock import MagicMock, patch
 from absl.testing import absltest
 from absl.testing import parameterized
+from ariel import audio_processing
 from ariel import speech_to_text
 from faster_whisper import WhisperModel
+from faster_whisper.feature_extractor import FeatureExtractor
 from moviepy.audio.AudioClip import AudioArrayClip
 import numpy as np
 from vertexai.generative_models import GenerativeModel
@@ -38,7 +43,7 @@ class TranscribeTests(parameterized.TestCase):
       silence.write_audiofile(temporary_file.name)
       mock_model = MagicMock(spec=WhisperModel)
       Segment = namedtuple("Segment", ["text"])
-      mock_model.transcribe.return_value = [Segment(text="Test.")], None
+      mock_model.transcribe.return_value = [Segment(text=" Test.")], None
       transcribed_text = speech_to_text.transcribe(
           vocals_filepath=temporary_file.name,
           advertiser_name="Advertiser Name",
@@ -109,6 +114,437 @@ class TranscribeTests(parameterized.TestCase):
           )
       ]
       self.assertEqual(transcribed_audio_chunks, expected_result)
+      self.assertEqual(
+          mock_model.transcribe.call_args.args[0].shape, (16000 * 5,)
+      )
+
+  def test_transcribe_chunks_from_store(self):
+    mock_model = MagicMock(spec=WhisperModel)
+    Segment = namedtuple("Segment", ["text"])
+    mock_model.transcribe.return_value = [Segment(text="hello")], None
+    audio_store = MagicMock(spec=audio_processing.DecodedAudioStore)
+    samples = np.zeros(16000, dtype=np.float32)
+    audio_store.get_speech_segment.return_value = samples
+    transcribed_audio_chunks = speech_to_text.transcribe_audio_chunks(
+        utterance_metadata=[dict(path="chunk.mp3", start=1.0, end=2.0)],
+        advertiser_name="Advertiser Name",
+        original_language="en-US",
+        model=mock_model,
+        no_dubbing_phrases=[],
+        audio_store=audio_store,
+        beam_size=2,
+    )
+    self.assertEqual(transcribed_audio_chunks[0]["text"], "hello")
+    audio_store.get_speech_segment.assert_called_once_with(start=1.0, end=2.0)
+    self.assertIs(mock_model.transcribe.call_args.args[0], samples)
+    self.assertEqual(mock_model.transcribe.call_args.kwargs["beam_size"], 2)
+
+  @parameterized.named_parameters(("sequential", 1), ("batch", 8))
+  @patch("ariel.speech_to_text.transcribe_batch")
+  def test_transcribe_virtual_chunks_from_store(
+      self, batch_size, mock_transcribe_batch
+  ):
+    mock_model = MagicMock(spec=WhisperModel)
+    Segment = namedtuple("Segment", ["text"])
+    mock_model.transcribe.return_value = [Segment(text="hello")], None
+    mock_transcribe_batch.return_value = ["hello"]
+    audio_store = MagicMock(spec=audio_processing.DecodedAudioStore)
+    samples = np.zeros(16000, dtype=np.float32)
+    audio_store.get_range.return_value = samples[:, None]
+    transcribed_audio_chunks = speech_to_text.transcribe_audio_chunks(
+        utterance_metadata=[
+            dict(
+                path="chunk.mp3",
+                start=1.0,
+                end=2.0,
+                sample_range=[44100, 88200],
+            )
+        ],
+        advertiser_name="Advertiser Name",
+        original_language="en-US",
+        model=mock_model,
+        no_dubbing_phrases=[],
+        audio_store=audio_store,
+        batch_size=batch_size,
+    )
+    self.assertEqual(transcribed_audio_chunks[0]["text"], "hello")
+    audio_store.get_range.assert_called_once_with(
+        [44100, 88200], sample_rate=16000, channels=1
+    )
+    audio_store.get_speech_segment.assert_not_called()
+    if batch_size > 1:
+      audios = mock_transcribe_batch.call_args.kwargs["audios"]
+    else:
+      audios = [mock_model.transcribe.call_args.args[0]]
+    np.testing.assert_array_equal(audios, [samples])
+
+  def test_transcribe_chunks_concurrently(self):
+    mock_model = MagicMock(spec=WhisperModel)
+    Segment = namedtuple("Segment", ["text"])
+
+    def _transcribe(audio, **_):
+      time.sleep(0.01 * (3 - len(audio) // 16000))
+      return [Segment(text=f"utterance {len(audio) // 16000}")], None
+
+    mock_model.transcribe.side_effect = _transcribe
+    audio_store = MagicMock(spec=audio_processing.DecodedAudioStore)
+    audio_store.get_speech_segment.side_effect = (
+        lambda start, end: np.zeros(int((end - start) * 16000))
+    )
+    transcribed_audio_chunks = speech_to_text.transcribe_audio_chunks(
+        utterance_metadata=[
+            dict(path=f"chunk_{index}.mp3", start=0.0, end=float(index))
+            for index in range(1, 4)
+        ],
+        advertiser_name="Advertiser Name",
+        original_language="en",
+        model=mock_model,
+        no_dubbing_phrases=[],
+        audio_store=audio_store,
+        num_workers=3,
+    )
+    self.assertEqual(
+        [item["text"] for item in transcribed_audio_chunks],
+        ["utterance 1", "utterance 2", "utterance 3"],
+    )
+    audio_store.get_speech_samples.assert_called_once_with()
+
+  def _make_batch_model(self, results):
+    mock_model = MagicMock(spec=WhisperModel)
+    mock_model.feature_extractor = FeatureExtractor(feature_size=80)
+    mock_model.max_length = 448
+    mock_model.hf_tokenizer = MagicMock()
+    mock_model.get_prompt.return_value = [1, 2, 3]
+    mock_model.model = MagicMock()
+    mock_model.model.generate.return_value = results
+    return mock_model
+
+  @patch("ariel.speech_to_text.Tokenizer")
+  def test_transcribe_batch(self, mock_tokenizer):
+    mock_tokenizer.return_value.decode.side_effect = lambda tokens: " ".join(
+        f"word{token}" for token in tokens
+    )
+    Result = namedtuple("Result", ["sequences_ids", "scores", "no_speech_prob"])
+    mock_model = self._make_batch_model([
+        Result([[1, 2]], [-0.1], 0.0),
+        Result([[3]], [-3.0], 0.9),
+        Result([[4]], [-3.0], 0.1),
+    ])
+    Segment = namedtuple("Segment", ["text"])
+    mock_model.transcribe.side_effect = [
+        ([Segment(text="fallback")], None),
+        ([Segment(text="long")], None),
+    ]
+    audios = [np.zeros(16000, dtype=np.float32)] * 3 + [
+        np.zeros(16000 * 31, dtype=np.float32)
+    ]
+    texts = speech_to_text.transcribe_batch(
+        audios=audios,
+        advertiser_name="Advertiser Name",
+        original_language="en-US",
+        model=mock_model,
+        batch_size=4,
+    )
+    self.assertEqual(texts, ["word1 word2", "", "fallback", "long"])
+    features, prompts = mock_model.model.generate.call_args.args
+    self.assertEqual(features.shape, [3, 80, 3000])
+    self.assertEqual(prompts, [[1, 2, 3]] * 3)
+    mock_model.get_prompt.assert_called_once_with(
+        mock_tokenizer.return_value,
+        [],
+        without_timestamps=True,
+        hotwords="Advertiser Name",
+    )
+    self.assertEqual(mock_tokenizer.call_args.kwargs["language"], "en")
+
+  @patch("ariel.speech_to_text.Tokenizer")
+  def test_transcribe_chunks_in_batches(self, mock_tokenizer):
+    mock_tokenizer.return_value.decode.return_value = "hello world"
+    Result = namedtuple("Result", ["sequences_ids", "scores", "no_speech_prob"])
+    mock_model = self._make_batch_model(
+        [Result([[1, 2]], [-0.1], 0.0), Result([[1, 2]], [-0.1], 0.0)]
+    )
+    audio_store = MagicMock(spec=audio_processing.DecodedAudioStore)
+    audio_store.get_speech_segment.return_value = np.zeros(
+        16000, dtype=np.float32
+    )
+    transcribed_audio_chunks = speech_to_text.transcribe_audio_chunks(
+        utterance_metadata=[
+            dict(path="chunk_1.mp3", start=0.0, end=1.0),
+            dict(path="chunk_2.mp3", start=1.0, end=2.0),
+        ],
+        advertiser_name="Advertiser Name",
+        original_language="en",
+        model=mock_model,
+        no_dubbing_phrases=["hello world"],
+        audio_store=audio_store,
+        batch_size=8,
+    )
+    self.assertEqual(
+        [item["text"] for item in transcribed_audio_chunks],
+        ["hello world", "hello world"],
+    )
+    self.assertEqual(
+        [item["for_dubbing"] for item in transcribed_audio_chunks],
+        [False, False],
+    )
+    mock_model.model.generate.assert_called_once()
+    mock_model.transcribe.assert_not_called()
+
+
+class FullTrackTranscriptionTest(parameterized.TestCase):
+
+  def test_assign_words_to_utterances(self):
+    words = [
+        (0.0, 0.4, " Hello"),
+        (0.5, 1.2, " world."),
+        (1.2, 1.4, " Split"),
+        (2.6, 3.0, " Buy"),
+        (3.0, 3.4, " now!"),
+        (3.6, 3.8, " near"),
+        (9.0, 9.5, " far"),
+    ]
+    utterance_metadata = [
+        dict(start=0.1, end=1.0),
+        dict(start=2.0, end=3.5),
+        dict(start=5.0, end=6.0),
+    ]
+    self.assertEqual(
+        speech_to_text.assign_words_to_utterances(
+            words=words, utterance_metadata=utterance_metadata
+        ),
+        ["Hello world. Split", "Buy now! near", ""],
+    )
+
+  def test_assign_no_words(self):
+    self.assertEqual(
+        speech_to_text.assign_words_to_utterances(
+            words=[], utterance_metadata=[dict(start=0.0, end=1.0)]
+        ),
+        [""],
+    )
+
+  def test_transcribe_full_track(self):
+    mock_model = MagicMock(spec=WhisperModel)
+    Segment = namedtuple("Segment", ["text", "words"])
+    Word = namedtuple("Word", ["start", "end", "word"])
+    mock_model.transcribe.return_value = [
+        Segment(
+            text="Hello world.",
+            words=[Word(0.0, 0.5, " Hello"), Word(0.5, 1.0, " world.")],
+        ),
+        Segment(text="Buy now!", words=[Word(2.0, 2.5, " Buy now!")]),
+    ], None
+    samples = np.zeros(16000 * 3, dtype=np.float32)
+    transcribed_utterances = speech_to_text.transcribe_full_track(
+        audio=samples,
+        utterance_metadata=[
+            dict(path="chunk_1.mp3", start=0.0, end=1.0),
+            dict(path="chunk_2.mp3", start=2.0, end=2.5),
+        ],
+        advertiser_name="Advertiser Name",
+        original_language="en-US",
+        model=mock_model,
+        no_dubbing_phrases=["buy now"],
+    )
+    self.assertEqual(
+        transcribed_utterances,
+        [
+            dict(
+                path="chunk_1.mp3",
+                start=0.0,
+                end=1.0,
+                text="Hello world.",
+                for_dubbing=True,
+            ),
+            dict(
+                path="chunk_2.mp3",
+                start=2.0,
+                end=2.5,
+                text="Buy now!",
+                for_dubbing=False,
+            ),
+        ],
+    )
+    mock_model.transcribe.assert_called_once_with(
+        samples,
+        language="en",
+        hotwords="Advertiser Name",
+        beam_size=5,
+        word_timestamps=True,
+    )
+
+  @parameterized.named_parameters(
+      ("identical", "Hello, world!", "hello world", 0.0),
+      ("substitution", "buy it now", "buy this now", 1 / 3),
+      ("deletion", "buy it now", "buy now", 1 / 3),
+      ("insertion", "buy now", "buy it now", 1 / 2),
+      ("empty_reference", "", "", 0.0),
+      ("empty_reference_with_hypothesis", "", "hello", 1.0),
+  )
+  def test_word_error_rate(self, reference, hypothesis, expected_rate):
+    self.assertAlmostEqual(
+        speech_to_text.word_error_rate(
+            reference=reference, hypothesis=hypothesis
+        ),
+        expected_rate,
+    )
+
+
+class TranscriptCacheTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    temporary_directory = tempfile.TemporaryDirectory()
+    self.addCleanup(temporary_directory.cleanup)
+    self.cache_file = os.path.join(
+        temporary_directory.name, "cache", "transcripts.sqlite"
+    )
+    self.cache = speech_to_text.TranscriptCache(
+        cache_file=self.cache_file,
+        model_name="large-v3",
+        compute_type="int8",
+        max_entries=2,
+    )
+
+  def test_make_key(self):
+    samples = np.zeros(16000, dtype=np.float32)
+    key = self.cache.make_key(
+        samples=samples,
+        language="en",
+        hotwords="Ad",
+        decoding="sequential",
+        beam_size=5,
+    )
+    self.assertEqual(
+        key,
+        self.cache.make_key(
+            samples=samples.copy(),
+            language="en",
+            hotwords="Ad",
+            decoding="sequential",
+            beam_size=5,
+        ),
+    )
+    self.assertNotEqual(
+        key,
+        self.cache.make_key(
+            samples=samples,
+            language="de",
+            hotwords="Ad",
+            decoding="sequential",
+            beam_size=5,
+        ),
+    )
+    self.assertNotEqual(
+        key,
+        self.cache.make_key(
+            samples=np.ones(16000, dtype=np.float32),
+            language="en",
+            hotwords="Ad",
+            decoding="sequential",
+            beam_size=5,
+        ),
+    )
+    self.assertNotEqual(
+        key,
+        self.cache.make_key(
+            samples=samples,
+            language="en",
+            hotwords="Ad",
+            decoding="batch",
+            beam_size=5,
+        ),
+    )
+    other_model_cache = speech_to_text.TranscriptCache(
+        cache_file=self.cache_file, model_name="medium", compute_type="int8"
+    )
+    self.assertNotEqual(
+        key,
+        other_model_cache.make_key(
+            samples=samples,
+            language="en",
+            hotwords="Ad",
+            decoding="sequential",
+            beam_size=5,
+        ),
+    )
+    self.assertNotEqual(
+        key,
+        self.cache.make_key(
+            samples=samples,
+            language="en",
+            hotwords="Ad",
+            decoding="sequential",
+            beam_size=1,
+        ),
+    )
+
+  def test_get_and_put(self):
+    self.assertIsNone(self.cache.get("key"))
+    self.cache.put(key="key", text="Hello.")
+    self.assertEqual(self.cache.get("key"), "Hello.")
+    reopened_cache = speech_to_text.TranscriptCache(
+        cache_file=self.cache_file, model_name="large-v3", compute_type="int8"
+    )
+    self.assertEqual(reopened_cache.get("key"), "Hello.")
+
+  @patch("ariel.speech_to_text.time.time")
+  def test_evicts_least_recently_used(self, mock_time):
+    mock_time.side_effect = itertools.count()
+    self.cache.put(key="first", text="1")
+    self.cache.put(key="second", text="2")
+    self.assertEqual(self.cache.get("first"), "1")
+    self.cache.put(key="third", text="3")
+    self.assertEqual(self.cache.get("first"), "1")
+    self.assertIsNone(self.cache.get("second"))
+    self.assertEqual(self.cache.get("third"), "3")
+
+  def test_transcribe_chunks_with_cache(self):
+    mock_model = MagicMock(spec=WhisperModel)
+    Segment = namedtuple("Segment", ["text"])
+    mock_model.transcribe.return_value = [Segment(text="new")], None
+    audio_store = MagicMock(spec=audio_processing.DecodedAudioStore)
+    audio_store.get_speech_segment.side_effect = (
+        lambda start, end: np.full(16000, start, dtype=np.float32)
+    )
+    cached_key = self.cache.make_key(
+        samples=np.full(16000, 1.0, dtype=np.float32),
+        language="en",
+        hotwords="Advertiser Name",
+        decoding="sequential",
+        beam_size=5,
+    )
+    self.cache.put(key=cached_key, text="cached")
+    utterance_metadata = [
+        dict(path="chunk_1.mp3", start=0.0, end=1.0),
+        dict(path="chunk_2.mp3", start=1.0, end=2.0),
+    ]
+    transcribed_audio_chunks = speech_to_text.transcribe_audio_chunks(
+        utterance_metadata=utterance_metadata,
+        advertiser_name="Advertiser Name",
+        original_language="en-US",
+        model=mock_model,
+        no_dubbing_phrases=[],
+        audio_store=audio_store,
+        transcript_cache=self.cache,
+    )
+    self.assertEqual(
+        [item["text"] for item in transcribed_audio_chunks], ["new", "cached"]
+    )
+    mock_model.transcribe.assert_called_once()
+    self.assertEqual(
+        self.cache.get(
+            self.cache.make_key(
+                samples=np.zeros(16000, dtype=np.float32),
+                language="en",
+                hotwords="Advertiser Name",
+                decoding="sequential",
+                beam_size=5,
+            )
+        ),
+        "new",
+    )
 
 
 class GCSTest(absltest.TestCase):
@@ -209,6 +645,72 @@ class DiarizationTest(absltest.TestCase):
     self.assertEqual(result, expected_result)
 
 
+def _make_voice(pitch: float, seconds: float, rate: int = 16000) -> np.ndarray:
+  time = np.arange(int(seconds * rate)) / rate
+  return sum(
+      np.sin(2 * np.pi * pitch * harmonic * time) / harmonic
+      for harmonic in range(1, 6)
+  )
+
+
+class LocalDiarizationTest(parameterized.TestCase):
+
+  @parameterized.named_parameters(
+      ("low", 110.0), ("middle", 165.0), ("high", 220.0)
+  )
+  def test_estimate_pitch(self, pitch):
+    voice = np.concatenate([np.zeros(8000), _make_voice(pitch, 1.0)])
+    estimated_pitch = speech_to_text.estimate_pitch(voice, rate=16000)
+    self.assertTrue(np.isnan(estimated_pitch[:40]).all())
+    self.assertAlmostEqual(
+        np.nanmedian(estimated_pitch[60:]), pitch, delta=pitch * 0.03
+    )
+
+  def test_diarize_speakers_locally(self):
+    vocals = np.concatenate([
+        _make_voice(220.0, 2.0),
+        _make_voice(110.0, 2.0),
+        _make_voice(220.0, 1.0),
+    ])
+    speaker_info, confidence = speech_to_text.diarize_speakers_locally(
+        utterance_metadata=[
+            {"start": 0.0, "end": 2.0, "speaker_label": "SPEAKER_01"},
+            {"start": 2.0, "end": 4.0, "speaker_label": "SPEAKER_00"},
+            {"start": 4.0, "end": 5.0, "speaker_label": "SPEAKER_01"},
+        ],
+        vocals=vocals,
+        rate=16000,
+    )
+    self.assertEqual(
+        speaker_info,
+        [
+            ("speaker_01", "Female"),
+            ("speaker_02", "Male"),
+            ("speaker_01", "Female"),
+        ],
+    )
+    self.assertEqual(confidence, 1.0)
+
+  def test_diarize_speakers_locally_low_confidence(self):
+    _, confidence = speech_to_text.diarize_speakers_locally(
+        utterance_metadata=[
+            {"start": 0.0, "end": 2.0, "speaker_label": "SPEAKER_00"},
+            {"start": 2.0, "end": 3.0, "speaker_label": "SPEAKER_01"},
+        ],
+        vocals=np.concatenate([_make_voice(160.0, 2.0), np.zeros(16000)]),
+        rate=16000,
+    )
+    self.assertEqual(confidence, 0.0)
+
+  def test_diarize_speakers_locally_without_labels(self):
+    with self.assertRaisesRegex(ValueError, "speaker label"):
+      speech_to_text.diarize_speakers_locally(
+          utterance_metadata=[{"start": 0.0, "end": 1.0}],
+          vocals=np.zeros(16000),
+          rate=16000,
+      )
+
+
 class AddSpeakerInfoTest(absltest.TestCase):
 
   def test_add_speaker_info(self):
@@ -442,6 +442,30 @@ class TestCalculateTargetUtteranceSpeed(absltest.TestCase):
       self.assertEqual(result, expected_result)
 
 
+class TestAdjustAudioSpeed(parameterized.TestCase):
+
+  @parameterized.named_parameters(
+      ("speed_up", 1.5, 2.0),
+      ("no_slow_down", 0.5, 3.0),
+  )
+  def test_adjust_audio_speed(self, speed, expected_duration):
+    with tempfile.TemporaryDirectory() as tempdir:
+      dubbed_file_path = os.path.join(tempdir, "dubbed.mp3")
+      AudioSegment.silent(duration=3000, frame_rate=24000).export(
+          dubbed_file_path, format="mp3"
+      )
+      text_to_speech.adjust_audio_speed(
+          speed=speed, dubbed_path=dubbed_file_path
+      )
+      self.assertAlmostEqual(
+          text_to_speech.calculate_target_utterance_speed(
+              reference_length=1.0, dubbed_file=dubbed_file_path
+          ),
+          expected_duration,
+          delta=0.05,
+      )
+
+
 class TestElevenlabsConvertTextToSpeech(absltest.TestCase):
 
   def test_convert_text_to_speech(self):
@@ -471,6 +495,35 @@ class TestElevenlabsConvertTextToSpeech(absltest.TestCase):
       self.assertEqual(result, output_file)
 
 
+class TestElevenlabsSynthesizeSpeech(absltest.TestCase):
+
+  def test_synthesize_speech(self):
+    buffer = io.BytesIO()
+    AudioSegment.silent(duration=1000, frame_rate=24000).export(
+        buffer, format="mp3"
+    )
+    mock_client = MagicMock(spec=ElevenLabs)
+    mock_client.text_to_speech = MagicMock()
+    mock_client.text_to_speech.convert = MagicMock(
+        return_value=iter([buffer.getvalue()])
+    )
+    mock_client.voices = MagicMock()
+    mock_client.voices.get_all = MagicMock(
+        return_value=MagicMock(
+            voices=[Voice(voice_id="some_voice_id", name="Bella")]
+        )
+    )
+    result = text_to_speech.elevenlabs_synthesize_speech(
+        client=mock_client,
+        model="eleven_multilingual_v2",
+        assigned_elevenlabs_voice="Bella",
+        text="This is a test for ElevenLabs conversion.",
+        target_language="en-US",
+    )
+    self.assertEqual(result.encoded_audio, buffer.getvalue())
+    self.assertAlmostEqual(result.duration, 1.0, delta=0.05)
+
+
 class TestCreateSpeakerDataMapping(absltest.TestCase):
 
   def test_empty_metadata(self):
@@ -643,12 +696,22 @@ class TestDubAllUtterances(parameterized.TestCase):
 
   @parameterized.named_parameters(
       ("not_for_dubbing", False, "original_path", False),
-      ("for_dubbing_elevenlabs", True, "dubbed_path.mp3", True),
-      ("for_dubbing_google", True, "dubbed_path.mp3", False),
+      (
+          "for_dubbing_elevenlabs",
+          True,
+          "test_output/dubbed_audio_chunks/dubbed_original_path.mp3",
+          True,
+      ),
+      (
+          "for_dubbing_google",
+          True,
+          "test_output/dubbed_audio_chunks/dubbed_original_path.mp3",
+          False,
+      ),
   )
-  @patch("ariel.text_to_speech.convert_text_to_speech")
-  @patch("ariel.text_to_speech.elevenlabs_convert_text_to_speech")
-  @patch("ariel.text_to_speech.adjust_audio_speed")
+  @patch("ariel.text_to_speech.synthesize_speech")
+  @patch("ariel.text_to_speech.elevenlabs_synthesize_speech")
+  @patch("ariel.text_to_speech.save_speech")
   @patch("ariel.text_to_speech.calculate_target_utterance_speed")
   def test_dubbing_logic(
       self,
@@ -656,9 +719,9 @@ class TestDubAllUtterances(parameterized.TestCase):
       expected_dubbed_path,
       use_elevenlabs,
       mock_calculate_target_utterance_speed,
-      mock_adjust_audio_speed,
-      mock_elevenlabs_convert_text_to_speech,
-      mock_convert_text_to_speech,
+      mock_save_speech,
+      mock_elevenlabs_synthesize_speech,
+      mock_synthesize_speech,
   ):
     utterance_metadata = [{
         "start": 0.0,
@@ -695,13 +758,95 @@ class TestDubAllUtterances(parameterized.TestCase):
         preprocessing_output=preprocessing_output,
         use_elevenlabs=use_elevenlabs,
     )
-    mock_convert_text_to_speech.return_value = "dubbed_path.mp3"
-    mock_elevenlabs_convert_text_to_speech.return_value = "dubbed_path.mp3"
+    speech = text_to_speech.SynthesizedSpeech(
+        samples=np.zeros((24000, 1), dtype=np.float32), frame_rate=24000
+    )
+    mock_synthesize_speech.return_value = speech
+    mock_elevenlabs_synthesize_speech.return_value = speech
     mock_calculate_target_utterance_speed.return_value = 1.0
 
     result = tts.dub_all_utterances()
 
     self.assertEqual(result[0][0].get("dubbed_path"), expected_dubbed_path)
+    if for_dubbing_value:
+      mock_save_speech.assert_called_once_with(
+          speech, output_filename=expected_dubbed_path
+      )
+    else:
+      mock_save_speech.assert_not_called()
+
+  @patch("ariel.text_to_speech.audio_io.read_audio")
+  @patch("ariel.text_to_speech.elevenlabs_synthesize_speech")
+  def test_speed_adjusted_in_memory(
+      self, mock_elevenlabs_synthesize_speech, mock_read_audio
+  ):
+    utterance_metadata = [{
+        "start": 0.0,
+        "end": 1.0,
+        "for_dubbing": True,
+        "path": "chunk_0.0_1.0.mp3",
+        "translated_text": "translated text",
+        "assigned_voice": "test_voice",
+        "stability": 1.0,
+        "similarity_boost": 1.0,
+        "style": 1.0,
+        "use_speaker_boost": True,
+        "adjust_speed": True,
+    }]
+    mock_elevenlabs_synthesize_speech.return_value = (
+        text_to_speech.SynthesizedSpeech(
+            samples=np.zeros((48000, 1), dtype=np.float32),
+            frame_rate=24000,
+            encoded_audio=b"mp3",
+        )
+    )
+    with tempfile.TemporaryDirectory() as tempdir:
+      tts = text_to_speech.TextToSpeech(
+          client=MagicMock(),
+          utterance_metadata=utterance_metadata,
+          output_directory=tempdir,
+          target_language="en-US",
+          preprocessing_output={},
+          use_elevenlabs=True,
+      )
+      os.makedirs(os.path.join(tempdir, text_to_speech.DUBBED_AUDIO_CHUNKS))
+
+      result = tts.dub_all_utterances()
+
+      self.assertEqual(result[0][0]["speed"], 2.0)
+      self.assertAlmostEqual(
+          text_to_speech.calculate_target_utterance_speed(
+              reference_length=1.0, dubbed_file=result[0][0]["dubbed_path"]
+          ),
+          1.0,
+          delta=0.05,
+      )
+    mock_read_audio.assert_not_called()
+
+  @patch("ariel.text_to_speech.calculate_target_utterance_speed")
+  def test_dubbing_logic_virtual_chunk(
+      self, mock_calculate_target_utterance_speed
+  ):
+    utterance_metadata = [{
+        "start": 0.0,
+        "end": 1.0,
+        "for_dubbing": False,
+        "path": "chunk_0.0_1.0.mp3",
+        "sample_range": [0, 44100],
+        "assigned_voice": "test_voice",
+        "adjust_speed": True,
+    }]
+    tts = text_to_speech.TextToSpeech(
+        client=MagicMock(),
+        utterance_metadata=utterance_metadata,
+        output_directory="test_output",
+        target_language="en-US",
+        preprocessing_output={},
+    )
+    result = tts.dub_all_utterances()
+    self.assertEqual(result[0][0]["dubbed_path"], "chunk_0.0_1.0.mp3")
+    self.assertEqual(result[0][0]["speed"], 1.0)
+    mock_calculate_target_utterance_speed.assert_not_called()
 
   @patch("ariel.text_to_speech.audio_processing.run_cut_and_save_audio")
   @patch("ariel.text_to_speech.create_speaker_data_mapping")
@@ -0,0 +1,65 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for utility functions in time_stretch.py."""
+
+from absl.testing import absltest
+from absl.testing import parameterized
+from ariel import time_stretch
+import numpy as np
+
+
+def _dominant_frequency(samples: np.ndarray, rate: int) -> float:
+  spectrum = np.abs(np.fft.rfft(samples[:, 0]))
+  return np.argmax(spectrum) * rate / len(samples)
+
+
+class TimeStretchTest(parameterized.TestCase):
+
+  @parameterized.named_parameters(
+      ("slow_down", 0.7),
+      ("unchanged", 1.0),
+      ("speed_up", 1.3),
+      ("double_speed", 2.0),
+  )
+  def test_preserves_pitch(self, speed):
+    rate = 24000
+    time = np.arange(3 * rate) / rate
+    tone = 0.5 * np.sin(2 * np.pi * 220 * time)
+    samples = np.stack([tone, 0.5 * tone], axis=1)
+    stretched = time_stretch.time_stretch(samples, rate=rate, speed=speed)
+    self.assertEqual(stretched.shape, (round(len(samples) / speed), 2))
+    self.assertEqual(stretched.dtype, np.float32)
+    self.assertAlmostEqual(
+        _dominant_frequency(stretched, rate), 220.0, delta=1.0
+    )
+    np.testing.assert_allclose(
+        np.abs(stretched[rate // 10 : -rate // 10]).max(axis=0),
+        (0.5, 0.25),
+        atol=0.01,
+    )
+
+  def test_short_audio(self):
+    stretched = time_stretch.time_stretch(
+        np.ones((100, 1)), rate=16000, speed=1.5
+    )
+    self.assertEqual(stretched.shape, (67, 1))
+
+  def test_invalid_speed(self):
+    with self.assertRaisesRegex(ValueError, "must be positive"):
+      time_stretch.time_stretch(np.ones((100, 1)), rate=16000, speed=0.0)
+
+
+if __name__ == "__main__":
+  absltest.main()
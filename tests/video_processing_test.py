@@ -15,12 +15,17 @@
 """Tests for utility functions in video_processing.py."""
 
 import os
+import re
+import subprocess
 import tempfile
+from unittest import mock
 
 from absl.testing import absltest
 from ariel import video_processing
 from moviepy.audio.AudioClip import AudioArrayClip
+from moviepy.config import get_setting
 from moviepy.editor import ColorClip
+from moviepy.editor import VideoFileClip
 from moviepy.video.compositing.CompositeVideoClip import clips_array
 import numpy as np
 
@@ -79,6 +84,44 @@ class TestSplitAudioVideo(absltest.TestCase):
           ])
       )
 
+  def test_split_audio_video_copies_video_stream(self):
+    with tempfile.TemporaryDirectory() as temporary_directory:
+      os.makedirs(
+          os.path.join(temporary_directory, video_processing.VIDEO_PROCESSING)
+      )
+      mock_video_file = _create_mock_video(temporary_directory, 5)
+      with mock.patch.object(
+          video_processing, "_split_audio_video_with_reencoding"
+      ) as mock_reencoding:
+        video_file, audio_file = video_processing.split_audio_video(
+            video_file=mock_video_file, output_directory=temporary_directory
+        )
+        mock_reencoding.assert_not_called()
+      with VideoFileClip(mock_video_file) as original_clip:
+        with VideoFileClip(video_file) as video_clip:
+          self.assertIsNone(video_clip.audio)
+          self.assertAlmostEqual(
+              video_clip.duration, original_clip.duration, places=1
+          )
+      self.assertTrue(os.path.exists(audio_file))
+
+  def test_split_audio_video_falls_back_to_reencoding(self):
+    with tempfile.TemporaryDirectory() as temporary_directory:
+      os.makedirs(
+          os.path.join(temporary_directory, video_processing.VIDEO_PROCESSING)
+      )
+      mock_video_file = _create_mock_video(temporary_directory, 5)
+      with mock.patch.object(
+          video_processing,
+          "_split_audio_video_with_stream_copy",
+          side_effect=video_processing.FFmpegCommandError("Copy failed."),
+      ):
+        video_file, audio_file = video_processing.split_audio_video(
+            video_file=mock_video_file, output_directory=temporary_directory
+        )
+      self.assertTrue(os.path.exists(video_file))
+      self.assertTrue(os.path.exists(audio_file))
+
 
 class CombineAudioVideoTest(absltest.TestCase):
 
@@ -117,6 +160,122 @@ class CombineAudioVideoTest(absltest.TestCase):
       )
       self.assertTrue(os.path.exists(output_path))
 
+  def test_combine_audio_video_pads_audio_without_reencoding_video(self):
+    with tempfile.TemporaryDirectory() as temporary_directory:
+      os.makedirs(os.path.join(temporary_directory, video_processing._OUTPUT))
+      audio_path = f"{temporary_directory}/audio.mp3"
+      audio = AudioArrayClip(
+          np.zeros((int(44100 * 3), 2), dtype=np.int16),
+          fps=44100,
+      )
+      audio.write_audiofile(audio_path, logger=None)
+      video_path = os.path.join(temporary_directory, "video.mp4")
+      video = ColorClip((256, 200), color=(255, 0, 0)).set_duration(5)
+      video.fps = 30
+      video.write_videofile(video_path, logger=None)
+      with mock.patch.object(
+          video_processing, "_combine_audio_video_with_reencoding"
+      ) as mock_reencoding:
+        output_path = video_processing.combine_audio_video(
+            video_file=video_path,
+            dubbed_audio_file=audio_path,
+            output_directory=temporary_directory,
+            target_language="en-US",
+        )
+        mock_reencoding.assert_not_called()
+      with VideoFileClip(output_path) as output_clip:
+        self.assertIsNotNone(output_clip.audio)
+        self.assertAlmostEqual(output_clip.duration, 5, places=1)
+        self.assertAlmostEqual(output_clip.audio.duration, 5, delta=0.1)
+
+  def test_combine_audio_video_falls_back_when_probe_fails(self):
+    with mock.patch.object(
+        video_processing, "ffmpeg_parse_infos", side_effect=IOError("Probe.")
+    ), mock.patch.object(
+        video_processing, "_combine_audio_video_with_reencoding"
+    ) as mock_reencoding:
+      output_path = video_processing.combine_audio_video(
+          video_file="video.mp4",
+          dubbed_audio_file="audio.mp3",
+          output_directory="output",
+          target_language="en-US",
+      )
+    mock_reencoding.assert_called_once_with(
+        video_file="video.mp4",
+        dubbed_audio_file="audio.mp3",
+        dubbed_video_file=output_path,
+    )
+
+
+class CombineAudioVideoMultiLanguageTest(absltest.TestCase):
+
+  def test_combine_audio_video_multi_language(self):
+    with tempfile.TemporaryDirectory() as temporary_directory:
+      os.makedirs(os.path.join(temporary_directory, video_processing._OUTPUT))
+      dubbed_audio_files = {}
+      for target_language in ("fr-FR", "de-DE"):
+        audio_path = f"{temporary_directory}/audio_{target_language}.mp3"
+        audio = AudioArrayClip(
+            np.zeros((int(44100 * 5), 2), dtype=np.int16),
+            fps=44100,
+        )
+        audio.write_audiofile(audio_path, logger=None)
+        dubbed_audio_files[target_language] = audio_path
+      video_path = os.path.join(temporary_directory, "video.mp4")
+      video = ColorClip((256, 200), color=(255, 0, 0)).set_duration(5)
+      video.fps = 30
+      video.write_videofile(video_path, logger=None)
+      output_path = video_processing.combine_audio_video_multi_language(
+          video_file=video_path,
+          dubbed_audio_files=dubbed_audio_files,
+          output_directory=temporary_directory,
+      )
+      probe = subprocess.run(
+          [get_setting("FFMPEG_BINARY"), "-hide_banner", "-i", output_path],
+          capture_output=True,
+          text=True,
+      )
+      streams = re.findall(
+          r"Stream #0:\d+\S*?(?:\((\w+)\))?: (Video|Audio)", probe.stderr
+      )
+      self.assertLen([kind for _, kind in streams if kind == "Video"], 1)
+      languages = [language for language, kind in streams if kind == "Audio"]
+      self.assertEqual(languages, ["fra", "deu"])
+
+  def test_combine_audio_video_multi_language_falls_back_when_probe_fails(
+      self,
+  ):
+    with tempfile.TemporaryDirectory() as temporary_directory:
+      os.makedirs(os.path.join(temporary_directory, video_processing._OUTPUT))
+      audio_path = f"{temporary_directory}/audio.mp3"
+      AudioArrayClip(
+          np.zeros((int(44100 * 3), 2), dtype=np.int16), fps=44100
+      ).write_audiofile(audio_path, logger=None)
+      video_path = os.path.join(temporary_directory, "video.mp4")
+      video = ColorClip((256, 200), color=(255, 0, 0)).set_duration(5)
+      video.fps = 30
+      video.write_videofile(video_path, logger=None)
+      with mock.patch.object(
+          video_processing, "ffmpeg_parse_infos", side_effect=KeyError("x")
+      ):
+        output_path = video_processing.combine_audio_video_multi_language(
+            video_file=video_path,
+            dubbed_audio_files={"fr-FR": audio_path},
+            output_directory=temporary_directory,
+        )
+      with VideoFileClip(output_path) as output_clip:
+        self.assertAlmostEqual(output_clip.duration, 5, delta=0.1)
+        self.assertAlmostEqual(output_clip.audio.duration, 5, delta=0.1)
+
+  def test_combine_audio_video_multi_language_invalid_format(self):
+    with self.assertRaisesRegex(ValueError, "Unsupported output format"):
+      video_processing.combine_audio_video_multi_language(
+          video_file="video.mp4",
+          dubbed_audio_files={"fr-FR": "audio.mp3"},
+          output_directory="output",
+          output_format=".avi",
+      )
+
 
 if __name__ == "__main__":
   absltest.main()